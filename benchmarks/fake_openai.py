@@ -0,0 +1,187 @@
+"""
+Local fake of the OpenAI chat-completions API for testing and benchmarking the extractor.
+
+It answers `POST /v1/chat/completions` by reading the customer fields out of the templated
+text in the prompt, following the JSON schema named in `response_format` (`customer`,
+`customers` or the `customer_fields` repair round), with configurable latency, failure
+injection, a slow tail and invalid answers. The random injections have deterministic
+counterparts for tests (every Nth request slow, texts holding a marker failed or left out
+of batched answers), and `GET /stats` counts requests, answers and peak concurrency.
+
+Run it and point the API at it:
+    python benchmarks/fake_openai.py --port 8001 --latency 0.2 --failure-rate 0.05 --invalid-rate 0.1
+    OPENAI_BASE_URL=http://localhost:8001/v1 OPENAI_API_KEY=fake uvicorn main:app
+"""
+import re
+import json
+import time
+import random
+import asyncio
+import argparse
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Patterns for the templated customer descriptions used across the project
+PATTERNS = {
+    'CreditScore': (re.compile(r'credit score of (\d+)', re.I), int),
+    'Geography': (re.compile(r'from (?:the )?(\w+)', re.I), str),
+    'Gender': (re.compile(r'\b(male|female)\b', re.I), str.capitalize),
+    'Age': (re.compile(r'(\d+)-year-old', re.I), int),
+    'Tenure': (re.compile(r'for (\d+) years?', re.I), int),
+    'Balance': (re.compile(r'balance of ([\d,.]+)', re.I), lambda v: float(v.replace(',', ''))),
+    'NumOfProducts': (re.compile(r'holds (\d+) products?', re.I), int),
+    'EstimatedSalary': (re.compile(r'salary of ([\d,.]+)', re.I), lambda v: float(v.replace(',', ''))),
+}
+BATCH_PATTERN = re.compile(r'^\s*\[(\d+)\] "(.*)"\s*$', re.M)
+
+app = FastAPI(title='Fake OpenAI')
+app.state.latency = 0.0
+app.state.jitter = 0.0
+app.state.failure_rate = 0.0
+app.state.rate_limit_rate = 0.0
+app.state.invalid_rate = 0.0
+app.state.tail_rate = 0.0
+app.state.tail_latency = 0.0
+app.state.tail_every = 0
+app.state.fail_marker = None
+app.state.drop_marker = None
+app.state.stats = {'requests': 0, 'in_flight': 0, 'max_in_flight': 0, 'status': {}}
+
+
+def extract(text: str) -> dict:
+    """Read the customer fields out of a templated description."""
+    result = {}
+    for field, (pattern, cast) in PATTERNS.items():
+        match = pattern.search(text)
+        if match:
+            result[field] = cast(match.group(1))
+    lowered = text.lower()
+    result['HasCrCard'] = int(not re.search(r"(does not|doesn't) own a credit card|no credit card", lowered))
+    result['IsActiveMember'] = int(not re.search(r"not an active member|inactive", lowered))
+    return result
+
+
+def corrupt(answer: dict, rate: float) -> dict:
+    """Give an answer an out-of-range Age with probability `rate`, to exercise the repair round."""
+    if random.random() < rate:
+        answer['Age'] = 150
+    return answer
+
+
+def completion(model: str, content: str, prompt_tokens: int, max_tokens=None) -> dict:
+    """Build a chat.completion response body, cut off at `max_tokens` like the real API."""
+    completion_tokens = max(1, len(content) // 4)
+    finish_reason = 'stop'
+    if max_tokens is not None and completion_tokens > max_tokens:
+        content, completion_tokens, finish_reason = content[:max_tokens * 4], max_tokens, 'length'
+    return {
+        'id': f'chatcmpl-fake-{random.getrandbits(32):08x}',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': content},
+            'finish_reason': finish_reason,
+        }],
+        'usage': {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+        },
+    }
+
+
+@app.get('/stats')
+async def stats():
+    return app.state.stats
+
+
+@app.post('/v1/chat/completions')
+async def chat_completions(request: Request):
+    stats = request.app.state.stats
+    stats['requests'] += 1
+    stats['in_flight'] += 1
+    stats['max_in_flight'] = max(stats['max_in_flight'], stats['in_flight'])
+    try:
+        response = await answer_completion(request, stats['requests'])
+    finally:
+        stats['in_flight'] -= 1
+    status = str(response.status_code) if isinstance(response, JSONResponse) else '200'
+    stats['status'][status] = stats['status'].get(status, 0) + 1
+    return response
+
+
+async def answer_completion(request: Request, number: int):
+    body = await request.json()
+    state = request.app.state
+    messages = body['messages']
+
+    delay = state.latency + random.uniform(0, state.jitter)
+    if random.random() < state.tail_rate or (state.tail_every and (number - 1) % state.tail_every == 0):
+        delay += state.tail_latency
+    if delay:
+        await asyncio.sleep(delay)
+
+    roll = random.random()
+    if roll < state.rate_limit_rate:
+        return JSONResponse(status_code=429, content={'error': {'message': 'Rate limit reached', 'type': 'requests'}})
+    failed = state.fail_marker is not None and state.fail_marker in messages[-1]['content']
+    if roll < state.rate_limit_rate + state.failure_rate or failed:
+        return JSONResponse(status_code=500, content={'error': {'message': 'Injected failure', 'type': 'server_error'}})
+
+    response_format = (body.get('response_format') or {}).get('json_schema') or {}
+    name = response_format.get('name')
+    if name == 'customers':
+        # Batched prompt: one object per numbered text of the last message
+        numbered = BATCH_PATTERN.findall(messages[-1]['content'])
+        if state.drop_marker is not None:
+            numbered = [(index, text) for index, text in numbered if state.drop_marker not in text]
+        answer = {'customers': [
+            {'index': int(index), **corrupt(extract(text), state.invalid_rate)} for index, text in numbered
+        ]}
+    elif name == 'customer_fields':
+        # Repair round: the text precedes the rejected answer and the list of invalid fields
+        fields = response_format['schema']['required']
+        extracted = extract(messages[-3]['content'])
+        answer = {field: extracted.get(field) for field in fields}
+    else:
+        # The customer text is the last message, after the few-shot example
+        answer = corrupt(extract(messages[-1]['content']), state.invalid_rate)
+    content = json.dumps(answer)
+    prompt_tokens = sum(len(m.get('content') or '') for m in messages) // 4
+    return completion(body.get('model', 'fake'), content, prompt_tokens, body.get('max_tokens'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.0, help='Base response latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra uniform random latency in seconds')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of requests answered with 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of requests answered with 429')
+    parser.add_argument('--tail-rate', type=float, default=0.0, help='Fraction of requests delayed by --tail-latency')
+    parser.add_argument('--tail-latency', type=float, default=0.0, help='Extra latency of the slow tail in seconds')
+    parser.add_argument('--tail-every', type=int, default=0, help='Delay every Nth request (the 1st, N+1th, ...) too')
+    parser.add_argument('--invalid-rate', type=float, default=0.0, help='Fraction of answers with an invalid Age')
+    parser.add_argument('--fail-marker', help='Answer 500 to every request whose text contains this string')
+    parser.add_argument('--drop-marker', help='Leave the texts containing this string out of batched answers')
+    args = parser.parse_args()
+
+    app.state.latency = args.latency
+    app.state.jitter = args.jitter
+    app.state.failure_rate = args.failure_rate
+    app.state.rate_limit_rate = args.rate_limit_rate
+    app.state.invalid_rate = args.invalid_rate
+    app.state.tail_rate = args.tail_rate
+    app.state.tail_latency = args.tail_latency
+    app.state.tail_every = args.tail_every
+    app.state.fail_marker = args.fail_marker
+    app.state.drop_marker = args.drop_marker
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,203 @@
+"""
+End-to-end HTTP load tests of the /api/prediction/* routes against the fake OpenAI server.
+
+Starts benchmarks/fake_openai.py and the API (uvicorn) as subprocesses on free ports, then
+sends customer descriptions built from dataset.csv to every route at a fixed concurrency
+and reports latency percentiles, throughput and the share of failed requests/items.
+The caches and the rule-based extractor (which reads every one of these templated texts on
+its own) are disabled by default, so every request reaches the fake LLM and its latency and
+failure injection apply; `--with-cache` and `--with-rules` turn them back on.
+
+    python -m benchmarks.load --requests 200 --concurrency 16 --latency 0.05 --failure-rate 0.02
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+import statistics
+import httpx
+import pandas as pd
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+ROOT = Path(__file__).resolve().parent.parent
+ROUTES = ['/from-text', '/from-text-with-probability', '/batch', '/batch/stream', '/explain']
+# Routes taking a list of texts
+BATCH_ROUTES = ('/batch', '/batch/stream', '/explain')
+
+
+def describe(row: Dict) -> str:
+    """Write a customer row as the templated description the marketing team sends."""
+    pronoun = 'He' if row['Gender'] == 'Male' else 'She'
+    return (
+        f"Customer is a {row['Age']}-year-old {row['Gender'].lower()} from {row['Geography']} with a credit "
+        f"score of {row['CreditScore']}. {pronoun} has been with the bank for {row['Tenure']} years, has a "
+        f"balance of {row['Balance']} USD, holds {row['NumOfProducts']} products, "
+        f"{'owns a credit card' if row['HasCrCard'] else 'does not own a credit card'}, "
+        f"{'is an active member' if row['IsActiveMember'] else 'is not an active member'}, "
+        f"and earns an estimated salary of {row['EstimatedSalary']} USD."
+    )
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f'{url} did not come up within {timeout:.0f}s')
+
+
+@contextmanager
+def servers(args) -> Iterator[str]:
+    """Run the fake OpenAI server and the API; yield the API base URL."""
+    fake_port, api_port = free_port(), free_port()
+    fake = subprocess.Popen([
+        sys.executable, str(ROOT / 'benchmarks' / 'fake_openai.py'), '--port', str(fake_port),
+        '--latency', str(args.latency), '--jitter', str(args.jitter),
+        '--failure-rate', str(args.failure_rate), '--rate-limit-rate', str(args.rate_limit_rate),
+    ])
+    env = {
+        **os.environ,
+        'OPENAI_API_KEY': 'fake',
+        'OPENAI_BASE_URL': f'http://127.0.0.1:{fake_port}/v1',
+        # Synthetic load must not end up in the live drift snapshot
+        'DRIFT_SNAPSHOT_PATH': '',
+    }
+    if not args.with_cache:
+        env.update({'EXTRACTION_CACHE_SIZE': '0', 'EXTRACTION_CACHE_PATH': '', 'PREDICTION_MEMO_SIZE': '0'})
+    if not args.with_rules:
+        env['RULE_EXTRACTION'] = 'false'
+    api = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(api_port), '--log-level', 'warning'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(f'http://127.0.0.1:{fake_port}/docs')
+        wait_ready(f'http://127.0.0.1:{api_port}/')
+        yield f'http://127.0.0.1:{api_port}/api/prediction'
+    finally:
+        for process in (api, fake):
+            process.terminate()
+            process.wait(timeout=10)
+
+
+def count_failures(route: str, response: httpx.Response) -> int:
+    """Number of items of one request that did not get a prediction."""
+    if response.status_code != 200:
+        return -1  # the whole request failed
+    if route in ('/batch', '/explain'):
+        return sum(1 for item in response.json() if 'Error' in item)
+    if route == '/batch/stream':
+        return sum(1 for line in response.text.splitlines() if json.loads(line)['status'] != 'ok')
+    return 0
+
+
+async def load_route(client: httpx.AsyncClient, base_url: str, route: str, texts: List[str], args) -> Dict:
+    """Send `args.requests` requests to one route with `args.concurrency` in flight."""
+    per_request = args.batch_size if route in BATCH_ROUTES else 1
+    bodies = []
+    for i in range(args.requests):
+        chunk = [texts[(i * per_request + j) % len(texts)] for j in range(per_request)]
+        bodies.append({'texts': chunk} if route in BATCH_ROUTES else {'text': chunk[0]})
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, failed_requests, failed_items = [], 0, 0
+
+    async def send(body):
+        nonlocal failed_requests, failed_items
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.post(base_url + route, json=body)
+                failures = count_failures(route, response)
+            except httpx.HTTPError:
+                failures = -1
+            latencies.append(time.perf_counter() - start)
+            if failures < 0:
+                failed_requests += 1
+                failed_items += per_request
+            else:
+                failed_items += failures
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(body) for body in bodies))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    percentile = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+    return {
+        'route': route,
+        'requests': len(bodies),
+        'items': len(bodies) * per_request,
+        'p50': statistics.median(latencies),
+        'p95': percentile(0.95),
+        'p99': percentile(0.99),
+        'items_per_sec': len(bodies) * per_request / elapsed,
+        'failed_request_rate': failed_requests / len(bodies),
+        'failed_item_rate': failed_items / (len(bodies) * per_request),
+    }
+
+
+def run(args) -> List[Dict]:
+    """Run the load test on every selected route and return one result per metric."""
+    dataset = pd.read_csv(ROOT / 'src' / 'notebooks' / 'data' / 'dataset.csv')
+    texts = [describe(row) for row in dataset.to_dict('records')]
+
+    async def run_all(base_url):
+        async with httpx.AsyncClient(timeout=args.timeout, limits=httpx.Limits(max_connections=args.concurrency)) as client:
+            return [await load_route(client, base_url, route, texts, args) for route in args.routes]
+
+    results = []
+    with servers(args) as base_url:
+        for report in asyncio.run(run_all(base_url)):
+            print(f"{report['route']:>30}  p50 {report['p50'] * 1e3:8.1f} ms  p95 {report['p95'] * 1e3:8.1f} ms  "
+                  f"p99 {report['p99'] * 1e3:8.1f} ms  {report['items_per_sec']:8.1f} items/s  "
+                  f"failed {report['failed_item_rate']:.1%}", flush=True)
+            name = f"load{report['route']}"
+            results += [
+                {'name': f'{name}/p50', 'value': report['p50'], 'unit': 's', 'better': 'lower'},
+                {'name': f'{name}/p95', 'value': report['p95'], 'unit': 's', 'better': 'lower'},
+                {'name': f'{name}/p99', 'value': report['p99'], 'unit': 's', 'better': 'lower'},
+                {'name': f'{name}/throughput', 'value': report['items_per_sec'], 'unit': 'items/s', 'better': 'higher'},
+                {'name': f'{name}/failed_item_rate', 'value': report['failed_item_rate'], 'unit': 'ratio', 'better': 'lower'},
+            ]
+    return results
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--routes', default=','.join(ROUTES), type=lambda value: value.split(','),
+                        help='Comma-separated routes under /api/prediction')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per route')
+    parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight')
+    parser.add_argument('--batch-size', type=int, default=20, help='Texts per request on /batch, /batch/stream and /explain')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Client timeout per request in seconds')
+    parser.add_argument('--latency', type=float, default=0.05, help='Fake LLM base latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.05, help='Fake LLM extra random latency in seconds')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Fake LLM share of 500 answers')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fake LLM share of 429 answers')
+    parser.add_argument('--with-cache', action='store_true', help='Keep the extraction cache and prediction memo on')
+    parser.add_argument('--with-rules', action='store_true', help='Keep the rule-based extractor on')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    run(parser.parse_args())
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
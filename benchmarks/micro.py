@@ -0,0 +1,105 @@
+"""
+Micro-benchmarks of the prediction path on rows sampled from dataset.csv.
+
+Each stage is timed on its own at every batch size: building the input DataFrame, the
+fitted preprocessing pipeline, the precompiled encoder, sklearn's predict_proba, the
+compiled forest and the whole PredictionController.predict_batch call.
+
+    python -m benchmarks.micro --sizes 1,100,10000
+"""
+import time
+import argparse
+import statistics
+import joblib
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, List, Sequence
+
+DEFAULT_SIZES = [1, 10, 100, 1000, 10000, 100000]
+
+
+def time_call(function: Callable, min_time: float = 0.2, min_repeats: int = 3, max_repeats: int = 1000) -> Dict:
+    """Call `function` repeatedly for at least `min_time` seconds; return median and p90 seconds per call."""
+    function()  # warm-up
+    timings = []
+    start = time.perf_counter()
+    while len(timings) < min_repeats or (time.perf_counter() - start < min_time and len(timings) < max_repeats):
+        t0 = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - t0)
+    timings.sort()
+    return {
+        'median': statistics.median(timings),
+        'p90': timings[min(len(timings) - 1, int(len(timings) * 0.9))],
+        'repeats': len(timings),
+    }
+
+
+def sample_rows(frame: pd.DataFrame, size: int, seed: int = 0) -> pd.DataFrame:
+    """Sample `size` rows with replacement, so every size can be built from the 10k-row dataset."""
+    index = np.random.default_rng(seed).integers(0, len(frame), size)
+    return frame.iloc[index].reset_index(drop=True)
+
+
+def run(sizes: Sequence[int] = DEFAULT_SIZES, min_time: float = 0.2) -> List[Dict]:
+    """Run every micro-benchmark at every batch size and return one result per (stage, size)."""
+    from src.helpers.config import settings
+    from src.models.schemas import CustomerData
+    from src.controllers.PredictionController import PredictionController
+
+    controller = PredictionController(monitor_drift=False)
+    # The serving bundle drops the sklearn classifier once the compiled forest is in place
+    classifier = controller.classifier
+    if classifier is None:
+        classifier = joblib.load(settings.registry.artifact_paths(controller.model_version)['classifier'])
+    dataset = pd.read_csv(settings.dataset_path)[settings.columns]
+    results = []
+
+    for size in sizes:
+        frame = sample_rows(dataset, size)
+        customers = [CustomerData(**row) for row in frame.to_dict('records')]
+        X = controller._transform_batch(customers)
+
+        def predict_batch():
+            controller._memo.clear()  # time scoring, not memo hits
+            controller.predict_batch(customers, with_probability=True)
+
+        cases = {
+            'prepare_input': lambda: controller._prepare_batch_data(customers),
+            'pipe_transform': lambda: controller.pipe.transform(frame),
+            'classifier_predict_proba': lambda: classifier.predict_proba(X),
+            'predict_batch': predict_batch,
+            'explain': lambda: controller.explain(customers),
+        }
+        if controller.encoder is not None:
+            cases['encoder_encode_batch'] = lambda: controller.encoder.encode_batch(customers)
+        if controller.forest is not None:
+            cases['forest_predict_proba'] = lambda: controller.forest.predict_proba(X)
+
+        for stage, function in cases.items():
+            timing = time_call(function, min_time=min_time)
+            results.append({
+                'name': f'micro/{stage}/n={size}',
+                'value': timing['median'],
+                'unit': 's',
+                'better': 'lower',
+                'p90': timing['p90'],
+                'repeats': timing['repeats'],
+                'rows_per_sec': size / timing['median'] if timing['median'] else None,
+            })
+            print(f"{stage:>26} n={size:<7} {timing['median'] * 1e3:10.3f} ms  "
+                  f"{size / timing['median']:14,.0f} rows/s", flush=True)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help='Comma-separated batch sizes')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Minimum seconds spent per case')
+    args = parser.parse_args()
+    run([int(size) for size in args.sizes.split(',')], args.min_time)
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
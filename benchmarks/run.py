@@ -0,0 +1,109 @@
+"""
+Run the benchmark suites, write the results to a JSON file and check them against a baseline.
+
+Results are keyed by benchmark name, so files written at different commits can be compared:
+
+    python -m benchmarks.run --suite micro --output benchmarks/results/main.json
+    python -m benchmarks.run --suite all --baseline benchmarks/results/main.json --threshold 0.15
+
+With --baseline, the run exits with status 1 if any benchmark got worse by more than the
+threshold (relative change, in the direction marked by each result's `better` field).
+"""
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict, List
+from benchmarks import load, micro
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[Dict]:
+    """Return the relative change of every benchmark present in both runs, flagging regressions."""
+    previous = {result['name']: result for result in baseline['results']}
+    rows = []
+    for result in current['results']:
+        before = previous.get(result['name'])
+        if before is None:
+            continue
+        if result['unit'] == 'ratio':
+            # Rates such as failed_item_rate are often 0, so they are compared in absolute terms
+            change = result['value'] - before['value']
+        elif before['value']:
+            change = (result['value'] - before['value']) / abs(before['value'])
+        else:
+            continue
+        worse = change if result['better'] == 'lower' else -change
+        rows.append({
+            'name': result['name'],
+            'baseline': before['value'],
+            'current': result['value'],
+            'change': change,
+            'regression': worse > threshold,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--suite', choices=['micro', 'load', 'all'], default='micro')
+    parser.add_argument('--output', type=Path, default=None,
+                        help='Results file (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--baseline', type=Path, default=None, help='Results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Allowed relative slowdown (default: 0.10)')
+    parser.add_argument('--sizes', default=','.join(map(str, micro.DEFAULT_SIZES)),
+                        help='Comma-separated batch sizes for the micro-benchmarks')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Minimum seconds spent per micro-benchmark')
+    load.add_arguments(parser)
+    args = parser.parse_args()
+
+    commit = git_commit()
+    results = []
+    if args.suite in ('micro', 'all'):
+        results += micro.run([int(size) for size in args.sizes.split(',')], args.min_time)
+    if args.suite in ('load', 'all'):
+        results += load.run(args)
+
+    report = {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': f'{platform.system()} {platform.machine()} {platform.processor()}'.strip(),
+        'settings': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+        'results': results,
+    }
+    output = args.output or RESULTS_DIR / f'{commit}.json'
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, default=str))
+    print(f'Wrote {len(results)} results to {output}')
+
+    if args.baseline is None:
+        return
+
+    baseline = json.loads(args.baseline.read_text())
+    rows = compare(baseline, report, args.threshold)
+    print(f"\nCompared with {baseline.get('commit', args.baseline)} (threshold {args.threshold:.0%}):")
+    for row in rows:
+        flag = 'REGRESSION' if row['regression'] else ''
+        print(f"{row['name']:>55}  {row['baseline']:12.6g} -> {row['current']:12.6g}  {row['change']:+8.1%}  {flag}")
+
+    regressions = [row for row in rows if row['regression']]
+    if regressions:
+        print(f'{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}')
+        sys.exit(1)
+    print('No regressions')
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
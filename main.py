@@ -1,47 +1,103 @@
-import logging
-import uvicorn
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from src.helpers.config import settings
-from src.routes.api import router as api_router
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-)
-logger = logging.getLogger(__name__)
-
-# Create FastAPI app
-app = FastAPI(
-    title=settings.api_name,
-    description=settings.api_description,
-    version="1.0.0"
-)
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Default route
-@app.get("/", tags=['Health'])
-async def root():
-    return {
-        "message": f"Welcome to the {settings.api_name}",
-        "documentation": "/docs",
-    }
-
-# Include API routes
-app.include_router(api_router, prefix="/api")
-
-if __name__ == "__main__":
-    # Start the application
-    logger.info(f"Starting {settings.api_name} on port {settings.api_port}")
-    uvicorn.run("main:app", 
-                host="0.0.0.0", 
-                port=settings.api_port, 
+import time
+import logging
+import uvicorn
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from src.helpers.config import settings
+from src.helpers.metrics import metrics
+from src.routes import dependencies
+from src.routes.api import router as api_router
+from src.routes.monitoring import router as monitoring_router
+from src.routes.jobs import router as jobs_router
+from src.routes.models import router as models_router
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+)
+logger = logging.getLogger(__name__)
+
+# Preload-then-fork: when the app is imported by a pre-forking server
+# (e.g. gunicorn --preload), load the models once in the parent so workers share them
+if settings.preload_before_fork:
+    dependencies.preload(freeze=True)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load models at startup and release clients and caches at shutdown."""
+    if settings.preload_models:
+        dependencies.preload()
+    dependencies.start_profiler()
+    dependencies.start_jobs()
+    dependencies.start_drift_snapshots()
+    yield
+    await dependencies.shutdown()
+
+# Create FastAPI app
+app = FastAPI(
+    title=settings.api_name,
+    description=settings.api_description,
+    version="1.0.0",
+    lifespan=lifespan
+)
+# Add CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Request latency and status per route
+request_seconds = metrics.histogram('churn_http_request_duration_seconds', 'HTTP request latency', labels=('method', 'route'))
+request_count = metrics.counter('churn_http_requests_total', 'HTTP requests by status', ('method', 'route', 'status'))
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        # Report the model version serving this process on every response
+        prediction_controller = dependencies.active_prediction_controller()
+        if prediction_controller is not None:
+            response.headers['X-Model-Version'] = prediction_controller.model_version
+        return response
+    finally:
+        # Label by route template so path parameters do not create new series
+        route = request.scope.get('route')
+        path = route.path if route is not None else 'unmatched'
+        request_seconds.observe(time.perf_counter() - start, method=request.method, route=path)
+        request_count.inc(method=request.method, route=path, status=status)
+
+# Default route
+@app.get("/", tags=['Health'])
+async def root():
+    return {
+        "message": f"Welcome to the {settings.api_name}",
+        "documentation": "/docs",
+    }
+
+# Prometheus scrape endpoint
+@app.get("/metrics", tags=['Monitoring'], response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Include API routes
+app.include_router(api_router, prefix="/api")
+app.include_router(monitoring_router, prefix="/api")
+app.include_router(jobs_router, prefix="/api")
+app.include_router(models_router, prefix="/api")
+
+if __name__ == "__main__":
+    # Start the application
+    logger.info(f"Starting {settings.api_name} on port {settings.api_port}")
+    uvicorn.run("main:app", 
+                host="0.0.0.0", 
+                port=settings.api_port, 
                 reload=True)
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""
+Offline bulk scoring of customer files, without going through the HTTP API.
+
+Streams a CSV (shaped like src/notebooks/data/dataset.csv) or a Parquet file in fixed-size
+chunks, validates each chunk with vectorized checks mirroring CustomerData, scores the valid
+rows with the loaded preprocessor and classifier, and appends the results to the output file
+chunk by chunk so memory stays bounded.
+
+Usage:
+    python score.py customers.csv scored.csv --chunk-size 50000 --workers 4
+"""
+import os
+import time
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from collections import deque
+from typing import Iterator, Optional
+from concurrent.futures import ProcessPoolExecutor
+from src.helpers.validation import validate_frame
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+)
+logger = logging.getLogger(__name__)
+
+# Per-process controller, created once by the pool initializer
+_controller = None
+
+def _init_worker():
+    """Load the models once per worker process."""
+    global _controller
+    from src.controllers.PredictionController import PredictionController
+    _controller = PredictionController(monitor_drift=False)
+
+def score_chunk(frame: pd.DataFrame, threshold: Optional[float] = None) -> pd.DataFrame:
+    """
+    Validate and score one chunk, returning it with Probability, Prediction and Error columns.
+    """
+    if _controller is None:
+        _init_worker()
+
+    clean, valid, errors = validate_frame(frame)
+    result = frame.copy()
+    result['Probability'] = np.nan
+    result['Prediction'] = pd.Series(pd.NA, index=frame.index, dtype='string')
+    result['Error'] = errors.astype('string')
+
+    if valid.any():
+        labels, probabilities = _controller.score_frame(clean[valid], threshold)
+        result.loc[valid, 'Probability'] = np.round(probabilities, 4)
+        result.loc[valid, 'Prediction'] = np.where(labels == 1, 'Exit', 'Not Exit')
+
+    return result
+
+def iter_chunks(path: Path, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Stream a CSV or Parquet file in chunks of chunk_size rows."""
+    if path.suffix.lower() == '.parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Reading Parquet files requires pyarrow: pip install pyarrow")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+class ChunkWriter:
+    """Append scored chunks to a CSV or Parquet file as they are produced."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.parquet = path.suffix.lower() == '.parquet'
+        self._writer = None
+        self._started = False
+
+    def write(self, frame: pd.DataFrame) -> None:
+        if self.parquet:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise SystemExit("Writing Parquet files requires pyarrow: pip install pyarrow")
+            if self._writer is None:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                table = pa.Table.from_pandas(frame, schema=self._writer.schema, preserve_index=False)
+            self._writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='a' if self._started else 'w', header=not self._started, index=False)
+        self._started = True
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+def run(input_path: Path, output_path: Path, chunk_size: int, workers: int, threshold: Optional[float]) -> None:
+    """Score input_path into output_path, keeping at most a few chunks in memory."""
+    writer = ChunkWriter(output_path)
+    totals = {'rows': 0, 'invalid': 0}
+    start = time.perf_counter()
+
+    def collect(result: pd.DataFrame) -> None:
+        writer.write(result)
+        totals['rows'] += len(result)
+        totals['invalid'] += int(result['Error'].fillna('').ne('').sum())
+        elapsed = time.perf_counter() - start
+        logger.info(f"Scored {totals['rows']} rows ({totals['rows'] / elapsed:,.0f} rows/sec)")
+
+    try:
+        if workers <= 1:
+            for chunk in iter_chunks(input_path, chunk_size):
+                collect(score_chunk(chunk, threshold))
+        else:
+            # Results are written in input order; at most 2 chunks per worker are in flight
+            in_flight = deque()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                for chunk in iter_chunks(input_path, chunk_size):
+                    in_flight.append(pool.submit(score_chunk, chunk, threshold))
+                    if len(in_flight) >= 2 * workers:
+                        collect(in_flight.popleft().result())
+                while in_flight:
+                    collect(in_flight.popleft().result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    rate = totals['rows'] / elapsed if elapsed else 0.0
+    logger.info(
+        f"Done: {totals['rows']} rows ({totals['invalid']} invalid) in {elapsed:.2f}s "
+        f"-> {rate:,.0f} rows/sec, written to {output_path}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', type=Path, help='CSV or Parquet file with the customer columns')
+    parser.add_argument('output', type=Path, help='CSV or Parquet file to write the scored rows to')
+    parser.add_argument('--chunk-size', type=int, default=50000, help='Rows per chunk (default: 50000)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes; 0 uses every core (default: 1)')
+    parser.add_argument('--threshold', type=float, default=None,
+                        help='Decision threshold for Exit (default: DECISION_THRESHOLD setting)')
+    args = parser.parse_args()
+
+    workers = args.workers or os.cpu_count() or 1
+    run(args.input, args.output, args.chunk_size, workers, args.threshold)
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
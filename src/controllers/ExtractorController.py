@@ -1,120 +1,871 @@
-import re
-import json
-import logging
-from typing import Optional
-from fastapi import HTTPException
-from src.models.schemas import CustomerData
-from src.helpers.config import settings
-
-# Configure logger
-logger = logging.getLogger(__name__)
-
-class ExtractorController:
-    """
-    Controller class for extracting customer data from natural language text using OpenAI's models.
-    """
-    
-    def __init__(self):
-        """Initialize the ExtractorController."""
-        self.client = settings.client
-        self.model = settings.openai_model
-    
-    def _generate_prompt(self, text: str) -> str:
-        """Generate a prompt for the OpenAI model to extract customer data from text."""
-        
-        return f"""
-        Extract the following fields from the text and provide them in JSON format: CreditScore, Geography, Gender, Age, Tenure, Balance, NumOfProducts, HasCrCard, IsActiveMember, EstimatedSalary.
-        
-        Example:
-        Text: "Jane Smith is a 35-year-old female from Canada with a credit score of 650. She has been with the bank for 3 years, has a balance of 2000.0 USD, holds 1 product, owns a credit card, is an active member, and earns an estimated salary of 75000.0 USD."
-        JSON: {{
-            "CreditScore": 650,
-            "Geography": "Canada",
-            "Gender": "Female",
-            "Age": 35,
-            "Tenure": 3,
-            "Balance": 2000.0,
-            "NumOfProducts": 1,
-            "HasCrCard": true,
-            "IsActiveMember": true,
-            "EstimatedSalary": 75000.0
-        }}
-        
-        Text: "{text}"
-        JSON:
-        """
-    
-    def _extract_last_json_from_output(self, output: str) -> Optional[str]:
-        """Extract the last JSON object from the OpenAI output."""
-        
-        json_matches = re.findall(r'\{.*?\}', output, re.DOTALL)
-        if json_matches:
-            return json_matches[-1]
-        logger.warning("No JSON found in OpenAI output")
-        return None
-    
-    def _post_process_customer_data(self, data: CustomerData) -> CustomerData:
-        """Validate and standardize customer data."""
-        
-        logger.debug(f"Post-processing customer data: {data.model_dump()}")
-        
-        # Convert boolean fields to integers
-        data.HasCrCard = int(data.HasCrCard)
-        data.IsActiveMember = int(data.IsActiveMember)
-        
-        logger.debug(f"Post-processed customer data: {data.model_dump()}")
-        return data
-    
-    def extract_features(self, text: str) -> CustomerData:
-        """Extract customer features from natural language text using OpenAI's model."""
-        
-        logger.info("Extracting features from text")
-        
-        # Generate prompt for OpenAI
-        prompt = self._generate_prompt(text)
-        logger.debug(f"Generated prompt: {prompt}")
-        
-        try:
-            # Call OpenAI API
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that extracts structured data from text."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,  # Lower temperature for more deterministic outputs
-                max_tokens=1000
-            )
-            
-            # Extract response text
-            result_text = response.choices[0].message.content
-            logger.debug(f"OpenAI result: {result_text[:100]}...")  # Log just the first 100 chars
-            
-        except Exception as e:
-            logger.error(f"Error during OpenAI processing: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"OpenAI processing failed: {str(e)}")
-        
-        # Extract and process JSON
-        json_text = self._extract_last_json_from_output(result_text)
-        if not json_text:
-            logger.error("JSON format not found in the output")
-            raise HTTPException(status_code=400, detail='JSON format not found in the output')
-            
-        try:
-            result_json = json.loads(json_text)
-            logger.debug(f"Parsed JSON: {result_json}")
-            
-            # Apply Pydantic validation
-            customer_data = CustomerData(**result_json)
-            
-            # Post-process and validate
-            customer_data = self._post_process_customer_data(customer_data)
-            logger.info("Successfully extracted customer data")
-            return customer_data
-                
-        except (json.JSONDecodeError, TypeError) as e:
-            logger.error(f"Failed to parse JSON: {str(e)}")
-            raise HTTPException(status_code=400, detail=f'Failed to parse the structured data: {str(e)}')
-        except ValueError as e:
-            logger.error(f"Validation error: {str(e)}")
-            raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+import json
+import random
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple, Union
+from fastapi import HTTPException
+from pydantic import ValidationError
+from src.models.schemas import CustomerData
+from src.helpers.config import settings
+from src.helpers.cache import ExtractionCache, LRUCache, SQLiteCache
+from src.helpers.metrics import metrics, cache_families
+from src.helpers.rules import RuleExtractor
+from src.helpers.transport import CircuitBreaker, CircuitOpenError, OpenAITransport
+from src.helpers.validation import field_rules
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Token usage and request counts reported by OpenAI, per prompting mode
+llm_tokens = metrics.counter('churn_llm_tokens_total', 'Tokens reported by OpenAI', ('mode', 'kind'))
+llm_requests = metrics.counter('churn_llm_requests_total', 'Chat completions answered by OpenAI', ('mode',))
+# Rule extractor outcomes (complete, partial, none) and per-field agreement with the LLM
+rule_outcomes = metrics.counter('churn_rule_extraction_total', 'Texts run through the rule extractor', ('outcome',))
+rule_agreement = metrics.counter(
+    'churn_rule_agreement_total', 'Rule-extracted fields compared with the LLM', ('field', 'result')
+)
+# Texts answered by the rule extractor while OpenAI was unavailable (served) or left failing
+llm_fallbacks = metrics.counter('churn_llm_fallback_total', 'Texts sent to the fallback extractor', ('outcome',))
+
+def _customer_schema(fields: Sequence[str], with_index: bool = False) -> Dict:
+    """
+    JSON schema of the given CustomerData fields for OpenAI's strict structured outputs.
+    
+    Every field is required but nullable, so the model can say a field is not in the text
+    instead of guessing; bounds are described rather than enforced, and checked by Pydantic.
+    """
+    properties = {}
+    if with_index:
+        properties['index'] = {'type': 'integer', 'description': 'Number in brackets before the text'}
+    for name, annotation, choices, ge, le in field_rules():
+        if name not in fields:
+            continue
+        description = CustomerData.model_fields[name].description
+        if ge is not None and le is not None:
+            description += f' (between {ge:g} and {le:g})'
+        elif ge is not None:
+            description += f' (at least {ge:g})'
+        if choices is not None:
+            schema = {'type': ['string', 'null'], 'enum': [*choices, None]}
+        else:
+            schema = {'type': ['integer' if annotation is int else 'number', 'null']}
+        properties[name] = {**schema, 'description': description}
+    return {'type': 'object', 'properties': properties, 'required': list(properties), 'additionalProperties': False}
+
+def _response_format(name: str, schema: Dict) -> Dict:
+    return {'type': 'json_schema', 'json_schema': {'name': name, 'strict': True, 'schema': schema}}
+
+_FIELDS = list(CustomerData.model_fields)
+_EXAMPLE_TEXT = (
+    "Jane Smith is a 35-year-old female from France with a credit score of 650. She has been with the bank "
+    "for 3 years, has a balance of 2000.0 USD, holds 1 product, owns a credit card, is an active member, "
+    "and earns an estimated salary of 75000.0 USD."
+)
+_EXAMPLE = {
+    'CreditScore': 650, 'Geography': 'France', 'Gender': 'Female', 'Age': 35, 'Tenure': 3, 'Balance': 2000.0,
+    'NumOfProducts': 1, 'HasCrCard': 1, 'IsActiveMember': 1, 'EstimatedSalary': 75000.0,
+}
+_INSTRUCTIONS = (
+    "You extract structured customer data from text: " + ", ".join(_FIELDS) + ". "
+    "HasCrCard and IsActiveMember are 1 for yes and 0 for no. Use null for a field the text does not state."
+)
+
+# Fixed prompt prefixes (instructions and few-shot example) and response formats. They are
+# built once and are byte-identical on every request, so provider-side prompt caching can
+# reuse them; only the final user message changes.
+_SINGLE_PREFIX = [
+    {"role": "system", "content": _INSTRUCTIONS},
+    {"role": "user", "content": _EXAMPLE_TEXT},
+    {"role": "assistant", "content": json.dumps(_EXAMPLE)},
+]
+_BATCH_PREFIX = [
+    {"role": "system", "content": _INSTRUCTIONS + " Each text is preceded by its index in brackets; answer with "
+                                                  "one object per text in `customers`, carrying that index."},
+    {"role": "user", "content": f'[0] "{_EXAMPLE_TEXT}"'},
+    {"role": "assistant", "content": json.dumps({'customers': [{'index': 0, **_EXAMPLE}]})},
+]
+_SINGLE_FORMAT = _response_format('customer', _customer_schema(_FIELDS))
+_BATCH_FORMAT = _response_format('customers', {
+    'type': 'object',
+    'properties': {'customers': {'type': 'array', 'items': _customer_schema(_FIELDS, with_index=True)}},
+    'required': ['customers'],
+    'additionalProperties': False,
+})
+
+class ExtractorController:
+    """
+    Controller class for extracting customer data from natural language text using OpenAI's models.
+    """
+    
+    # Bump whenever the prompt changes so cached extractions are not reused
+    prompt_version = 'v2'
+    
+    def __init__(self):
+        """Initialize the ExtractorController."""
+        self.client = settings.client
+        self.async_client = settings.async_client
+        self.model = settings.openai_model
+        # Deadlines, retries, hedging and the circuit breaker around every OpenAI call
+        self.transport = OpenAITransport(
+            self.client,
+            self.async_client,
+            CircuitBreaker(
+                window=settings.breaker_window,
+                error_rate=settings.breaker_error_rate,
+                min_calls=settings.breaker_min_calls,
+                cooldown=settings.breaker_cooldown
+            ),
+            attempt_timeout=settings.extraction_timeout,
+            max_retries=settings.extraction_max_retries,
+            backoff_base=settings.extraction_backoff_base,
+            hedge_max=settings.extraction_hedge_max,
+            hedge_quantile=settings.extraction_hedge_quantile
+        )
+        self.batch_size = settings.extraction_batch_size
+        # Completion token budget: a fixed base plus an allowance per extracted customer
+        self.tokens_base = settings.extraction_tokens_base
+        self.tokens_per_customer = settings.extraction_tokens_per_customer
+        # Bounds the number of in-flight OpenAI calls made through the async path
+        self._semaphore = asyncio.Semaphore(settings.extraction_concurrency)
+        self.cache = self._build_cache()
+        # Templated descriptions are read by the rule extractor; the LLM only sees the rest
+        self.rules = RuleExtractor() if settings.rule_extraction else None
+        # Reads the texts it can while OpenAI is unavailable, even with RULE_EXTRACTION off
+        self.fallback = self.rules or RuleExtractor()
+        self.rule_verify_rate = settings.rule_verify_rate
+        self.rule_counts = {'complete': 0, 'partial': 0, 'none': 0}
+        self.rule_field_hits = {field: 0 for field in RuleExtractor.fields}
+        self.rule_agreement = {field: {'compared': 0, 'agreed': 0} for field in RuleExtractor.fields}
+        # Background LLM checks of rule hits, kept referenced until they finish
+        self._verifications = set()
+        metrics.register_collector('extraction_cache', self._collect_metrics)
+        # Token usage per prompting mode, to compare batched against single extraction
+        self.usage = {
+            mode: {'requests': 0, 'customers': 0, 'prompt_tokens': 0, 'cached_tokens': 0, 'completion_tokens': 0}
+            for mode in ('single', 'batch', 'repair')
+        }
+    
+    async def aclose(self) -> None:
+        """Close the OpenAI clients and the on-disk cache."""
+        
+        for task in self._verifications:
+            task.cancel()
+        await self.async_client.close()
+        self.client.close()
+        if self.cache.disk is not None:
+            self.cache.disk.close()
+    
+    def _collect_metrics(self) -> List:
+        """Expose the extraction cache tiers on /metrics."""
+        
+        families = cache_families('extraction_memory', self.cache.memory.stats())
+        if self.cache.disk is not None:
+            families += cache_families('extraction_disk', self.cache.disk.stats())
+        return families
+    
+    def _build_cache(self) -> ExtractionCache:
+        """Build the text-to-CustomerData cache from settings."""
+        
+        ttl = settings.extraction_cache_ttl or None
+        disk = None
+        if settings.extraction_cache_path:
+            try:
+                disk = SQLiteCache(
+                    settings.extraction_cache_path, ttl=ttl, max_entries=settings.extraction_cache_disk_size or None
+                )
+            except Exception as e:
+                logger.warning(f"On-disk extraction cache unavailable: {str(e)}")
+        
+        memory = LRUCache(settings.extraction_cache_size, ttl=ttl)
+        return ExtractionCache(memory, self.model, self.prompt_version, disk=disk)
+    
+    def _token_budget(self, customers: int = 1, fields: int = 0) -> int:
+        """
+        Completion token budget for an answer with `customers` objects, or `fields` fields.
+        
+        A compact customer object is about 70 tokens; answers cut off at the budget are
+        retried once with twice the budget.
+        """
+        
+        if fields:
+            return self.tokens_base + fields * self.tokens_per_customer // len(_FIELDS) + fields
+        return self.tokens_base + customers * self.tokens_per_customer
+    
+    @metrics.timed('json_parse')
+    def _decode(self, output: str) -> Optional[Any]:
+        """
+        Decode the answer: one json.loads for structured output, with a scan for embedded JSON
+        as fallback for providers that answer in free text.
+        """
+        
+        try:
+            return json.loads(output)
+        except (TypeError, json.JSONDecodeError):
+            return self._extract_json_from_output(output or '')
+    
+    def _extract_json_from_output(self, output: str) -> Optional[Any]:
+        """
+        Extract the last top-level JSON object or array from the OpenAI output.
+        
+        Candidates are decoded with the JSON decoder itself rather than a regex, so nested
+        braces and arrays of objects are handled.
+        """
+        
+        decoder = json.JSONDecoder()
+        last_value = None
+        position = 0
+        while True:
+            starts = [index for index in (output.find('{', position), output.find('[', position)) if index != -1]
+            if not starts:
+                break
+            start = min(starts)
+            try:
+                last_value, position = decoder.raw_decode(output, start)
+            except json.JSONDecodeError:
+                position = start + 1
+        
+        if last_value is None:
+            logger.warning("No JSON found in OpenAI output")
+        return last_value
+    
+    def _post_process_customer_data(self, data: CustomerData) -> CustomerData:
+        """Validate and standardize customer data."""
+        
+        logger.debug(f"Post-processing customer data: {data.model_dump()}")
+        
+        # Convert boolean fields to integers
+        data.HasCrCard = int(data.HasCrCard)
+        data.IsActiveMember = int(data.IsActiveMember)
+        
+        logger.debug(f"Post-processed customer data: {data.model_dump()}")
+        return data
+    
+    def _build_messages(self, text: str) -> List[Dict]:
+        """Build the chat messages for extracting customer data from text."""
+        
+        return [*_SINGLE_PREFIX, {"role": "user", "content": text}]
+    
+    def _build_batch_messages(self, texts: List[str]) -> List[Dict]:
+        """Build the chat messages for extracting customer data from several texts."""
+        
+        numbered_texts = "\n".join(f'[{index}] "{text}"' for index, text in enumerate(texts))
+        return [*_BATCH_PREFIX, {"role": "user", "content": numbered_texts}]
+    
+    def _build_repair_messages(self, text: str, answer: Dict, errors: Dict[str, str]) -> List[Dict]:
+        """Build the follow-up messages asking again for the fields that failed validation only."""
+        
+        problems = "; ".join(f"{field}: {message}" for field, message in errors.items())
+        return [
+            *self._build_messages(text),
+            {"role": "assistant", "content": json.dumps(answer)},
+            {"role": "user", "content": f"These fields are invalid: {problems}. "
+                                        f"Read them again from the text and answer with these fields only."},
+        ]
+    
+    @metrics.timed('validation')
+    def _validate_customer(self, result_json: Any) -> CustomerData:
+        """Apply Pydantic validation and post-processing to one parsed JSON object."""
+        
+        if not isinstance(result_json, dict):
+            raise TypeError(f"Expected a JSON object, got {type(result_json).__name__}")
+        
+        # Apply Pydantic validation
+        customer_data = CustomerData(**result_json)
+        
+        # Post-process and validate
+        return self._post_process_customer_data(customer_data)
+    
+    def _check_customer(self, answer: Any) -> Tuple[Optional[CustomerData], Dict[str, str]]:
+        """Validate one answer object; return the CustomerData, or the error message per failing field."""
+        
+        try:
+            return self._validate_customer(answer), {}
+        except TypeError as e:
+            return None, {'': str(e)}
+        except ValidationError as e:
+            errors = {}
+            for error in e.errors():
+                field = str(error['loc'][0]) if error['loc'] else ''
+                errors.setdefault(field, error['msg'])
+            return None, errors
+    
+    def _repair_request(self, text: str, answer: Any, errors: Dict[str, str]) -> Optional[Tuple[List[Dict], int, Dict]]:
+        """
+        Build the repair round for an answer that failed validation: (messages, token budget,
+        response format) asking only for the failing fields, or None if it cannot be repaired.
+        """
+        
+        fields = [field for field in _FIELDS if field in errors]
+        if not isinstance(answer, dict) or not fields or len(fields) < len(errors):
+            return None
+        logger.info(f"Repairing fields {fields}")
+        return (
+            self._build_repair_messages(text, answer, {field: errors[field] for field in fields}),
+            self._token_budget(fields=len(fields)),
+            _response_format('customer_fields', _customer_schema(fields)),
+        )
+    
+    def _apply_repair(self, answer: Dict, repair_format: Dict, output: str) -> Dict:
+        """Overlay the repaired fields on the first answer."""
+        
+        repaired = self._decode(output)
+        if not isinstance(repaired, dict):
+            return answer
+        fields = repair_format['json_schema']['schema']['required']
+        return {**answer, **{field: repaired[field] for field in fields if field in repaired}}
+    
+    def _single_answer(self, output: str) -> Any:
+        """Decode a single-text answer, accepting a one-element array as well as a bare object."""
+        
+        answer = self._decode(output)
+        if isinstance(answer, list) and len(answer) == 1:
+            answer = answer[0]
+        return answer
+    
+    def _finish_customer(self, answer: Any) -> CustomerData:
+        """Validate the final answer for one text, raising a 400 if it still fails."""
+        
+        if answer is None:
+            logger.error("JSON format not found in the output")
+            raise HTTPException(status_code=400, detail='JSON format not found in the output')
+        
+        customer_data, errors = self._check_customer(answer)
+        if customer_data is None:
+            detail = "; ".join(f"{field}: {message}" if field else message for field, message in errors.items())
+            logger.error(f"Validation error: {detail}")
+            raise HTTPException(status_code=400, detail=f"Failed to parse the structured data: {detail}")
+        
+        logger.info("Successfully extracted customer data")
+        return customer_data
+    
+    def _parse_batch_answers(self, result_text: str, count: int) -> List[Optional[Dict]]:
+        """
+        Decode a batched answer into one raw object per input index.
+        
+        Items are matched on their "index" field, falling back to array position when every
+        index is missing. Absent entries come back as None.
+        """
+        
+        answers: List[Optional[Dict]] = [None] * count
+        result_json = self._decode(result_text)
+        if isinstance(result_json, dict):
+            result_json = result_json.get('customers', [result_json])
+        if not isinstance(result_json, list):
+            return answers
+        
+        positional = all(not isinstance(item, dict) or 'index' not in item for item in result_json)
+        for position, item in enumerate(result_json):
+            if not isinstance(item, dict):
+                continue
+            item = dict(item)
+            index = position if positional else item.pop('index', None)
+            if not isinstance(index, int) or not 0 <= index < count or answers[index] is not None:
+                continue
+            answers[index] = item
+        
+        return answers
+    
+    def _record_usage(self, mode: str, response: Any, customers: int) -> None:
+        """Accumulate token usage reported by OpenAI for a prompting mode."""
+        
+        stats = self.usage[mode]
+        stats['requests'] += 1
+        stats['customers'] += customers
+        llm_requests.inc(mode=mode)
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            stats['prompt_tokens'] += usage.prompt_tokens or 0
+            stats['completion_tokens'] += usage.completion_tokens or 0
+            # Prompt tokens served from the provider's prefix cache
+            details = getattr(usage, 'prompt_tokens_details', None)
+            cached = getattr(details, 'cached_tokens', None) or 0
+            stats['cached_tokens'] += cached
+            llm_tokens.inc(usage.prompt_tokens or 0, mode=mode, kind='prompt')
+            llm_tokens.inc(cached, mode=mode, kind='cached')
+            llm_tokens.inc(usage.completion_tokens or 0, mode=mode, kind='completion')
+    
+    def usage_stats(self) -> Dict:
+        """Return token usage and tokens per customer for single, batched and repair prompting."""
+        
+        report = {'batch_size': self.batch_size}
+        for mode, stats in self.usage.items():
+            total_tokens = stats['prompt_tokens'] + stats['completion_tokens']
+            report[mode] = {
+                **stats,
+                'tokens_per_customer': round(total_tokens / stats['customers'], 2) if stats['customers'] else None
+            }
+        return report
+    
+    def _unavailable(self, error: Exception) -> HTTPException:
+        """Turn an OpenAI call failure into the HTTP error of the extraction route."""
+        
+        if isinstance(error, CircuitOpenError):
+            return HTTPException(status_code=503, detail="OpenAI unavailable: circuit breaker open")
+        detail = str(error) or type(error).__name__
+        logger.error(f"Error during OpenAI processing: {detail}")
+        if self.transport.is_retryable(error):
+            return HTTPException(status_code=503, detail=f"OpenAI unavailable: {detail}")
+        return HTTPException(status_code=500, detail=f"OpenAI processing failed: {detail}")
+    
+    def _fallback(self, text: str, error: HTTPException) -> CustomerData:
+        """Read a text with the rule extractor while OpenAI is unavailable, re-raising `error` if it cannot."""
+        
+        fields, unresolved = self.fallback.extract(text)
+        customer_data = self.fallback.to_customer(fields)
+        if customer_data is None:
+            llm_fallbacks.inc(outcome='failed')
+            raise HTTPException(
+                status_code=error.status_code, detail=f"{error.detail}; rules could not read {', '.join(unresolved)}"
+            )
+        llm_fallbacks.inc(outcome='served')
+        logger.warning("OpenAI unavailable, extracted customer data with rules")
+        return customer_data
+    
+    def transport_stats(self) -> Dict:
+        """Return the circuit breaker state, attempt outcomes, hedging and fallback counters."""
+        
+        return {**self.transport.stats(), 'fallbacks': llm_fallbacks.values()}
+    
+    def _apply_rules(self, text: str) -> Tuple[Optional[CustomerData], Dict]:
+        """
+        Run the rule extractor on one text.
+        
+        Returns the CustomerData when every field was read confidently (None otherwise) and
+        the fields that were read, which are compared with the LLM's answer for the rest.
+        """
+        
+        if self.rules is None:
+            return None, {}
+        
+        with metrics.stage('rules'):
+            fields, unresolved = self.rules.extract(text)
+            customer_data = None if unresolved else self.rules.to_customer(fields)
+        
+        outcome = 'complete' if customer_data is not None else 'partial' if fields else 'none'
+        self.rule_counts[outcome] += 1
+        rule_outcomes.inc(outcome=outcome)
+        for field in fields:
+            self.rule_field_hits[field] += 1
+        if unresolved:
+            logger.debug(f"Rule extraction left {unresolved} to the LLM")
+        return customer_data, fields
+    
+    def _reconcile(self, fields: Dict, customer_data: CustomerData) -> CustomerData:
+        """
+        Compare the fields read by the rules with the LLM's extraction.
+        
+        Every rule field is counted as agreeing or not, to measure the rules' accuracy. A text
+        the rules could only partly read is one they may have misread too, so the LLM's
+        values win on any disagreement.
+        """
+        
+        if not fields:
+            return customer_data
+        
+        extracted = customer_data.model_dump()
+        disagreed = []
+        for field, value in fields.items():
+            result = 'agreed' if extracted[field] == value else 'disagreed'
+            self.rule_agreement[field]['compared'] += 1
+            self.rule_agreement[field]['agreed'] += result == 'agreed'
+            rule_agreement.inc(field=field, result=result)
+            if result == 'disagreed':
+                disagreed.append(field)
+        
+        if disagreed:
+            logger.debug(f"Rules and LLM disagree on {disagreed}, keeping the LLM's values")
+        return customer_data
+    
+    def _should_verify(self) -> bool:
+        """Sample the rule hits that are also sent to the LLM to measure agreement."""
+        
+        return self.rule_verify_rate > 0 and random.random() < self.rule_verify_rate
+    
+    def _verify_later(self, text: str, fields: Dict) -> None:
+        """Compare a rule hit with the LLM in the background, without delaying the caller."""
+        
+        async def verify():
+            try:
+                self._reconcile(fields, await self._aextract_single(text))
+            except Exception as e:
+                logger.warning(f"Verification of a rule extraction failed: {str(e)}")
+        
+        task = asyncio.ensure_future(verify())
+        self._verifications.add(task)
+        task.add_done_callback(self._verifications.discard)
+    
+    def _rules_for_keys(
+        self, keys: List[str], texts: Dict[str, str]
+    ) -> Tuple[Dict[str, CustomerData], Dict[str, Dict]]:
+        """
+        Run the rule extractor on the uncached texts of a batch.
+        
+        Returns the customers read completely and, for the others, the fields that were read.
+        """
+        
+        resolved, partial = {}, {}
+        for key in keys:
+            customer_data, fields = self._apply_rules(texts[key])
+            if customer_data is not None:
+                resolved[key] = customer_data
+                if self._should_verify():
+                    self._verify_later(texts[key], fields)
+            elif fields:
+                partial[key] = fields
+        return resolved, partial
+    
+    def rule_stats(self) -> Dict:
+        """Return the rule extractor hit rate, per-field hits and per-field agreement with the LLM."""
+        
+        total = sum(self.rule_counts.values())
+        return {
+            'enabled': self.rules is not None,
+            'verify_rate': self.rule_verify_rate,
+            'texts': total,
+            'outcomes': dict(self.rule_counts),
+            'hit_rate': round(self.rule_counts['complete'] / total, 4) if total else None,
+            'field_hits': dict(self.rule_field_hits),
+            'agreement': {
+                field: {**stats, 'rate': round(stats['agreed'] / stats['compared'], 4) if stats['compared'] else None}
+                for field, stats in self.rule_agreement.items()
+            },
+        }
+    
+    def extract_features(self, text: str) -> CustomerData:
+        """
+        Extract customer features from natural language text.
+        
+        Texts the rule extractor reads completely skip OpenAI's model; for the others the
+        model's answer is used, and compared with the fields the rules did read.
+        
+        This is the blocking path for scripts and notebooks and must not be called from the
+        event loop; the routes use `aextract_features`. Here a sampled rule hit is verified
+        against the LLM inline, so such a call waits for that completion too.
+        """
+        
+        logger.info("Extracting features from text")
+        
+        # Serve repeated descriptions from the cache
+        cached = self.cache.get(text)
+        if cached is not None:
+            logger.info("Extraction cache hit")
+            return cached
+        
+        rule_data, fields = self._apply_rules(text)
+        if rule_data is not None:
+            logger.info("Extracted customer data with rules")
+            if self._should_verify():
+                # No event loop to schedule this on, so the caller waits for the verification
+                try:
+                    self._reconcile(fields, self._extract_single(text))
+                except HTTPException as e:
+                    logger.warning(f"Verification of a rule extraction failed: {e.detail}")
+            return rule_data
+        
+        try:
+            customer_data = self._extract_single(text)
+        except HTTPException as e:
+            if e.status_code != 503:
+                raise
+            customer_data = self._fallback(text, e)
+        customer_data = self._reconcile(fields, customer_data)
+        self.cache.set(text, customer_data)
+        return customer_data
+    
+    def _complete(self, messages: List[Dict], max_tokens: int, response_format: Dict) -> Any:
+        """Make one blocking chat completion."""
+        
+        logger.debug(f"Generated prompt: {messages[-1]['content']}")
+        try:
+            with metrics.stage('llm_call'):
+                response = self.transport.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.1,  # Lower temperature for more deterministic outputs
+                    max_tokens=max_tokens,
+                    response_format=response_format
+                )
+            logger.debug(f"OpenAI result: {(response.choices[0].message.content or '')[:100]}...")
+            return response
+            
+        except Exception as e:
+            raise self._unavailable(e)
+    
+    def _request(self, mode: str, messages: List[Dict], max_tokens: int, response_format: Dict,
+                 customers: int = 1) -> str:
+        """Complete within the token budget, retrying once with twice the budget if the answer was cut off."""
+        
+        response = self._complete(messages, max_tokens, response_format)
+        self._record_usage(mode, response, customers)
+        if response.choices[0].finish_reason == 'length':
+            logger.warning(f"Answer cut off at {max_tokens} tokens, retrying with {2 * max_tokens}")
+            response = self._complete(messages, 2 * max_tokens, response_format)
+            self._record_usage(mode, response, 0)
+        return response.choices[0].message.content
+    
+    def _extract_single(self, text: str) -> CustomerData:
+        """Extract one customer with OpenAI's model, blocking until it answers."""
+        
+        output = self._request('single', self._build_messages(text), self._token_budget(), _SINGLE_FORMAT)
+        answer = self._single_answer(output)
+        
+        customer_data, errors = self._check_customer(answer) if answer is not None else (None, {})
+        repair = self._repair_request(text, answer, errors) if errors else None
+        if repair is not None:
+            messages, max_tokens, repair_format = repair
+            output = self._request('repair', messages, max_tokens, repair_format)
+            answer = self._apply_repair(answer, repair_format, output)
+        
+        return customer_data or self._finish_customer(answer)
+    
+    async def _acomplete(self, messages: List[Dict], max_tokens: int, response_format: Dict) -> Any:
+        """
+        Make one chat completion without blocking the event loop.
+        
+        Calls are bounded by the extraction concurrency limit; deadlines, hedging, retries
+        and the circuit breaker are handled by the transport. Failures raise a 503 when
+        OpenAI is unavailable, or a 500.
+        """
+        
+        async with self._semaphore:
+            try:
+                with metrics.stage('llm_call'):
+                    response = await self.transport.acreate(
+                        model=self.model,
+                        messages=messages,
+                        temperature=0.1,
+                        max_tokens=max_tokens,
+                        response_format=response_format
+                    )
+                logger.debug(f"OpenAI result: {(response.choices[0].message.content or '')[:100]}...")
+                return response
+                
+            except Exception as e:
+                raise self._unavailable(e)
+    
+    async def _arequest(self, mode: str, messages: List[Dict], max_tokens: int, response_format: Dict,
+                        customers: int = 1) -> str:
+        """Complete within the token budget, retrying once with twice the budget if the answer was cut off."""
+        
+        response = await self._acomplete(messages, max_tokens, response_format)
+        self._record_usage(mode, response, customers)
+        if response.choices[0].finish_reason == 'length':
+            logger.warning(f"Answer cut off at {max_tokens} tokens, retrying with {2 * max_tokens}")
+            response = await self._acomplete(messages, 2 * max_tokens, response_format)
+            self._record_usage(mode, response, 0)
+        return response.choices[0].message.content
+    
+    async def _arepair(self, text: str, answer: Any) -> CustomerData:
+        """Validate an answer for one text, running the targeted repair round if some fields fail."""
+        
+        customer_data, errors = self._check_customer(answer) if answer is not None else (None, {})
+        repair = self._repair_request(text, answer, errors) if errors else None
+        if repair is not None:
+            messages, max_tokens, repair_format = repair
+            output = await self._arequest('repair', messages, max_tokens, repair_format)
+            answer = self._apply_repair(answer, repair_format, output)
+        
+        return customer_data or self._finish_customer(answer)
+    
+    async def _aextract_single(self, text: str) -> CustomerData:
+        """Extract one customer with the single-text prompt."""
+        
+        output = await self._arequest('single', self._build_messages(text), self._token_budget(), _SINGLE_FORMAT)
+        return await self._arepair(text, self._single_answer(output))
+    
+    async def _aextract_group(self, texts: List[str]) -> List[CustomerData]:
+        """
+        Extract several customers with one batched prompt.
+        
+        Items that fail validation get the targeted repair round; items missing from the
+        answer (or still invalid) are split in two halves and extracted again, down to the
+        single-text prompt for groups of one.
+        """
+        
+        if len(texts) == 1:
+            return [await self._aextract_single(texts[0])]
+        
+        output = await self._arequest(
+            'batch', self._build_batch_messages(texts), self._token_budget(len(texts)), _BATCH_FORMAT, len(texts)
+        )
+        answers = self._parse_batch_answers(output, len(texts))
+        results = await asyncio.gather(
+            *(self._arepair(text, answer) for text, answer in zip(texts, answers) if answer is not None),
+            return_exceptions=True
+        )
+        results = iter(results)
+        results = [None if answer is None else next(results) for answer in answers]
+        results = [None if isinstance(result, BaseException) else result for result in results]
+        
+        failed = [index for index, result in enumerate(results) if result is None]
+        if failed:
+            logger.warning(f"{len(failed)}/{len(texts)} batch items missing or invalid, splitting")
+            halves = [failed[:len(failed) // 2], failed[len(failed) // 2:]]
+            retried = await asyncio.gather(
+                *(self._aextract_group([texts[index] for index in half]) for half in halves if half)
+            )
+            for half, half_results in zip([half for half in halves if half], retried):
+                for index, result in zip(half, half_results):
+                    results[index] = result
+        
+        return results
+    
+    async def _aextract_or_fallback(self, texts: List[str]) -> List[CustomerData]:
+        """Extract a group of texts, reading them with the fallback extractor while OpenAI is unavailable."""
+        
+        try:
+            return await self._aextract_group(texts)
+        except HTTPException as e:
+            if e.status_code != 503:
+                raise
+            return [self._fallback(text, e) for text in texts]
+    
+    async def aextract_features(self, text: str) -> CustomerData:
+        """
+        Extract customer features without blocking the event loop.
+        """
+        
+        logger.info("Extracting features from text (async)")
+        
+        # Serve repeated descriptions from the cache
+        cached = self.cache.get(text)
+        if cached is not None:
+            logger.info("Extraction cache hit")
+            return cached
+        
+        rule_data, fields = self._apply_rules(text)
+        if rule_data is not None:
+            logger.info("Extracted customer data with rules")
+            if self._should_verify():
+                self._verify_later(text, fields)
+            return rule_data
+        
+        customer_data = self._reconcile(fields, (await self._aextract_or_fallback([text]))[0])
+        self.cache.set(text, customer_data)
+        return customer_data
+    
+    async def aextract_features_batch(self, texts: List[str]) -> List[CustomerData]:
+        """
+        Extract customer features for many texts concurrently.
+        
+        Texts that normalize to the same cache key are extracted only once, texts the rule
+        extractor reads completely skip the LLM, and the remaining cache misses are sent
+        `batch_size` texts per completion (one text per completion when it is 1).
+        All extractions are awaited before returning; the first failure is re-raised.
+        """
+        
+        # Deduplicate within the batch, keeping the first text for each key
+        unique_texts = {}
+        for text in texts:
+            unique_texts.setdefault(self.cache.key(text), text)
+        
+        by_key = {}
+        for key, text in unique_texts.items():
+            cached = self.cache.get(text)
+            if cached is not None:
+                by_key[key] = cached
+        
+        missing = [key for key in unique_texts if key not in by_key]
+        resolved, partial = self._rules_for_keys(missing, unique_texts)
+        by_key.update(resolved)
+        missing = [key for key in missing if key not in resolved]
+        groups = [missing[start:start + self.batch_size] for start in range(0, len(missing), self.batch_size)]
+        logger.info(
+            f"Extracting features from {len(texts)} texts ({len(unique_texts)} unique, "
+            f"{len(resolved)} read by rules, {len(missing)} uncached) in {len(groups)} requests"
+        )
+        
+        results = await asyncio.gather(
+            *(self._aextract_or_fallback([unique_texts[key] for key in group]) for group in groups),
+            return_exceptions=True
+        )
+        
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        
+        for group, group_results in zip(groups, results):
+            for key, customer_data in zip(group, group_results):
+                customer_data = self._reconcile(partial.get(key, {}), customer_data)
+                self.cache.set(unique_texts[key], customer_data)
+                by_key[key] = customer_data
+        
+        return [by_key[self.cache.key(text)].model_copy() for text in texts]
+    
+    async def aextract_features_stream(
+        self, texts: List[str], max_in_flight: int
+    ) -> AsyncIterator[List[Tuple[int, Union[CustomerData, Exception]]]]:
+        """
+        Extract customer features for many texts, yielding results as they complete.
+        
+        Each yielded list holds `(index, CustomerData or exception)` pairs for the texts of one
+        finished request; cache hits and texts read by the rule extractor come first, in one
+        list. At most `max_in_flight` requests are scheduled at a time, so new work only
+        starts as results are consumed. A batched request that fails is retried one text per
+        request, so one bad text only fails itself.
+        """
+        
+        # Deduplicate within the batch, keeping every index that shares a key
+        indices_by_key = {}
+        unique_texts = {}
+        for index, text in enumerate(texts):
+            key = self.cache.key(text)
+            unique_texts.setdefault(key, text)
+            indices_by_key.setdefault(key, []).append(index)
+        
+        hits = []
+        missing = []
+        for key, text in unique_texts.items():
+            cached = self.cache.get(text)
+            if cached is None:
+                missing.append(key)
+            else:
+                hits.extend((index, cached.model_copy()) for index in indices_by_key[key])
+        
+        resolved, partial = self._rules_for_keys(missing, unique_texts)
+        for key, customer_data in resolved.items():
+            hits.extend((index, customer_data.model_copy()) for index in indices_by_key[key])
+        missing = [key for key in missing if key not in resolved]
+        
+        pending_groups = [missing[start:start + self.batch_size] for start in range(0, len(missing), self.batch_size)]
+        pending_groups.reverse()
+        logger.info(
+            f"Streaming extraction of {len(texts)} texts ({len(unique_texts)} unique, "
+            f"{len(resolved)} read by rules, {len(missing)} uncached) with at most {max_in_flight} requests in flight"
+        )
+        
+        if hits:
+            yield sorted(hits, key=lambda item: item[0])
+        
+        in_flight = {}
+        try:
+            while pending_groups or in_flight:
+                while pending_groups and len(in_flight) < max_in_flight:
+                    group = pending_groups.pop()
+                    task = asyncio.ensure_future(self._aextract_or_fallback([unique_texts[key] for key in group]))
+                    in_flight[task] = group
+                
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    group = in_flight.pop(task)
+                    error = task.exception()
+                    if error is not None and len(group) > 1:
+                        logger.warning(
+                            f"Batched extraction of {len(group)} texts failed, retrying one by one: {str(error)}"
+                        )
+                        pending_groups.extend([key] for key in reversed(group))
+                        continue
+                    
+                    items = []
+                    for position, key in enumerate(group):
+                        if error is None:
+                            customer_data = self._reconcile(partial.get(key, {}), task.result()[position])
+                            self.cache.set(unique_texts[key], customer_data)
+                            items.extend((index, customer_data.model_copy()) for index in indices_by_key[key])
+                        else:
+                            items.extend((index, error) for index in indices_by_key[key])
+                    yield sorted(items, key=lambda item: item[0])
+        finally:
+            # The consumer went away (e.g. the client disconnected): stop the remaining work
+            for task in in_flight:
+                task.cancel()
\ No newline at end of file
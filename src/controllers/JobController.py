@@ -0,0 +1,187 @@
+import uuid
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+from fastapi import HTTPException
+from src.helpers.config import settings
+from src.helpers.jobs import JobStore
+from src.controllers.ExtractorController import ExtractorController
+from src.controllers.PredictionController import PredictionController
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+class JobController:
+    """
+    Controller class for batch jobs processed in the background.
+    
+    Submitted texts are stored in a JobStore. A pool of asyncio workers leases unfinished
+    jobs, extracts and scores their pending texts `chunk_size` at a time, and saves each
+    result as soon as it is known. Jobs left unfinished by a restart are picked up again
+    from their first pending text.
+    
+    Store calls block on SQLite, so they run in worker threads rather than on the event loop.
+    """
+    
+    def __init__(
+        self,
+        get_extractor: Callable[[], ExtractorController],
+        get_prediction_controller: Callable[[], PredictionController]
+    ):
+        """
+        Initialize the JobController.
+        
+        The extractor and the prediction controller are looked up through the getters when a
+        job runs, so starting the workers neither loads the models nor needs OpenAI
+        credentials, and jobs can be submitted and polled without either.
+        """
+        self.get_extractor = get_extractor
+        self.get_prediction_controller = get_prediction_controller
+        self.store = JobStore(settings.job_db_path)
+        self.workers = settings.job_workers
+        self.chunk_size = settings.job_chunk_size
+        self.lease = settings.job_lease_seconds
+        self.poll_interval = settings.job_poll_interval
+        # Prefix of the lease owner of each worker of this process
+        self.owner = uuid.uuid4().hex
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+    
+    def start(self) -> None:
+        """Start the worker pool on the running event loop; unfinished jobs are resumed."""
+        
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.ensure_future(self._work(worker)) for worker in range(self.workers)]
+        logger.info(f"Started {self.workers} job workers on {self.store.path}")
+    
+    async def stop(self) -> None:
+        """Stop the workers and release their leases, so a restart resumes the jobs at once."""
+        
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        owners = [self._owner(worker) for worker in range(self.workers)]
+        await asyncio.to_thread(self.store.release, owners)
+        await asyncio.to_thread(self.store.close)
+    
+    async def submit(self, texts: List[str], with_probability: bool = False) -> Dict:
+        """Store a new job and wake a worker up to process it."""
+        
+        job_id = await asyncio.to_thread(self.store.create, texts, with_probability)
+        logger.info(f"Queued job {job_id} with {len(texts)} texts")
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return await self.status(job_id)
+    
+    async def status(self, job_id: str) -> Dict:
+        """Return the status and progress of a job."""
+        
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+        return job
+    
+    async def results(self, job_id: str, offset: int = 0, limit: int = 100) -> Dict:
+        """Return one page of per-text results of a job, in input order."""
+        
+        job = await self.status(job_id)
+        return {
+            'job_id': job_id,
+            'status': job['status'],
+            'total': job['total'],
+            'offset': offset,
+            'limit': limit,
+            'items': await asyncio.to_thread(self.store.results, job_id, offset, limit),
+        }
+    
+    def _owner(self, worker: int) -> str:
+        """Lease owner of one worker; each worker leases its own jobs."""
+        
+        return f'{self.owner}:{worker}'
+    
+    async def _work(self, worker: int) -> None:
+        """Lease and process jobs until cancelled, sleeping when there is nothing to do."""
+        
+        owner = self._owner(worker)
+        while True:
+            claimed = await asyncio.to_thread(self.store.claim, owner, self.lease)
+            if claimed is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+        
+            job_id, with_probability = claimed
+            logger.info(f"Worker {worker} processing job {job_id}")
+            try:
+                await self._run_job(job_id, with_probability, owner)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = e.detail if isinstance(e, HTTPException) else str(e) or type(e).__name__
+                logger.error(f"Job {job_id} failed: {error}")
+                await asyncio.to_thread(self.store.finish, job_id, 'failed', error)
+    
+    async def _run_job(self, job_id: str, with_probability: bool, owner: str) -> None:
+        """Process the pending texts of a job chunk by chunk, then mark it completed."""
+        
+        extractor = self.get_extractor()
+        prediction_controller = None
+        while True:
+            chunk = await asyncio.to_thread(self.store.pending_items, job_id, self.chunk_size)
+            if not chunk:
+                break
+            if prediction_controller is None:
+                # Loads the models on first use when they were not preloaded
+                prediction_controller = await asyncio.to_thread(self.get_prediction_controller)
+            await self._run_chunk(job_id, chunk, with_probability, extractor, prediction_controller, owner)
+            if not await asyncio.to_thread(self.store.renew, job_id, owner, self.lease):
+                logger.warning(f"Lost the lease on job {job_id}, leaving it to its new owner")
+                return
+        
+        await asyncio.to_thread(self.store.finish, job_id)
+        logger.info(f"Job {job_id} completed")
+    
+    async def _run_chunk(
+        self, job_id: str, chunk: List, with_probability: bool, extractor: ExtractorController,
+        prediction_controller: PredictionController, owner: str
+    ) -> None:
+        """Extract and score one chunk, saving results as each extraction request completes."""
+        
+        positions = [position for position, _ in chunk]
+        texts = [text for _, text in chunk]
+        
+        async for items in extractor.aextract_features_stream(texts, settings.stream_max_in_flight):
+            results = []
+            extracted = []
+            for index, data in items:
+                if isinstance(data, Exception):
+                    results.append((positions[index], 'error', self._error_detail(data)))
+                else:
+                    extracted.append((index, data))
+        
+            if extracted:
+                # Scoring a chunk is CPU-bound, so it runs off the event loop like the store calls
+                predictions = await asyncio.to_thread(
+                    prediction_controller.predict_batch, [data for _, data in extracted], with_probability
+                )
+                for (index, _), prediction in zip(extracted, predictions):
+                    if 'Error' in prediction:
+                        results.append((positions[index], 'error', prediction['Error']))
+                    else:
+                        results.append((positions[index], 'ok', prediction))
+        
+            await asyncio.to_thread(self.store.save_results, job_id, results)
+            await asyncio.to_thread(self.store.renew, job_id, owner, self.lease)
+    
+    def _error_detail(self, error: Exception) -> str:
+        """Message stored for a text that could not be processed."""
+        
+        if isinstance(error, HTTPException):
+            return str(error.detail)
+        return str(error) or type(error).__name__
\ No newline at end of file
@@ -1,147 +1,635 @@
-import numpy as np
-import pandas as pd
-import logging
-from typing import Dict, List
-from fastapi import HTTPException
-from src.models.schemas import CustomerData
-from src.helpers.config import settings
-
-# Configure logger
-logger = logging.getLogger(__name__)
-
-class PredictionController:
-    """
-    Controller class for making churn predictions using the trained model.
-    """
-    
-    def __init__(self):
-        """Initialize the PredictionController."""
-        self.pipe = settings.pipe
-        self.classifier = settings.classifier
-        self.columns = settings.columns
-        self.dtypes = settings.dtypes
-    
-    def _prepare_input_data(self, data: CustomerData) -> pd.DataFrame:
-        """
-        Prepare input data for prediction.
-        """
-        try:
-            # Concatenate all features from pydantic model
-            input_data = np.array([
-                data.CreditScore, 
-                data.Geography, 
-                data.Gender, 
-                data.Age, 
-                data.Tenure, 
-                data.Balance, 
-                data.NumOfProducts, 
-                data.HasCrCard, 
-                data.IsActiveMember, 
-                data.EstimatedSalary
-            ])
-            
-            # Convert to DataFrame with correct data types
-            X_new = pd.DataFrame([input_data], columns=self.columns)
-            X_new = X_new.astype(self.dtypes)
-            
-            logger.debug(f"Prepared input data for prediction: {X_new.shape}")
-            return X_new
-            
-        except Exception as e:
-            logger.error(f"Error preparing input data: {str(e)}")
-            raise
-    
-    def _format_response(self, data: CustomerData, prediction: int, probability: float = None) -> Dict:
-        """
-        Format prediction response.
-        """
-        response = {
-            'Age': data.Age,
-            'CreditScore': data.CreditScore,
-            'Geography': data.Geography,
-            'Gender': data.Gender,
-            'Tenure': data.Tenure,
-            'Balance': data.Balance,
-            'NumOfProducts': data.NumOfProducts,
-            'HasCrCard': data.HasCrCard,
-            'IsActiveMember': data.IsActiveMember,
-            'EstimatedSalary': data.EstimatedSalary,
-            'Prediction': 'Exit' if prediction == 1 else 'Not Exit'
-        }
-        
-        # Add probability if provided
-        if probability is not None:
-            response['Probability'] = round(float(probability), 4)
-        
-        return response
-    
-    def predict_new(self, data: CustomerData) -> Dict:
-        """
-        Makes a churn prediction for new customer data.
-        """
-        logger.info("Making new prediction")
-        
-        try:
-            # Prepare input data
-            X_new = self._prepare_input_data(data)
-            
-            # Apply preprocessing pipeline
-            X_processed = self.pipe.transform(X_new)
-            
-            # Make prediction
-            y_pred = self.classifier.predict(X_processed)[0]
-            
-            # Format and return response
-            response = self._format_response(data, y_pred)
-            logger.info(f"Prediction result: {response['Prediction']}")
-            return response
-            
-        except Exception as e:
-            logger.error(f"Prediction failed: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
-    
-    def predict_batch(self, data_list: List[CustomerData]) -> List[Dict]:
-        """
-        Makes churn predictions for a batch of customer data.
-        """
-        logger.info(f"Making batch prediction for {len(data_list)} customers")
-        
-        try:
-            results = []
-            for i, data in enumerate(data_list):
-                logger.debug(f"Processing item {i+1}/{len(data_list)}")
-                prediction = self.predict_new(data)
-                results.append(prediction)
-            
-            logger.info(f"Successfully completed batch prediction for {len(data_list)} customers")
-            return results
-            
-        except Exception as e:
-            logger.error(f"Batch prediction failed: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}")
-    
-    def predict_with_probability(self, data: CustomerData) -> Dict:
-        """
-        Makes a churn prediction with probability for new customer data.
-        """
-        logger.info("Making prediction with probability")
-        
-        try:
-            # Prepare input data
-            X_new = self._prepare_input_data(data)
-            
-            # Apply preprocessing pipeline
-            X_processed = self.pipe.transform(X_new)
-            
-            # Make prediction with probability
-            y_pred = self.classifier.predict(X_processed)[0]
-            y_prob = self.classifier.predict_proba(X_processed)[0][1]  # Probability of class 1 (Exit)
-            
-            # Format and return response
-            response = self._format_response(data, y_pred, y_prob)
-            logger.info(f"Prediction result: {response['Prediction']} with probability {response['Probability']}")
-            return response
-            
-        except Exception as e:
-            logger.error(f"Prediction with probability failed: {str(e)}")
+import asyncio
+import functools
+import numpy as np
+import pandas as pd
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from fastapi import HTTPException
+from src.models.schemas import CustomerData
+from src.helpers.config import settings
+from src.helpers.cache import LRUCache
+from src.helpers.batching import MicroBatcher
+from src.helpers.registry import ModelBundle
+from src.helpers.metrics import metrics, cache_families
+from src.helpers.drift import DriftMonitor
+from src.helpers.validation import field_rules
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+class PredictionController:
+    """
+    Controller class for making churn predictions using the trained model.
+    """
+    
+    def __init__(self, monitor_drift: Optional[bool] = None):
+        """
+        Initialize the PredictionController.
+        
+        `monitor_drift` overrides settings.drift_monitor; offline users such as score.py and
+        the benchmarks turn it off so they do not feed (or overwrite) the live drift snapshot.
+        """
+        # Every model of the active version; replaced as a whole by swap_models
+        self.models = settings.models
+        self.columns = settings.columns
+        self.dtypes = settings.dtypes
+        self.batch_chunk_size = settings.batch_chunk_size
+        self.decision_threshold = settings.decision_threshold
+        # Memoized probability of Exit per canonical feature vector and model fingerprint
+        self._memo = LRUCache(settings.prediction_memo_size)
+        # Scores concurrent single predictions from the async routes in one pass
+        self._batcher = MicroBatcher(
+            self._score_versioned, settings.micro_batch_max_size, settings.micro_batch_max_wait_us
+        )
+        self._swap_lock = asyncio.Lock()
+        # (forest, feature-to-column matrix) used for explanations, per model fingerprint
+        self._explainers = {}
+        # Labelled CSVs read by threshold_sweep_csv, per path
+        self._labelled_frames = {}
+        self.drift = self._build_drift_monitor() if (
+            settings.drift_monitor if monitor_drift is None else monitor_drift
+        ) else None
+        metrics.register_collector('prediction_memo', lambda: cache_families('prediction_memo', self._memo.stats()))
+    
+    @property
+    def pipe(self):
+        return self.models.pipe
+    
+    @property
+    def classifier(self):
+        return self.models.classifier
+    
+    @property
+    def encoder(self):
+        return self.models.encoder
+    
+    @property
+    def forest(self):
+        return self.models.forest
+    
+    @property
+    def model_version(self) -> str:
+        return self.models.version
+    
+    def reload_models(self) -> None:
+        """
+        Reload the model artifacts from disk and invalidate memoized predictions.
+        """
+        settings.reload_models()
+        self.swap_models(settings.models)
+    
+    def swap_models(self, models: ModelBundle) -> None:
+        """
+        Make `models` the active version.
+        
+        Scoring reads `self.models` once per call, so a single assignment swaps every model
+        at once: calls in progress finish on the version they started with. The drift
+        monitor rescores its probability baseline with `models` on its next report.
+        """
+        self.models = models
+        self._memo.clear()
+        self._explainers.clear()
+        if self.drift is not None:
+            self.drift.set_probability_baseline(
+                functools.partial(self.predict_proba_frame, self._drift_baseline, models)
+            )
+        logger.info(f"Active model version is now {models.version}")
+    
+    async def activate(self, version: str) -> Dict:
+        """
+        Load a registry version, warm it up on a test batch and swap it in.
+        
+        Loading and warm-up run in a worker thread while the current version keeps serving;
+        the swap only happens once the new version has scored the test batch successfully.
+        """
+        async with self._swap_lock:
+            registry = settings.registry
+            
+            def load():
+                frame = pd.read_csv(settings.dataset_path, nrows=settings.model_warmup_rows)
+                return registry.load(version, frame[self.columns].astype(self.dtypes))
+            
+            try:
+                models = await asyncio.to_thread(load)
+            except FileNotFoundError as e:
+                # The missing path stays in the server log, out of the response
+                logger.error(f"Model version {version} not activated: {str(e)}")
+                raise HTTPException(status_code=404, detail=f"Model version '{version}' not found")
+            except ValueError as e:
+                logger.error(f"Model version {version} not activated: {str(e)}")
+                # An invalid version name is the caller's mistake; a failed warm-up conflicts with serving
+                invalid_name = not registry.is_valid_version(version)
+                raise HTTPException(status_code=400 if invalid_name else 409, detail=str(e))
+            
+            previous = self.model_version
+            self.swap_models(models)
+            settings.set_models(models)
+            return {'previous': previous, 'active': models.describe(), 'warm_up': models.warm_up}
+    
+    def model_info(self) -> Dict:
+        """
+        Return the active model version and every version available in the registry.
+        """
+        versions = settings.registry.versions()
+        for version in versions:
+            version['active'] = version['version'] == self.model_version
+        return {'active': self.models.describe(), 'versions': versions}
+    
+    def memo_stats(self) -> Dict:
+        """
+        Return size and hit/miss/eviction counters of the prediction memo.
+        """
+        return {'model_version': self.model_version, **self._memo.stats()}
+    
+    def batching_stats(self) -> Dict:
+        """
+        Return the micro-batching settings with batch-size, queue-depth and wait histograms.
+        """
+        return self._batcher.stats()
+    
+    def _build_drift_monitor(self) -> Optional[DriftMonitor]:
+        """
+        Build the drift monitor with dataset.csv as baseline, or None if the dataset is unavailable.
+        """
+        try:
+            frame = pd.read_csv(settings.dataset_path)[self.columns].astype(self.dtypes)
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"Drift monitor disabled, baseline dataset unavailable: {str(e)}")
+            return None
+        
+        categorical = {name: list(choices) for name, _, choices, *_ in field_rules() if choices is not None}
+        monitor = DriftMonitor(
+            frame,
+            numeric=[column for column in self.columns if column not in categorical],
+            categorical=categorical,
+            bins=settings.drift_bins,
+            window_seconds=settings.drift_window_seconds,
+            windows=settings.drift_windows,
+            snapshot_path=settings.drift_snapshot_path or None
+        )
+        self._drift_baseline = frame
+        # Scoring the 10k rows waits for the first report, off startup and the request path
+        monitor.set_probability_baseline(functools.partial(self.predict_proba_frame, frame, self.models))
+        return monitor
+    
+    def _observe_drift(self, data_list: List[CustomerData], probabilities: np.ndarray) -> None:
+        """
+        Count scored customers in the drift monitor; monitoring never fails a prediction.
+        """
+        if self.drift is None or not data_list:
+            return
+        try:
+            columns = {column: [getattr(data, column) for data in data_list] for column in self.columns}
+            self.drift.observe(columns, probabilities)
+        except Exception as e:
+            logger.warning(f"Drift monitor update failed: {str(e)}")
+    
+    def drift_report(self, detail: bool = False) -> Dict:
+        """
+        Return drift scores of live inputs and probabilities against the training data.
+        """
+        if self.drift is None:
+            raise HTTPException(status_code=404, detail="Drift monitor is disabled, set DRIFT_MONITOR=true")
+        return {'model_version': self.model_version, **self.drift.report(detail)}
+    
+    def _prepare_input_data(self, data: CustomerData) -> pd.DataFrame:
+        """
+        Prepare input data for prediction.
+        """
+        try:
+            # Concatenate all features from pydantic model
+            input_data = np.array([
+                data.CreditScore, 
+                data.Geography, 
+                data.Gender, 
+                data.Age, 
+                data.Tenure, 
+                data.Balance, 
+                data.NumOfProducts, 
+                data.HasCrCard, 
+                data.IsActiveMember, 
+                data.EstimatedSalary
+            ])
+            
+            # Convert to DataFrame with correct data types
+            X_new = pd.DataFrame([input_data], columns=self.columns)
+            X_new = X_new.astype(self.dtypes)
+            
+            logger.debug(f"Prepared input data for prediction: {X_new.shape}")
+            return X_new
+            
+        except Exception as e:
+            logger.error(f"Error preparing input data: {str(e)}")
+            raise
+    
+    def _prepare_batch_data(self, data_list: List[CustomerData]) -> pd.DataFrame:
+        """
+        Prepare a batch of input data as a single columnar frame.
+        """
+        try:
+            # Build one column per feature instead of one row per customer
+            input_data = {
+                column: [getattr(data, column) for data in data_list]
+                for column in self.columns
+            }
+            
+            # Convert to DataFrame with correct data types
+            X_new = pd.DataFrame(input_data, columns=self.columns)
+            X_new = X_new.astype(self.dtypes)
+            
+            logger.debug(f"Prepared batch input data for prediction: {X_new.shape}")
+            return X_new
+            
+        except Exception as e:
+            logger.error(f"Error preparing batch input data: {str(e)}")
+            raise
+    
+    @metrics.timed('transform')
+    def _transform(self, data: CustomerData, models: Optional[ModelBundle] = None) -> np.ndarray:
+        """
+        Turn one customer into the classifier's input row, using the fast encoder when available.
+        """
+        models = models or self.models
+        if models.encoder is not None:
+            return models.encoder.encode(data)
+        return models.pipe.transform(self._prepare_input_data(data))
+    
+    @metrics.timed('transform')
+    def _transform_batch(self, data_list: List[CustomerData], models: Optional[ModelBundle] = None) -> np.ndarray:
+        """
+        Turn a batch of customers into the classifier's input matrix.
+        """
+        models = models or self.models
+        if models.encoder is not None:
+            return models.encoder.encode_batch(data_list)
+        return models.pipe.transform(self._prepare_batch_data(data_list))
+    
+    @metrics.timed('classify')
+    def _classify(self, X_processed: np.ndarray, models: Optional[ModelBundle] = None) -> np.ndarray:
+        """
+        Return the probability of Exit per row, using the compiled forest when available.
+        """
+        models = models or self.models
+        model = models.forest if models.forest is not None else models.classifier
+        return model.predict_proba(X_processed)[:, 1]  # Probability of class 1 (Exit)
+    
+    def _memo_key(self, data: CustomerData, models: ModelBundle) -> Tuple:
+        """
+        Build the memo key from the model fingerprint and the canonicalized features.
+        """
+        return (models.fingerprint,) + tuple(
+            self.dtypes[column](getattr(data, column)) for column in self.columns
+        )
+    
+    def _predict_proba(self, data_list: List[CustomerData], models: Optional[ModelBundle] = None) -> np.ndarray:
+        """
+        Return the probability of Exit per customer, serving repeated profiles from the memo.
+        
+        Misses are scored together with a single transform and predict_proba pass.
+        """
+        models = models or self.models
+        keys = [self._memo_key(data, models) for data in data_list]
+        probabilities = [self._memo.get(key) for key in keys]
+        missing = [i for i, probability in enumerate(probabilities) if probability is None]
+        
+        if missing:
+            if len(missing) == 1:
+                X_processed = self._transform(data_list[missing[0]], models)
+            else:
+                X_processed = self._transform_batch([data_list[i] for i in missing], models)
+            
+            y_prob = self._classify(X_processed, models)
+            for i, probability in zip(missing, y_prob):
+                probabilities[i] = float(probability)
+                self._memo.set(keys[i], probabilities[i])
+        
+        probabilities = np.array(probabilities, dtype=np.float64)
+        self._observe_drift(data_list, probabilities)
+        return probabilities
+    
+    def _apply_threshold(self, probabilities: np.ndarray, threshold: Optional[float] = None) -> np.ndarray:
+        """
+        Turn probabilities of Exit into labels.
+        
+        A customer is labelled Exit when the probability is strictly above the threshold,
+        so the default 0.5 gives exactly the labels of classifier.predict.
+        """
+        threshold = self.decision_threshold if threshold is None else threshold
+        return (probabilities > threshold).astype(int)
+    
+    def score(self, data_list: List[CustomerData], threshold: Optional[float] = None,
+              models: Optional[ModelBundle] = None) -> List[Tuple[int, float]]:
+        """
+        Return (label, probability of Exit) per customer from a single predict_proba pass.
+        
+        This is the one scoring path behind the single, probability and batch predictions;
+        the label comes from the decision threshold (settings.decision_threshold by default).
+        """
+        probabilities = self._predict_proba(data_list, models)
+        labels = self._apply_threshold(probabilities, threshold)
+        return list(zip(labels.tolist(), probabilities.tolist()))
+    
+    def _score_versioned(self, data_list: List[CustomerData]) -> List[Tuple[float, str]]:
+        """
+        Return (probability of Exit, model version) per customer, for the micro-batcher.
+        """
+        models = self.models
+        return [(probability, models.version) for probability in self._predict_proba(data_list, models).tolist()]
+    
+    async def ascore(self, data: CustomerData, threshold: Optional[float] = None) -> Tuple[int, float, str]:
+        """
+        Return (label, probability of Exit, model version) for one customer, micro-batched with concurrent calls.
+        
+        Only the probability goes through the batcher, so callers may use different thresholds.
+        """
+        if self._batcher.max_batch_size <= 1:
+            models = self.models
+            return self.score([data], threshold, models)[0] + (models.version,)
+        probability, version = await self._batcher.submit(data)
+        label = int(self._apply_threshold(np.array([probability]), threshold)[0])
+        return label, probability, version
+    
+    def _predict_chunk(self, data_list: List[CustomerData], with_probability: bool,
+                       threshold: Optional[float] = None, models: Optional[ModelBundle] = None) -> List[Dict]:
+        """
+        Score a chunk of customers with one transform and one classifier call.
+        """
+        models = models or self.models
+        return [
+            self._format_response(data, prediction, probability if with_probability else None, models.version)
+            for data, (prediction, probability) in zip(data_list, self.score(data_list, threshold, models))
+        ]
+    
+    def predict_proba_frame(self, frame: pd.DataFrame, models: Optional[ModelBundle] = None) -> np.ndarray:
+        """
+        Return the probability of Exit for every row of a frame holding the raw customer columns.
+        
+        Rows are expected to be valid already; the memo is bypassed since bulk frames rarely repeat.
+        """
+        models = models or self.models
+        X_new = frame[self.columns].astype(self.dtypes)
+        if models.encoder is not None:
+            X_processed = models.encoder.encode_frame(X_new)
+        else:
+            X_processed = models.pipe.transform(X_new)
+        return self._classify(X_processed, models)
+    
+    def score_frame(self, frame: pd.DataFrame, threshold: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (labels, probabilities of Exit) for a frame, with one transform and one classifier call.
+        """
+        probabilities = self.predict_proba_frame(frame)
+        return self._apply_threshold(probabilities, threshold), probabilities
+    
+    def threshold_sweep(self, frame: pd.DataFrame, y_true: Sequence[int],
+                        thresholds: Optional[Sequence[float]] = None) -> List[Dict]:
+        """
+        Evaluate precision, recall and F1 of Exit for many decision thresholds at once.
+        
+        The frame is scored once; every threshold is then applied in a single vectorized
+        comparison, so sweeping costs little more than one prediction pass.
+        """
+        if thresholds is None:
+            thresholds = np.round(np.arange(0.05, 1.0, 0.05), 2)
+        thresholds = np.asarray(thresholds, dtype=np.float64)
+        y_true = np.asarray(y_true, dtype=int)
+        
+        probabilities = self.predict_proba_frame(frame)
+        
+        # One row of predictions per threshold
+        y_pred = probabilities[np.newaxis, :] > thresholds[:, np.newaxis]
+        positives = y_true == 1
+        tp = (y_pred & positives).sum(axis=1)
+        fp = (y_pred & ~positives).sum(axis=1)
+        fn = (~y_pred & positives).sum(axis=1)
+        
+        precision = np.divide(tp, tp + fp, out=np.zeros(len(thresholds)), where=(tp + fp) > 0)
+        recall = np.divide(tp, tp + fn, out=np.zeros(len(thresholds)), where=(tp + fn) > 0)
+        f1 = np.divide(2 * precision * recall, precision + recall,
+                       out=np.zeros(len(thresholds)), where=(precision + recall) > 0)
+        
+        return [
+            {
+                'Threshold': float(t),
+                'Precision': round(float(p), 4),
+                'Recall': round(float(r), 4),
+                'F1': round(float(f), 4),
+                'PredictedExit': int(tp_i + fp_i)
+            }
+            for t, p, r, f, tp_i, fp_i in zip(thresholds, precision, recall, f1, tp, fp)
+        ]
+    
+    def threshold_sweep_csv(self, csv_path: Path, thresholds: Optional[Sequence[float]] = None,
+                            target: str = 'Exited') -> List[Dict]:
+        """
+        Run threshold_sweep over a labelled CSV shaped like the training dataset.
+        
+        The CSV is read once per path and kept, since sweeps are repeated over the same file.
+        """
+        frame = self._labelled_frames.get(str(csv_path))
+        if frame is None:
+            frame = self._labelled_frames[str(csv_path)] = pd.read_csv(csv_path)
+        return self.threshold_sweep(frame, frame[target], thresholds)
+    
+    def _format_error(self, index: int, error: Exception) -> Dict:
+        """
+        Format the result of a row that failed inside a batch.
+        """
+        return {
+            'Index': index,
+            'Error': str(error)
+        }
+    
+    def _format_response(self, data: CustomerData, prediction: int, probability: float = None,
+                         version: Optional[str] = None) -> Dict:
+        """
+        Format prediction response.
+        """
+        response = {
+            'Age': data.Age,
+            'CreditScore': data.CreditScore,
+            'Geography': data.Geography,
+            'Gender': data.Gender,
+            'Tenure': data.Tenure,
+            'Balance': data.Balance,
+            'NumOfProducts': data.NumOfProducts,
+            'HasCrCard': data.HasCrCard,
+            'IsActiveMember': data.IsActiveMember,
+            'EstimatedSalary': data.EstimatedSalary,
+            'Prediction': 'Exit' if prediction == 1 else 'Not Exit'
+        }
+        
+        # Add probability if provided
+        if probability is not None:
+            response['Probability'] = round(float(probability), 4)
+        
+        response['ModelVersion'] = version or self.model_version
+        
+        return response
+    
+    def predict_new(self, data: CustomerData, threshold: Optional[float] = None) -> Dict:
+        """
+        Makes a churn prediction for new customer data.
+        """
+        logger.info("Making new prediction")
+        
+        try:
+            # Score (memoized, single predict_proba pass)
+            models = self.models
+            y_pred, _ = self.score([data], threshold, models)[0]
+            
+            # Format and return response
+            response = self._format_response(data, y_pred, version=models.version)
+            logger.info(f"Prediction result: {response['Prediction']}")
+            return response
+            
+        except Exception as e:
+            logger.error(f"Prediction failed: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+    
+    async def apredict_new(self, data: CustomerData, threshold: Optional[float] = None) -> Dict:
+        """
+        Makes a churn prediction for new customer data from the event loop, micro-batched.
+        """
+        logger.info("Making prediction (micro-batched)")
+        
+        try:
+            y_pred, _, version = await self.ascore(data, threshold)
+            response = self._format_response(data, y_pred, version=version)
+            logger.info(f"Prediction result: {response['Prediction']}")
+            return response
+            
+        except Exception as e:
+            logger.error(f"Prediction failed: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+    
+    def predict_batch(self, data_list: List[CustomerData], with_probability: bool = False,
+                      threshold: Optional[float] = None) -> List[Dict]:
+        """
+        Makes churn predictions for a batch of customer data.
+        
+        Customers are scored in chunks of `batch_chunk_size` rows, each chunk with a single
+        transform and classifier call. If a chunk fails, its rows are retried one by one so
+        that only the offending rows are reported (with their `Index` and `Error`).
+        """
+        logger.info(f"Making batch prediction for {len(data_list)} customers")
+        
+        try:
+            # The whole batch is scored by the version active when it started
+            models = self.models
+            results = []
+            failed = 0
+            for start in range(0, len(data_list), self.batch_chunk_size):
+                chunk = data_list[start:start + self.batch_chunk_size]
+                logger.debug(f"Processing items {start+1}-{start+len(chunk)}/{len(data_list)}")
+                
+                try:
+                    results.extend(self._predict_chunk(chunk, with_probability, threshold, models))
+                    continue
+                except Exception as e:
+                    logger.warning(f"Chunk starting at item {start} failed, isolating rows: {str(e)}")
+                
+                # Fall back to row-by-row scoring to find the failing rows
+                for offset, data in enumerate(chunk):
+                    try:
+                        results.extend(self._predict_chunk([data], with_probability, threshold, models))
+                    except Exception as e:
+                        logger.error(f"Prediction failed for item {start+offset}: {str(e)}")
+                        results.append(self._format_error(start + offset, e))
+                        failed += 1
+            
+            logger.info(f"Completed batch prediction for {len(data_list)} customers ({failed} failed)")
+            return results
+            
+        except Exception as e:
+            logger.error(f"Batch prediction failed: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}")
+    
+    def _explainer(self, models: ModelBundle) -> Tuple:
+        """
+        Return the compiled forest and the matrix mapping its input features to `self.columns`.
+        
+        Bundles loaded without the compiled forest or the fast encoder get them built once here.
+        """
+        explainer = self._explainers.get(models.fingerprint)
+        if explainer is None:
+            from src.helpers.encoder import FeatureEncoder
+            from src.helpers.forest import CompiledForest
+            forest = models.forest or CompiledForest.from_classifier(models.classifier)
+            encoder = models.encoder or FeatureEncoder.from_pipeline(models.pipe)
+            explainer = self._explainers[models.fingerprint] = (forest, encoder.column_matrix(self.columns))
+        return explainer
+    
+    @metrics.timed('explain')
+    def explain(self, data_list: List[CustomerData], threshold: Optional[float] = None,
+                top: Optional[int] = None) -> List[Dict]:
+        """
+        Makes churn predictions with per-feature contributions to the probability of Exit.
+        
+        Contributions come from the forest's decision paths (every split credits its feature
+        with the change in the probability of Exit, averaged over the trees) and are summed
+        back onto the raw columns through the one-hot and scaling layout, so `BaseValue`
+        plus the contributions equals `Probability`. They are sorted by absolute size and
+        cut to the `top` largest when given.
+        """
+        logger.info(f"Explaining predictions for {len(data_list)} customers")
+        
+        try:
+            models = self.models
+            forest, column_matrix = self._explainer(models)
+            X_processed = self._transform_batch(data_list, models)
+            bias, contributions = forest.contributions(X_processed, class_index=1)
+            by_column = contributions @ column_matrix
+            probabilities = bias + contributions.sum(axis=1)
+            self._observe_drift(data_list, probabilities)
+            labels = self._apply_threshold(probabilities, threshold)
+            
+            results = []
+            for data, label, probability, base, row in zip(data_list, labels, probabilities, bias, by_column):
+                order = np.argsort(-np.abs(row), kind='stable')[:top]
+                response = self._format_response(data, label, probability, models.version)
+                response['BaseValue'] = round(float(base), 4)
+                response['Contributions'] = {self.columns[index]: round(float(row[index]), 4) for index in order}
+                results.append(response)
+            return results
+            
+        except Exception as e:
+            logger.error(f"Explanation failed: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Explanation failed: {str(e)}")
+    
+    def predict_with_probability(self, data: CustomerData, threshold: Optional[float] = None) -> Dict:
+        """
+        Makes a churn prediction with probability for new customer data.
+        """
+        logger.info("Making prediction with probability")
+        
+        try:
+            # Score (memoized, single predict_proba pass)
+            models = self.models
+            y_pred, y_prob = self.score([data], threshold, models)[0]
+            
+            # Format and return response
+            response = self._format_response(data, y_pred, y_prob, models.version)
+            logger.info(f"Prediction result: {response['Prediction']} with probability {response['Probability']}")
+            return response
+            
+        except Exception as e:
+            logger.error(f"Prediction with probability failed: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+    
+    async def apredict_with_probability(self, data: CustomerData, threshold: Optional[float] = None) -> Dict:
+        """
+        Makes a churn prediction with probability from the event loop, micro-batched.
+        """
+        logger.info("Making prediction with probability (micro-batched)")
+        
+        try:
+            y_pred, y_prob, version = await self.ascore(data, threshold)
+            response = self._format_response(data, y_pred, y_prob, version)
+            logger.info(f"Prediction result: {response['Prediction']} with probability {response['Probability']}")
+            return response
+            
+        except Exception as e:
+            logger.error(f"Prediction with probability failed: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
\ No newline at end of file
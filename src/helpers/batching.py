@@ -0,0 +1,94 @@
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Sequence
+from src.helpers.metrics import Histogram, exponential_buckets
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """
+    Gathers items submitted concurrently on the event loop and scores them in one call.
+
+    A batch is flushed as soon as `max_batch_size` items are waiting, or `max_wait_us`
+    microseconds after the first item of the batch arrived, whichever comes first. The
+    scoring function takes a list of items and returns one result per item; if it fails
+    for a batch, the items are scored one by one so a bad item only fails its own caller.
+    """
+
+    def __init__(self, score_batch: Callable[[List[Any]], Sequence[Any]], max_batch_size: int, max_wait_us: float):
+        """Initialize the batcher around a synchronous batch scoring function."""
+        self.score_batch = score_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_us) / 1e6
+        self._pending: List = []  # (item, future, submitted_at)
+        self._timer = None
+        # Tuning signals for the latency/throughput trade-off
+        self.batch_sizes = Histogram(exponential_buckets(1, 2, 11))        # 1 .. 1024 items
+        self.queue_depths = Histogram(exponential_buckets(1, 2, 11))       # items waiting on arrival
+        self.wait_us = Histogram(exponential_buckets(10, 2, 14))           # 10us .. ~80ms
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+        self.queue_depths.observe(len(self._pending))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        """Score up to max_batch_size waiting items and resolve their futures."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch = self._pending[:self.max_batch_size]
+        del self._pending[:self.max_batch_size]
+        if self._pending:
+            # Items beyond this batch start their own window
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+
+        # Callers that gave up (e.g. disconnected clients) are not scored
+        batch = [entry for entry in batch if not entry[1].done()]
+        if not batch:
+            return
+
+        now = time.perf_counter()
+        self.batch_sizes.observe(len(batch))
+        for _, _, submitted_at in batch:
+            self.wait_us.observe((now - submitted_at) * 1e6)
+
+        try:
+            results = self.score_batch([item for item, _, _ in batch])
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+            return
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            logger.warning(f"Micro-batch of {len(batch)} items failed, scoring one by one: {str(e)}")
+
+        for item, future, _ in batch:
+            try:
+                future.set_result(self.score_batch([item])[0])
+            except Exception as e:
+                future.set_exception(e)
+
+    def stats(self) -> Dict:
+        """Return the batching settings and the batch-size, queue-depth and wait-time histograms."""
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_us': round(self.max_wait * 1e6, 1),
+            'pending': len(self._pending),
+            'batch_size': self.batch_sizes.stats(),
+            'queue_depth': self.queue_depths.stats(),
+            'wait_us': self.wait_us.stats()
+        }
\ No newline at end of file
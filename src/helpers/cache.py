@@ -0,0 +1,243 @@
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from pathlib import Path
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from src.models.schemas import CustomerData
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Writes between two prunes of the on-disk cache
+_PRUNE_EVERY = 256
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache with optional TTL and size-based eviction.
+    """
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None):
+        """Initialize the cache with a maximum number of entries and an optional TTL in seconds."""
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value, evicting the least recently used entries beyond max_size."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries, keeping the counters."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        """Return size and hit/miss/eviction counters."""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class SQLiteCache:
+    """
+    On-disk key/value cache backed by SQLite, so entries survive restarts.
+
+    Expired entries, and the oldest entries beyond `max_entries`, are deleted when the
+    cache is opened and every few hundred writes, so the file does not grow without bound.
+    """
+
+    def __init__(self, path: Path, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        """Open (or create) the cache database at the given path."""
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_stored_at ON cache (stored_at)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._writes = 0
+        with self._lock:
+            self._prune()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            row = self._conn.execute("SELECT value, stored_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, stored_at = row
+            if self.ttl is not None and time.time() - stored_at > self.ttl:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        """Store a value, replacing any previous entry for the key."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, value, time.time())
+            )
+            self._conn.commit()
+            self._writes += 1
+            if self._writes % _PRUNE_EVERY == 0:
+                self._prune()
+
+    def _prune(self) -> None:
+        """Delete expired entries, then the oldest ones beyond max_entries; called with the lock held."""
+        if self.ttl is not None:
+            deleted = self._conn.execute("DELETE FROM cache WHERE stored_at < ?", (time.time() - self.ttl,))
+            self.expirations += deleted.rowcount
+        if self.max_entries is not None:
+            deleted = self._conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                (max(0, self.max_entries),)
+            )
+            self.evictions += deleted.rowcount
+        self._conn.commit()
+
+    def close(self) -> None:
+        """Close the underlying connection."""
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict:
+        """Return size and hit/miss/eviction counters."""
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        return {
+            'size': size,
+            'max_size': self.max_entries,
+            'path': str(self.path),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+
+class ExtractionCache:
+    """
+    Two-tier cache from customer description text to validated CustomerData.
+
+    Keys are content addressed: a hash of the normalized text, the model name and the
+    prompt version, so a prompt or model change never serves stale extractions.
+    """
+
+    def __init__(self, memory: LRUCache, model: str, prompt_version: str, disk: Optional[SQLiteCache] = None):
+        """Initialize the cache tiers."""
+        self.memory = memory
+        self.disk = disk
+        self.model = model
+        self.prompt_version = prompt_version
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalize text so trivially different descriptions share a key."""
+        text = unicodedata.normalize('NFKC', text).casefold()
+        return ' '.join(text.split())
+
+    def key(self, text: str) -> str:
+        """Build the content-addressed key for a text."""
+        payload = '\x1f'.join([self.model, self.prompt_version, self.normalize(text)])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, text: str) -> Optional[CustomerData]:
+        """Look up a text in memory, then on disk (promoting disk hits to memory)."""
+        key = self.key(text)
+        data = self.memory.get(key)
+        if data is not None:
+            return data.model_copy()
+
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                try:
+                    data = CustomerData.model_validate_json(value)
+                except ValueError as e:
+                    logger.warning(f"Discarding invalid disk cache entry: {str(e)}")
+                    return None
+                self.memory.set(key, data)
+                return data.model_copy()
+
+        return None
+
+    def set(self, text: str, data: CustomerData) -> None:
+        """Store validated customer data for a text in every tier."""
+        key = self.key(text)
+        self.memory.set(key, data.model_copy())
+        if self.disk is not None:
+            try:
+                self.disk.set(key, data.model_dump_json())
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to write disk cache entry: {str(e)}")
+
+    def stats(self) -> Dict:
+        """Return counters for every tier."""
+        return {
+            'model': self.model,
+            'prompt_version': self.prompt_version,
+            'memory': self.memory.stats(),
+            'disk': self.disk.stats() if self.disk is not None else None
+        }
\ No newline at end of file
@@ -1,96 +1,269 @@
-import os
-import joblib
-import logging
-from pathlib import Path
-from dotenv import load_dotenv
-import openai
-
-# Configure logger
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-
-class Settings:
-    """Application settings and configurations."""
-    
-    def __init__(self):
-        """Initialize settings from environment variables."""
-        # Load environment variables
-        load_dotenv(override=True)
-        
-        # API settings
-        self.api_name = os.getenv('API_NAME', 'Churn-Detection-Model')
-        self.api_port = int(os.getenv('API_PORT', 8000))
-        self.api_description = os.getenv('API_DESCRIPTION', 'Churn Detection Model API')
-        self.api_secret_key = os.getenv('API_SECRET_KEY', '')
-        
-        # Paths
-        self.base_dir = Path(__file__).resolve().parent.parent
-        self.assets_folder = self.base_dir / 'assets'
-        
-        # Model paths
-        self.preprocessor_path = self.assets_folder / 'preprocessor.pkl'
-        self.classifier_path = self.assets_folder / 'Tuned-RF-with-SMOTE.pkl'
-        
-        # OpenAI settings
-        self.openai_api_key = os.getenv('OPENAI_API_KEY')
-        self.openai_model = 'gpt-4o-mini'
-        
-        # Initialize OpenAI client
-        self._initialize_openai()
-        
-        # Load ML models
-        self._load_ml_models()
-        
-        # Define constants
-        self.columns = [
-            'CreditScore', 'Geography', 'Gender', 'Age', 'Tenure', 'Balance', 
-            'NumOfProducts', 'HasCrCard', 'IsActiveMember', 'EstimatedSalary'
-        ]
-        
-        self.dtypes = {
-            'CreditScore': float,
-            'Geography': str,
-            'Gender': str,
-            'Age': int,
-            'Tenure': int,
-            'Balance': float,
-            'NumOfProducts': int,
-            'HasCrCard': int,  # Changed from bool to int to match post-processing
-            'IsActiveMember': int,  # Changed from bool to int to match post-processing
-            'EstimatedSalary': float
-        }
-    
-    def _initialize_openai(self):
-        """Initialize OpenAI client."""
-        # Check if API key is provided
-        if not self.openai_api_key:
-            logger.warning("OPENAI_API_KEY not found in environment variables")
-            raise ValueError("OpenAI API key is required")
-        
-        # Initialize OpenAI client
-        try:
-            openai.api_key = self.openai_api_key
-            self.client = openai.OpenAI(api_key=self.openai_api_key)
-            logger.info(f"Successfully initialized OpenAI client with model {self.openai_model}")
-        except Exception as e:
-            logger.error(f"Error initializing OpenAI client: {str(e)}")
-            raise
-    
-    def _load_ml_models(self):
-        """Load ML pipeline and classifier models."""
-        try:
-            self.pipe = joblib.load(self.preprocessor_path)
-            self.classifier = joblib.load(self.classifier_path)
-            logger.info("Successfully loaded preprocessor and classifier models")
-        except FileNotFoundError as e:
-            logger.error(f"Model file not found: {str(e)}")
-            raise
-        except Exception as e:
-            logger.error(f"Error loading models: {str(e)}")
-            raise
-
-# Create settings instance
+import os
+import logging
+import threading
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Configure logger
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+class Settings:
+    """
+    Application settings and configurations.
+    
+    Models and OpenAI clients are not created at import time: they are loaded on first
+    access (or explicitly via `load_models` / `initialize_openai`), so modules can be
+    imported without credentials and models can be preloaded before forking workers.
+    """
+    
+    # Attributes created lazily by _load_ml_models and _initialize_openai
+    _model_attributes = frozenset({'models', 'pipe', 'classifier', 'encoder', 'forest', 'model_version'})
+    _client_attributes = frozenset({'client', 'async_client'})
+    
+    def __init__(self):
+        """Initialize settings from environment variables."""
+        self._lock = threading.RLock()
+        
+        # Load environment variables
+        load_dotenv(override=True)
+        
+        # API settings
+        self.api_name = os.getenv('API_NAME', 'Churn-Detection-Model')
+        self.api_port = int(os.getenv('API_PORT', 8000))
+        self.api_description = os.getenv('API_DESCRIPTION', 'Churn Detection Model API')
+        self.api_secret_key = os.getenv('API_SECRET_KEY', '')
+        
+        # Paths
+        self.base_dir = Path(__file__).resolve().parent.parent
+        self.assets_folder = self.base_dir / 'assets'
+        self.dataset_path = self.base_dir / 'notebooks' / 'data' / 'dataset.csv'
+        
+        # Model paths
+        self.preprocessor_path = self.assets_folder / 'preprocessor.pkl'
+        self.classifier_path = self.assets_folder / 'Tuned-RF-with-SMOTE.pkl'
+        # Registry version loaded at startup: 'base' is the pair above, others live in assets/models/<version>/
+        self.model_version_name = os.getenv('MODEL_VERSION', 'base')
+        # Map the cached compiled forest arrays instead of copying them, so workers share the pages
+        self.model_memory_map = os.getenv('MODEL_MEMORY_MAP', 'true').lower() == 'true'
+        # Rows of the dataset scored by a new model version before it is swapped in
+        self.model_warmup_rows = int(os.getenv('MODEL_WARMUP_ROWS', 256))
+        
+        # OpenAI settings
+        self.openai_api_key = os.getenv('OPENAI_API_KEY')
+        self.openai_model = 'gpt-4o-mini'
+        self.openai_base_url = os.getenv('OPENAI_BASE_URL') or None
+        
+        # Extraction settings
+        self.extraction_concurrency = int(os.getenv('EXTRACTION_CONCURRENCY', 8))
+        self.extraction_timeout = float(os.getenv('EXTRACTION_TIMEOUT', 30.0))
+        self.extraction_max_retries = int(os.getenv('EXTRACTION_MAX_RETRIES', 3))
+        self.extraction_backoff_base = float(os.getenv('EXTRACTION_BACKOFF_BASE', 0.5))
+        # HTTP connection pool of the OpenAI clients
+        self.openai_max_connections = int(os.getenv('OPENAI_MAX_CONNECTIONS', 64))
+        self.openai_max_keepalive = int(os.getenv('OPENAI_MAX_KEEPALIVE', 32))
+        self.openai_keepalive_expiry = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', 60.0))
+        self.openai_connect_timeout = float(os.getenv('OPENAI_CONNECT_TIMEOUT', 5.0))
+        # Hedged requests: up to EXTRACTION_HEDGE_MAX duplicates of an attempt still pending after
+        # the EXTRACTION_HEDGE_QUANTILE of recent latencies (0 disables hedging)
+        self.extraction_hedge_max = int(os.getenv('EXTRACTION_HEDGE_MAX', 1))
+        self.extraction_hedge_quantile = float(os.getenv('EXTRACTION_HEDGE_QUANTILE', 0.95))
+        # Circuit breaker: opens for BREAKER_COOLDOWN seconds when at least BREAKER_MIN_CALLS attempts
+        # in the last BREAKER_WINDOW seconds failed at a rate of BREAKER_ERROR_RATE or more
+        self.breaker_window = float(os.getenv('BREAKER_WINDOW', 30.0))
+        self.breaker_error_rate = float(os.getenv('BREAKER_ERROR_RATE', 0.5))
+        self.breaker_min_calls = int(os.getenv('BREAKER_MIN_CALLS', 20))
+        self.breaker_cooldown = float(os.getenv('BREAKER_COOLDOWN', 15.0))
+        # Number of texts extracted per chat completion on the batch path (1 disables batched prompting)
+        self.extraction_batch_size = max(1, int(os.getenv('EXTRACTION_BATCH_SIZE', 1)))
+        # Completion token budget of an extraction request: a base plus an allowance per customer
+        self.extraction_tokens_base = int(os.getenv('EXTRACTION_TOKENS_BASE', 32))
+        self.extraction_tokens_per_customer = int(os.getenv('EXTRACTION_TOKENS_PER_CUSTOMER', 100))
+        # Extraction requests a streaming batch keeps scheduled at once (backpressure)
+        self.stream_max_in_flight = max(1, int(os.getenv('STREAM_MAX_IN_FLIGHT', 16)))
+        # Read templated descriptions with the rule extractor before calling the LLM, and send
+        # this share of the texts it reads completely to the LLM as well to measure agreement
+        self.rule_extraction = os.getenv('RULE_EXTRACTION', 'true').lower() == 'true'
+        self.rule_verify_rate = float(os.getenv('RULE_VERIFY_RATE', 0.0))
+        
+        # Batch size limits: larger submissions go through the background job API
+        self.batch_max_texts = int(os.getenv('BATCH_MAX_TEXTS', 1000))
+        self.job_max_texts = int(os.getenv('JOB_MAX_TEXTS', 100000))
+        
+        # Background job settings (jobs are stored in SQLite so they resume after a restart)
+        self.job_db_path = Path(os.getenv('JOB_DB_PATH', self.base_dir.parent / 'data' / 'jobs.db'))
+        self.job_workers = int(os.getenv('JOB_WORKERS', 2))
+        self.job_chunk_size = int(os.getenv('JOB_CHUNK_SIZE', 100))
+        # A job whose worker stopped renewing its lease for this long is taken over by another
+        self.job_lease_seconds = float(os.getenv('JOB_LEASE_SECONDS', 60))
+        self.job_poll_interval = float(os.getenv('JOB_POLL_INTERVAL', 1.0))
+        
+        # Drift monitor: live inputs and scores against dataset.csv, in a ring of DRIFT_WINDOWS
+        # windows of DRIFT_WINDOW_SECONDS, saved to DRIFT_SNAPSHOT_PATH (empty: not saved)
+        self.drift_monitor = os.getenv('DRIFT_MONITOR', 'true').lower() == 'true'
+        self.drift_bins = int(os.getenv('DRIFT_BINS', 10))
+        self.drift_window_seconds = float(os.getenv('DRIFT_WINDOW_SECONDS', 3600))
+        self.drift_windows = int(os.getenv('DRIFT_WINDOWS', 24))
+        self.drift_snapshot_path = os.getenv('DRIFT_SNAPSHOT_PATH', str(self.base_dir.parent / 'data' / 'drift.json'))
+        self.drift_snapshot_interval = float(os.getenv('DRIFT_SNAPSHOT_INTERVAL', 60))
+        
+        # Extraction cache settings (an empty path disables the on-disk tier, a disk size of 0 lifts its row cap)
+        self.extraction_cache_size = int(os.getenv('EXTRACTION_CACHE_SIZE', 4096))
+        self.extraction_cache_ttl = float(os.getenv('EXTRACTION_CACHE_TTL', 86400))
+        self.extraction_cache_path = os.getenv('EXTRACTION_CACHE_PATH', '')
+        self.extraction_cache_disk_size = int(os.getenv('EXTRACTION_CACHE_DISK_SIZE', 100000))
+        
+        # Prediction settings
+        self.batch_chunk_size = int(os.getenv('BATCH_CHUNK_SIZE', 1000))
+        self.use_fast_encoder = os.getenv('USE_FAST_ENCODER', 'true').lower() == 'true'
+        self.prediction_memo_size = int(os.getenv('PREDICTION_MEMO_SIZE', 10000))
+        # Concurrent single predictions arriving within the wait window are scored together
+        # (a max size of 1 disables micro-batching)
+        self.micro_batch_max_size = int(os.getenv('MICRO_BATCH_MAX_SIZE', 32))
+        self.micro_batch_max_wait_us = float(os.getenv('MICRO_BATCH_MAX_WAIT_US', 500))
+        # Score with the array-backed forest; a depth cut or float32 leaf values shrink it but are lossy
+        self.use_compiled_forest = os.getenv('USE_COMPILED_FOREST', 'true').lower() == 'true'
+        self.forest_max_depth = int(os.getenv('FOREST_MAX_DEPTH')) if os.getenv('FOREST_MAX_DEPTH') else None
+        self.forest_quantize = os.getenv('FOREST_QUANTIZE', 'false').lower() == 'true'
+        # Customers are labelled Exit when the probability of Exit is above this threshold
+        self.decision_threshold = float(os.getenv('DECISION_THRESHOLD', 0.5))
+        if not 0.0 <= self.decision_threshold <= 1.0:
+            raise ValueError("DECISION_THRESHOLD must be between 0 and 1")
+        
+        # Profiling settings (opt-in: samples the serving thread's stack every interval)
+        self.profiler_enabled = os.getenv('PROFILER_ENABLED', 'false').lower() == 'true'
+        self.profiler_interval_ms = float(os.getenv('PROFILER_INTERVAL_MS', 5))
+        
+        # Startup settings
+        # Load the models in the startup hook instead of on the first request
+        self.preload_models = os.getenv('PRELOAD_MODELS', 'true').lower() == 'true'
+        # Load the models when main is imported, before a pre-forking server starts its workers
+        self.preload_before_fork = os.getenv('PRELOAD_BEFORE_FORK', 'false').lower() == 'true'
+        
+        # Define constants
+        self.columns = [
+            'CreditScore', 'Geography', 'Gender', 'Age', 'Tenure', 'Balance', 
+            'NumOfProducts', 'HasCrCard', 'IsActiveMember', 'EstimatedSalary'
+        ]
+        
+        self.dtypes = {
+            'CreditScore': float,
+            'Geography': str,
+            'Gender': str,
+            'Age': int,
+            'Tenure': int,
+            'Balance': float,
+            'NumOfProducts': int,
+            'HasCrCard': int,  # Changed from bool to int to match post-processing
+            'IsActiveMember': int,  # Changed from bool to int to match post-processing
+            'EstimatedSalary': float
+        }
+    
+    def __getattr__(self, name):
+        """Lazily load models and OpenAI clients the first time they are accessed."""
+        if name in Settings._model_attributes:
+            self.load_models()
+        elif name in Settings._client_attributes:
+            self.initialize_openai()
+        else:
+            raise AttributeError(f"'Settings' object has no attribute '{name}'")
+        return self.__dict__[name]
+    
+    @property
+    def models_loaded(self) -> bool:
+        """Whether the ML models have been loaded."""
+        return 'classifier' in self.__dict__
+    
+    @property
+    def openai_initialized(self) -> bool:
+        """Whether the OpenAI clients have been created."""
+        return 'client' in self.__dict__
+    
+    def load_models(self):
+        """Load the ML models once (thread-safe)."""
+        with self._lock:
+            if not self.models_loaded:
+                self._load_ml_models()
+    
+    def initialize_openai(self):
+        """Create the OpenAI clients once (thread-safe)."""
+        with self._lock:
+            if not self.openai_initialized:
+                self._initialize_openai()
+    
+    def _initialize_openai(self):
+        """Initialize OpenAI client."""
+        # Check if API key is provided
+        if not self.openai_api_key:
+            logger.warning("OPENAI_API_KEY not found in environment variables")
+            raise ValueError("OpenAI API key is required")
+        
+        # Initialize OpenAI client
+        try:
+            import openai
+            from src.helpers.transport import build_http_client
+            openai.api_key = self.openai_api_key
+            pool = dict(
+                max_connections=self.openai_max_connections,
+                max_keepalive=self.openai_max_keepalive,
+                keepalive_expiry=self.openai_keepalive_expiry,
+                connect_timeout=self.openai_connect_timeout,
+                read_timeout=self.extraction_timeout,
+            )
+            # Retries are handled by the extractor's transport so they can be bounded per call
+            self.client = openai.OpenAI(
+                api_key=self.openai_api_key,
+                base_url=self.openai_base_url,
+                max_retries=0,
+                http_client=build_http_client(asynchronous=False, **pool)
+            )
+            self.async_client = openai.AsyncOpenAI(
+                api_key=self.openai_api_key,
+                base_url=self.openai_base_url,
+                max_retries=0,
+                http_client=build_http_client(asynchronous=True, **pool)
+            )
+            logger.info(f"Successfully initialized OpenAI client with model {self.openai_model}")
+        except Exception as e:
+            logger.error(f"Error initializing OpenAI client: {str(e)}")
+            raise
+    
+    @property
+    def registry(self):
+        """The versioned model registry under the assets folder."""
+        from src.helpers.registry import ModelRegistry
+        
+        return ModelRegistry(
+            self.assets_folder,
+            use_fast_encoder=self.use_fast_encoder,
+            use_compiled_forest=self.use_compiled_forest,
+            forest_max_depth=self.forest_max_depth,
+            forest_quantize=self.forest_quantize,
+            memory_map=self.model_memory_map,
+        )
+    
+    def _load_ml_models(self):
+        """Load the configured model version from the registry."""
+        self.set_models(self.registry.load(self.model_version_name))
+    
+    def set_models(self, models):
+        """Make a loaded ModelBundle the one new controllers pick up."""
+        self.pipe = models.pipe
+        self.encoder = models.encoder
+        self.forest = models.forest
+        self.model_version = models.version
+        self.models = models
+        # The classifier is assigned last since its presence marks the models as loaded
+        self.classifier = models.classifier
+        logger.info(f"Successfully loaded preprocessor and classifier models (version {self.model_version})")
+    
+    def reload_models(self):
+        """Reload the ML models from disk (thread-safe)."""
+        with self._lock:
+            self._load_ml_models()
+
+# Create settings instance
 settings = Settings()
\ No newline at end of file
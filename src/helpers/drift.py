@@ -0,0 +1,343 @@
+import os
+import json
+import bisect
+import time
+import logging
+import tempfile
+import contextlib
+import threading
+import collections
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Floor for empty bins in the PSI, so a bin seen on one side only gives a large but finite term
+_PSI_EPSILON = 1e-4
+# Batches up to this size are counted value by value, which beats NumPy's per-call overhead
+_SMALL_BATCH = 16
+# Conventional PSI bands: below 0.1 stable, up to 0.25 moderate shift, above significant
+_PSI_BANDS = ((0.1, 'stable'), (0.25, 'moderate'))
+
+def _status(psi: float) -> str:
+    for bound, status in _PSI_BANDS:
+        if psi < bound:
+            return status
+    return 'significant'
+
+def psi(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Population stability index between two count vectors over the same bins."""
+    expected = np.maximum(expected / max(expected.sum(), 1), _PSI_EPSILON)
+    actual = np.maximum(actual / max(actual.sum(), 1), _PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+def ks(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Kolmogorov-Smirnov distance between two count vectors over the same ordered bins."""
+    if not expected.sum() or not actual.sum():
+        return 0.0
+    return float(np.max(np.abs(np.cumsum(expected) / expected.sum() - np.cumsum(actual) / actual.sum())))
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Sketch:
+    """
+    Fixed-size counts of every monitored field over one time window.
+
+    Numeric fields are counted in the bins given by `edges` (value v lands in the first bin
+    whose upper edge is >= v, plus one overflow bin); categorical fields in one slot per
+    known category plus one for anything else. Sketches with the same layout merge by
+    adding their counts.
+    """
+
+    def __init__(self, edges: Dict[str, np.ndarray], categories: Dict[str, List[str]], start: Optional[float] = None):
+        self.edges = edges
+        self.categories = categories
+        self.start = time.time() if start is None else start
+        self.counts = {field: np.zeros(len(field_edges) + 1, dtype=np.int64) for field, field_edges in edges.items()}
+        self.counts.update({field: np.zeros(len(values) + 1, dtype=np.int64) for field, values in categories.items()})
+        self._slots = {field: {value: index for index, value in enumerate(values)} for field, values in categories.items()}
+        self._edge_lists = {field: field_edges.tolist() for field, field_edges in edges.items()}
+
+    def add(self, columns: Dict[str, Sequence]) -> None:
+        """Count a batch given as column-oriented values; fields not in `columns` are skipped."""
+        for field, field_edges in self.edges.items():
+            if field not in columns:
+                continue
+            values = columns[field]
+            if len(values) <= _SMALL_BATCH:
+                counts, edge_list = self.counts[field], self._edge_lists[field]
+                for value in values:
+                    counts[bisect.bisect_left(edge_list, value)] += 1
+            else:
+                bins = np.searchsorted(field_edges, np.asarray(values, dtype=np.float64), side='left')
+                self.counts[field] += np.bincount(bins, minlength=len(field_edges) + 1)
+        for field, slots in self._slots.items():
+            if field in columns:
+                counts = self.counts[field]
+                for value in columns[field]:
+                    counts[slots.get(value, len(slots))] += 1
+
+    def merge(self, other: "Sketch") -> "Sketch":
+        """Add the counts of another sketch with the same layout."""
+        for field, counts in other.counts.items():
+            self.counts[field] += counts
+        self.start = min(self.start, other.start)
+        return self
+
+    def to_dict(self) -> Dict:
+        return {'start': self.start, 'counts': {field: counts.tolist() for field, counts in self.counts.items()}}
+
+    @classmethod
+    def from_dict(cls, state: Dict, edges: Dict[str, np.ndarray], categories: Dict[str, List[str]]) -> "Sketch":
+        sketch = cls(edges, categories, state['start'])
+        for field, counts in state['counts'].items():
+            if field not in sketch.counts or len(counts) != len(sketch.counts[field]):
+                raise ValueError(f"Snapshot layout of '{field}' does not match the baseline")
+            sketch.counts[field] = np.asarray(counts, dtype=np.int64)
+        return sketch
+
+
+class DriftMonitor:
+    """
+    Online comparison of live inputs and scores against the training data.
+
+    The baseline is the training CSV counted into bins cut at its own quantiles (or at each
+    value for fields with few distinct values), plus the model's probabilities on it in
+    fixed-width bins. Live traffic is counted into the same bins, in a ring of `windows`
+    sketches of `window_seconds` each, so memory stays fixed and old traffic ages out.
+    Drift scores (PSI, and KS for ordered fields) compare the merged ring with the baseline;
+    windows started more than `windows * window_seconds` ago are left out, so a quiet
+    period does not keep stale traffic in the report.
+
+    The ring belongs to one process: each worker keeps its own `<stem>.<pid><suffix>` file
+    next to `snapshot_path`, so workers never overwrite each other's windows. `save` is left
+    to the caller (the service saves periodically off the request path and at shutdown).
+    On first use in a process, including a worker forked after the monitor was built, the
+    ring is read back from that process's file, or else from one left by a process that is
+    gone, if its bins match the baseline.
+
+    The probability baseline may be given as a function; it is then called by the next
+    report rather than when set, since scoring the training data is slow.
+    """
+
+    probability_field = 'Probability'
+
+    def __init__(self, baseline: pd.DataFrame, numeric: Sequence[str], categorical: Dict[str, List[str]],
+                 bins: int = 10, probability_bins: int = 20, window_seconds: float = 3600.0, windows: int = 24,
+                 snapshot_path: Optional[Path] = None):
+        self.numeric = list(numeric)
+        self.window_seconds = window_seconds
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self.edges = {field: self._edges(baseline[field].to_numpy(dtype=np.float64), bins) for field in self.numeric}
+        self.edges[self.probability_field] = np.linspace(0.0, 1.0, probability_bins + 1)[1:-1]
+        self.categories = {field: list(values) for field, values in categorical.items()}
+
+        self.baseline = Sketch(self.edges, self.categories)
+        self.baseline.add({field: baseline[field].to_numpy() for field in self.numeric + list(self.categories)})
+        self._ring = collections.deque(maxlen=windows)
+        self._lock = threading.Lock()
+        self._probability_source = None
+        # Process the ring belongs to; None until first use
+        self._pid = None
+
+    @staticmethod
+    def _edges(values: np.ndarray, bins: int) -> np.ndarray:
+        """Bin upper edges: every distinct value when there are few, else the inner quantiles."""
+        distinct = np.unique(values)
+        if len(distinct) <= bins + 1:
+            return distinct
+        return np.unique(np.quantile(values, np.linspace(0.0, 1.0, bins + 1)[1:-1]))
+
+    def set_probability_baseline(self, probabilities: Union[np.ndarray, Callable[[], np.ndarray]]) -> None:
+        """Count the model's probabilities on the training data, e.g. after a model swap."""
+        if callable(probabilities):
+            with self._lock:
+                self._probability_source = probabilities
+            return
+        baseline = np.zeros_like(self.baseline.counts[self.probability_field])
+        baseline += np.bincount(
+            np.searchsorted(self.edges[self.probability_field], probabilities, side='left'), minlength=len(baseline)
+        )
+        with self._lock:
+            self.baseline.counts[self.probability_field] = baseline
+            self._probability_source = None
+
+    def _resolve_probability_baseline(self) -> None:
+        """Score the pending probability baseline, unless a newer one was set meanwhile."""
+        source = self._probability_source
+        if source is None:
+            return
+        probabilities = source()
+        with self._lock:
+            if self._probability_source is not source:
+                return
+        self.set_probability_baseline(probabilities)
+
+    def _claim(self) -> None:
+        """Start this process's ring on first use, from its snapshot when there is one."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # A forked worker drops the ring inherited from the parent
+            self._ring.clear()
+            self._restore()
+            if not self._ring:
+                self._ring.append(Sketch(self.edges, self.categories))
+            self._pid = os.getpid()
+
+    def observe(self, columns: Dict[str, Sequence], probabilities: Sequence[float]) -> None:
+        """Count one scored batch, given as raw columns and the probability of Exit per row."""
+        self._claim()
+        now = time.time()
+        with self._lock:
+            current = self._ring[-1]
+            if now - current.start >= self.window_seconds:
+                current = Sketch(self.edges, self.categories, now)
+                self._ring.append(current)
+            current.add({**columns, self.probability_field: probabilities})
+
+    def _horizon(self) -> float:
+        """Start time before which a window is too old to count."""
+        return time.time() - self.window_seconds * self._ring.maxlen
+
+    def _merged(self) -> Tuple[Sketch, int]:
+        """Merge the windows within the horizon; returns the merged sketch and how many were merged."""
+        horizon = self._horizon()
+        with self._lock:
+            live = [sketch for sketch in self._ring if sketch.start >= horizon]
+            merged = Sketch(self.edges, self.categories, live[0].start if live else time.time())
+            for sketch in live:
+                merged.merge(sketch)
+        return merged, len(live)
+
+    def report(self, detail: bool = False) -> Dict:
+        """PSI (and KS for ordered fields) per field and for the probability of Exit, worst first."""
+        self._claim()
+        self._resolve_probability_baseline()
+        live, windows = self._merged()
+        observed = int(live.counts[self.probability_field].sum())
+        fields = {}
+        for field, expected in self.baseline.counts.items():
+            actual = live.counts[field]
+            score = {'psi': round(psi(expected, actual), 4)}
+            if field in self.edges:
+                score['ks'] = round(ks(expected, actual), 4)
+            score['status'] = _status(score['psi']) if observed else 'no_data'
+            if detail:
+                score['bins'] = self.edges[field].tolist() if field in self.edges else self.categories[field] + ['other']
+                score['baseline'] = expected.tolist()
+                score['live'] = actual.tolist()
+            fields[field] = score
+
+        worst = max(fields, key=lambda field: fields[field]['psi']) if observed else None
+        return {
+            'observed': observed,
+            'since': live.start,
+            'windows': windows,
+            'window_seconds': self.window_seconds,
+            'status': fields[worst]['status'] if worst else 'no_data',
+            'worst_field': worst,
+            'fields': dict(sorted(fields.items(), key=lambda item: -item[1]['psi'])),
+        }
+
+    def reset(self) -> None:
+        """Drop the live windows, e.g. once a reported drift has been dealt with."""
+        self._claim()
+        with self._lock:
+            self._ring.clear()
+            self._ring.append(Sketch(self.edges, self.categories))
+        self.save()
+
+    def snapshot_file(self, pid: Optional[int] = None) -> Optional[Path]:
+        """Snapshot file of process `pid` (default: this one)."""
+        if self.snapshot_path is None:
+            return None
+        base = self.snapshot_path
+        return base.with_name(f'{base.stem}.{os.getpid() if pid is None else pid}{base.suffix}')
+
+    def save(self) -> None:
+        """Write the live windows (and the bins they use) atomically to this process's snapshot file."""
+        if self.snapshot_path is None:
+            return
+        self._claim()
+        path = self.snapshot_file()
+        with self._lock:
+            state = {
+                'edges': {field: edges.tolist() for field, edges in self.edges.items()},
+                'categories': self.categories,
+                'windows': [sketch.to_dict() for sketch in self._ring],
+            }
+        staging = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handle, staging = tempfile.mkstemp(dir=path.parent, prefix='.drift-')
+            with os.fdopen(handle, 'w') as f:
+                json.dump(state, f)
+            os.replace(staging, path)
+            staging = None
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not save the drift snapshot: {str(e)}")
+        finally:
+            if staging is not None:
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(staging)
+
+    def _orphans(self) -> List[Path]:
+        """Snapshots no live process owns: the unsuffixed file and those of stopped processes."""
+        base = self.snapshot_path
+        orphans = [base]
+        for path in sorted(base.parent.glob(f'{base.stem}.*{base.suffix}')):
+            pid = path.name[len(base.stem) + 1:len(path.name) - len(base.suffix)]
+            if pid.isdigit() and int(pid) != os.getpid() and not _alive(int(pid)):
+                orphans.append(path)
+        return orphans
+
+    def _restore(self) -> None:
+        """
+        Reload the windows of this process's snapshot, or else take over one no live process
+        owns, when it was taken with the same bins.
+        """
+        if self.snapshot_path is None:
+            return
+        path = self.snapshot_file()
+        if not path.is_file():
+            for orphan in self._orphans():
+                try:
+                    os.rename(orphan, path)
+                    break
+                except FileNotFoundError:
+                    # Missing, or another worker took it over first
+                    continue
+                except OSError as e:
+                    logger.warning(f"Could not take over the drift snapshot {orphan}: {str(e)}")
+            else:
+                return
+        try:
+            state = json.loads(path.read_text())
+            same_bins = state['categories'] == self.categories and state['edges'].keys() == self.edges.keys() and all(
+                np.array_equal(np.asarray(state['edges'][field]), edges) for field, edges in self.edges.items()
+            )
+            if not same_bins:
+                logger.warning("Drift snapshot was taken with other bins, starting from an empty window")
+                return
+            horizon = self._horizon()
+            for window in state['windows']:
+                if window['start'] >= horizon:
+                    self._ring.append(Sketch.from_dict(window, self.edges, self.categories))
+            logger.info(f"Restored {len(self._ring)} drift windows from {path}")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not restore the drift snapshot: {str(e)}")
+            self._ring.clear()
\ No newline at end of file
@@ -0,0 +1,155 @@
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Sequence
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from src.models.schemas import CustomerData
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+class FeatureEncoder:
+    """
+    Precompiled encoder that turns CustomerData straight into the classifier's input row.
+
+    It reads the one-hot categories and the scaler parameters from the fitted preprocessor,
+    so the output matches `pipe.transform` without building a DataFrame per request.
+    """
+
+    def __init__(self, n_features: int, scaled: List, passthrough: List, onehot: List):
+        """Initialize the encoder from an already compiled column layout."""
+        self.n_features = n_features
+        self.scaled = scaled            # (field, output index, mean, scale)
+        self.passthrough = passthrough  # (field, output index)
+        self.onehot = onehot            # (field, {category: output index})
+        self._template = np.zeros((1, n_features), dtype=np.float32)
+
+    @classmethod
+    def from_pipeline(cls, pipe: ColumnTransformer) -> "FeatureEncoder":
+        """Compile the encoder from a fitted ColumnTransformer."""
+        scaled, passthrough, onehot = [], [], []
+        position = 0
+
+        for name, transformer, columns in pipe.transformers_:
+            if transformer == 'drop' or len(columns) == 0:
+                continue
+            steps = transformer.steps if isinstance(transformer, Pipeline) else [(name, transformer)]
+            # Imputers are no-ops here since CustomerData never holds missing values
+            steps = [
+                step for _, step in steps
+                if step not in (None, 'passthrough') and not isinstance(step, SimpleImputer)
+            ]
+
+            if not steps:
+                for offset, column in enumerate(columns):
+                    passthrough.append((column, position + offset))
+                position += len(columns)
+
+            elif len(steps) == 1 and isinstance(steps[0], StandardScaler):
+                scaler = steps[0]
+                means = scaler.mean_ if scaler.with_mean else np.zeros(len(columns))
+                scales = scaler.scale_ if scaler.with_std else np.ones(len(columns))
+                for offset, column in enumerate(columns):
+                    scaled.append((column, position + offset, float(means[offset]), float(scales[offset])))
+                position += len(columns)
+
+            elif len(steps) == 1 and isinstance(steps[0], OneHotEncoder):
+                ohe = steps[0]
+                drop_idx = ohe.drop_idx_ if ohe.drop_idx_ is not None else [None] * len(columns)
+                for column, categories, dropped in zip(columns, ohe.categories_, drop_idx):
+                    mapping = {}
+                    for index, category in enumerate(categories):
+                        if dropped is not None and index == dropped:
+                            mapping[category] = None
+                            continue
+                        mapping[category] = position
+                        position += 1
+                    onehot.append((column, mapping))
+
+            else:
+                raise ValueError(f"Unsupported preprocessing steps for '{name}': {steps}")
+
+        logger.info(f"Compiled feature encoder with {position} output features")
+        return cls(position, scaled, passthrough, onehot)
+
+    def column_matrix(self, columns: Sequence[str]) -> np.ndarray:
+        """
+        0/1 matrix of shape (n_features, len(columns)) mapping every output feature to the raw
+        column it was encoded from, e.g. to sum per-feature attributions of a one-hot group.
+        """
+        matrix = np.zeros((self.n_features, len(columns)), dtype=np.float64)
+        position = {column: index for index, column in enumerate(columns)}
+        for field, index, *_ in self.scaled + self.passthrough:
+            matrix[index, position[field]] = 1.0
+        for field, mapping in self.onehot:
+            for index in mapping.values():
+                if index is not None:
+                    matrix[index, position[field]] = 1.0
+        return matrix
+
+    def encode(self, data: CustomerData) -> np.ndarray:
+        """Encode a single customer into a float32 row of shape (1, n_features)."""
+        row = self._template.copy()
+        out = row[0]
+
+        for field, index, mean, scale in self.scaled:
+            out[index] = (float(getattr(data, field)) - mean) / scale
+        for field, index in self.passthrough:
+            out[index] = float(getattr(data, field))
+        for field, mapping in self.onehot:
+            value = getattr(data, field)
+            if value not in mapping:
+                raise ValueError(f"Found unknown category '{value}' in column '{field}'")
+            index = mapping[value]
+            if index is not None:
+                out[index] = 1.0
+
+        return row
+
+    def encode_batch(self, data_list: List[CustomerData]) -> np.ndarray:
+        """Encode a list of customers into a float32 matrix of shape (n, n_features)."""
+        fields = [field for field, *_ in self.scaled + self.passthrough + self.onehot]
+        columns = {field: [getattr(data, field) for data in data_list] for field in fields}
+        return self._encode_columns(columns, len(data_list))
+
+    def encode_frame(self, frame: pd.DataFrame) -> np.ndarray:
+        """Encode a DataFrame holding the raw customer columns."""
+        return self._encode_columns(frame, len(frame))
+
+    def _encode_columns(self, columns: Dict[str, Sequence], n_rows: int) -> np.ndarray:
+        """Vectorized encoding of column-oriented input."""
+        X = np.zeros((n_rows, self.n_features), dtype=np.float32)
+
+        for field, index, mean, scale in self.scaled:
+            X[:, index] = (np.asarray(columns[field], dtype=np.float64) - mean) / scale
+        for field, index in self.passthrough:
+            X[:, index] = np.asarray(columns[field], dtype=np.float64)
+        for field, mapping in self.onehot:
+            values = np.asarray(columns[field], dtype=object)
+            known = np.zeros(n_rows, dtype=bool)
+            for category, index in mapping.items():
+                matches = values == category
+                known |= matches
+                if index is not None:
+                    X[:, index] = matches
+            if not known.all():
+                unknown = values[~known][0]
+                raise ValueError(f"Found unknown category '{unknown}' in column '{field}'")
+
+        return X
+
+    def check_parity(self, pipe: ColumnTransformer, frame: pd.DataFrame) -> float:
+        """
+        Compare the encoder against `pipe.transform` on a frame of raw customer columns.
+
+        Returns the maximum absolute difference once both outputs are in the float32
+        precision the forest scores with, so 0.0 means bit-exact classifier inputs.
+        """
+        expected = pipe.transform(frame).astype(np.float32)
+        actual = self.encode_frame(frame)
+        if expected.shape != actual.shape:
+            raise ValueError(f"Shape mismatch: expected {expected.shape}, got {actual.shape}")
+        return float(np.max(np.abs(expected - actual))) if len(frame) else 0.0
\ No newline at end of file
@@ -0,0 +1,277 @@
+import json
+import logging
+import numpy as np
+from pathlib import Path
+from typing import Optional
+from sklearn.ensemble import RandomForestClassifier
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+class CompiledForest:
+    """
+    Array-backed scorer for a fitted RandomForestClassifier.
+
+    Every tree is flattened into contiguous arrays (feature, threshold, children, leaf value)
+    and a batch is scored by walking all trees one level at a time with vectorized NumPy,
+    skipping sklearn's per-call validation and thread dispatch. Leaves point to themselves,
+    so rows that reach a leaf early simply stay there until the deepest tree is done.
+    """
+
+    # Rows scored per traversal pass; small chunks keep the (trees, rows) index matrices in cache
+    chunk_rows = 256
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, children: np.ndarray, value: np.ndarray,
+                 roots: np.ndarray, depth: int, n_features: int, classes: np.ndarray):
+        """Initialize the scorer from already flattened tree arrays."""
+        self.feature = feature      # int32 split feature per node (0 for leaves)
+        self.threshold = threshold  # float32 split threshold per node
+        self.children = children    # int32 (left, right) global child indices per node (itself for leaves)
+        self.value = value          # class probabilities per node, shape (n_nodes, n_classes)
+        self.roots = roots          # int32 global index of each tree's root
+        self.depth = depth
+        self.n_features = n_features
+        self.classes_ = classes
+        # Per-class change of the node value along every edge, built on first use by contributions()
+        self._edge_deltas = {}
+
+    @classmethod
+    def from_classifier(cls, classifier: RandomForestClassifier, max_depth: Optional[int] = None,
+                        quantize: bool = False) -> "CompiledForest":
+        """
+        Compile a fitted RandomForestClassifier.
+
+        Subtrees whose leaves all hold the same probabilities are always collapsed into one
+        leaf, which changes no prediction. `max_depth` cuts every tree at that depth, scoring
+        with the class distribution of the cut node, and `quantize` stores the node values as
+        float32; both shrink the arrays but no longer match `predict_proba` exactly.
+        """
+        if not isinstance(classifier, RandomForestClassifier):
+            raise ValueError(f"Unsupported classifier: {type(classifier).__name__}")
+        if classifier.n_outputs_ != 1:
+            raise ValueError("Only single-output forests are supported")
+
+        trees = [cls._compact_tree(estimator.tree_, max_depth) for estimator in classifier.estimators_]
+        offsets = np.cumsum([0] + [len(tree[0]) for tree in trees[:-1]])
+
+        feature = np.concatenate([tree[0] for tree in trees]).astype(np.int32)
+        threshold = np.concatenate([tree[1] for tree in trees])
+        children = np.concatenate([tree[2] + offset for tree, offset in zip(trees, offsets)]).astype(np.int32)
+        value = np.concatenate([tree[3] for tree in trees])
+        depth = max(tree[4] for tree in trees)
+
+        # The trees compare float32 inputs against float64 thresholds; rounding each threshold
+        # down to the nearest float32 keeps every comparison identical at half the memory
+        threshold32 = threshold.astype(np.float32)
+        above = threshold32.astype(np.float64) > threshold
+        threshold32[above] = np.nextafter(threshold32[above], np.float32(-np.inf))
+
+        if quantize:
+            value = value.astype(np.float32)
+
+        forest = cls(feature, threshold32, children, value, offsets.astype(np.int32), depth,
+                     classifier.n_features_in_, classifier.classes_)
+        source_nodes = sum(estimator.tree_.node_count for estimator in classifier.estimators_)
+        logger.info(
+            f"Compiled forest of {len(trees)} trees: {len(feature)} nodes (from {source_nodes}), "
+            f"depth {depth}, {forest.nbytes / 1024:.0f} KiB"
+        )
+        return forest
+
+    # Arrays written by save() and read back by load()
+    _arrays = ('feature', 'threshold', 'children', 'value', 'roots')
+
+    def save(self, folder: Path) -> None:
+        """Write the flattened arrays as .npy files (plus a small JSON header) into `folder`."""
+        folder = Path(folder)
+        folder.mkdir(parents=True, exist_ok=True)
+        for name in self._arrays:
+            np.save(folder / f'{name}.npy', np.ascontiguousarray(getattr(self, name)))
+        (folder / 'forest.json').write_text(json.dumps({
+            'depth': self.depth,
+            'n_features': self.n_features,
+            'classes': self.classes_.tolist(),
+        }))
+
+    @classmethod
+    def load(cls, folder: Path, memory_map: bool = True) -> "CompiledForest":
+        """
+        Read a forest written by save().
+
+        With `memory_map`, the arrays are mapped read-only instead of copied, so processes
+        loading the same files share the physical pages.
+        """
+        folder = Path(folder)
+        header = json.loads((folder / 'forest.json').read_text())
+        # np.asarray drops the memmap subclass (and its per-operation overhead) but keeps the mapping
+        arrays = {
+            name: np.asarray(np.load(folder / f'{name}.npy', mmap_mode='r' if memory_map else None))
+            for name in cls._arrays
+        }
+        return cls(arrays['feature'], arrays['threshold'], arrays['children'], arrays['value'], arrays['roots'],
+                   header['depth'], header['n_features'], np.array(header['classes']))
+
+    @property
+    def memory_mapped(self) -> bool:
+        """Whether the node arrays are mapped from files rather than held in private memory."""
+        base = self.value
+        while base is not None and not isinstance(base, np.memmap):
+            base = getattr(base, 'base', None)
+        return base is not None
+
+    @staticmethod
+    def _compact_tree(tree, max_depth: Optional[int]):
+        """
+        Renumber the reachable nodes of one sklearn tree in breadth-first order.
+
+        Returns local (feature, threshold, children, value, depth) arrays, where leaves
+        have themselves as children and a value row normalized like DecisionTreeClassifier.
+        """
+        # Same normalization as DecisionTreeClassifier.predict_proba
+        value = tree.value[:, 0, :].astype(np.float64)
+        normalizer = value.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        value = value / normalizer
+
+        # Children always have higher ids than their parent, so one reverse pass finds the
+        # subtrees that predict the same probabilities everywhere
+        is_leaf = tree.children_left == -1
+        uniform = is_leaf.copy()
+        for node in range(tree.node_count - 1, -1, -1):
+            if not is_leaf[node]:
+                left, right = tree.children_left[node], tree.children_right[node]
+                uniform[node] = (uniform[left] and uniform[right]
+                                 and np.array_equal(value[left], value[right]))
+                if uniform[node]:
+                    value[node] = value[left]
+
+        order, depths = [0], [0]
+        children = []
+        for position in range(tree.node_count):
+            if position >= len(order):
+                break
+            node, node_depth = order[position], depths[position]
+            if uniform[node] or (max_depth is not None and node_depth >= max_depth):
+                children.append((position, position))
+                continue
+            pair = []
+            for child in (tree.children_left[node], tree.children_right[node]):
+                pair.append(len(order))
+                order.append(child)
+                depths.append(node_depth + 1)
+            children.append(tuple(pair))
+
+        order = np.array(order)
+        internal = np.array([left != position for position, (left, _) in enumerate(children)], dtype=bool)
+        feature = np.where(internal, tree.feature[order], 0)
+        threshold = np.where(internal, tree.threshold[order], 0.0)
+        depth = max(node_depth for node_depth, split in zip(depths, internal) if not split)
+        return feature, threshold, np.array(children).reshape(-1, 2), value[order], depth
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the flattened arrays."""
+        return sum(array.nbytes for array in (self.feature, self.threshold, self.children, self.value))
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """Walk every tree level by level, returning the leaf reached, shape (n_trees, n_samples)."""
+        offsets = np.arange(len(X), dtype=np.intp) * X.shape[1]
+        flat_X = X.ravel()
+        children = self.children.ravel()
+        nodes = np.repeat(self.roots[:, np.newaxis].astype(np.intp), len(X), axis=1)
+        for _ in range(self.depth):
+            go_right = np.take(flat_X, np.take(self.feature, nodes) + offsets) > np.take(self.threshold, nodes)
+            nodes = np.take(children, 2 * nodes + go_right)
+        return nodes
+
+    def _validate(self, X: np.ndarray) -> np.ndarray:
+        """Cast to the float32 layout the trees compare against, like sklearn's input check."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"X has shape {X.shape}, but the forest expects {self.n_features} features")
+        if np.isnan(X).any():
+            raise ValueError("Input X contains NaN")
+        return X
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Return the global leaf index reached in every tree, shape (n_samples, n_trees)."""
+        X = self._validate(X)
+        return np.concatenate(
+            [self._leaves(X[start:start + self.chunk_rows]).T for start in range(0, len(X), self.chunk_rows)]
+        ) if len(X) else np.empty((0, len(self.roots)), dtype=np.intp)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Class probabilities, shape (n_samples, n_classes), like RandomForestClassifier.predict_proba.
+
+        Trees are summed one after another in estimator order (a reduction over the leading
+        axis adds whole rows sequentially) and the sum is divided by the number of trees: the
+        same float64 operations sklearn performs, so the result is bit-identical unless the
+        forest was compiled with `max_depth` or `quantize`.
+        """
+        X = self._validate(X)
+        proba = np.zeros((len(X), self.value.shape[1]), dtype=np.float64)
+        for start in range(0, len(X), self.chunk_rows):
+            leaves = self._leaves(X[start:start + self.chunk_rows])
+            proba[start:start + self.chunk_rows] = np.add.reduce(np.take(self.value, leaves, axis=0), axis=0, dtype=np.float64)
+        proba /= len(self.roots)
+        return proba
+
+    def edge_deltas(self, class_index: int) -> np.ndarray:
+        """
+        Change of the class probability along every edge, laid out like `children`: entry
+        2 * node + side is value[child] - value[node]. Leaves point to themselves, so their
+        entries are 0 and rows parked at a leaf add nothing.
+        """
+        deltas = self._edge_deltas.get(class_index)
+        if deltas is None:
+            value = np.asarray(self.value[:, class_index], dtype=np.float64)
+            deltas = self._edge_deltas[class_index] = (value[self.children] - value[:, np.newaxis]).ravel()
+        return deltas
+
+    def contributions(self, X: np.ndarray, class_index: int = -1):
+        """
+        Saabas-style feature contributions to the probability of one class.
+
+        Every split on a row's path credits its feature with the change in the node's class
+        probability, averaged over the trees. Returns (bias, contributions) of shapes
+        (n_samples,) and (n_samples, n_features), where bias is the mean root value and
+        bias + contributions.sum(axis=1) equals predict_proba(X)[:, class_index].
+        """
+        X = self._validate(X)
+        class_index = class_index % self.value.shape[1]
+        deltas = self.edge_deltas(class_index)
+        children = self.children.ravel()
+        contributions = np.zeros((len(X), self.n_features), dtype=np.float64)
+
+        for start in range(0, len(X), self.chunk_rows):
+            chunk = X[start:start + self.chunk_rows]
+            offsets = np.arange(len(chunk), dtype=np.intp) * chunk.shape[1]
+            flat_X = chunk.ravel()
+            nodes = np.repeat(self.roots[:, np.newaxis].astype(np.intp), len(chunk), axis=1)
+            totals = np.zeros(len(chunk) * self.n_features, dtype=np.float64)
+            for _ in range(self.depth):
+                cells = np.take(self.feature, nodes) + offsets
+                edges = 2 * nodes + (np.take(flat_X, cells) > np.take(self.threshold, nodes))
+                # One bincount per level adds the edge deltas of every tree into (row, feature) cells
+                totals += np.bincount(cells.ravel(), np.take(deltas, edges).ravel(), minlength=len(totals))
+                nodes = np.take(children, edges)
+            contributions[start:start + self.chunk_rows] = totals.reshape(len(chunk), self.n_features)
+
+        contributions /= len(self.roots)
+        bias = float(np.mean(np.take(self.value[:, class_index], self.roots)))
+        return np.full(len(X), bias), contributions
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Most probable class per sample, like RandomForestClassifier.predict."""
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+    def check_parity(self, classifier: RandomForestClassifier, X: np.ndarray) -> float:
+        """
+        Compare against `classifier.predict_proba` on the same inputs.
+
+        Returns the maximum absolute difference, so 0.0 means bit-exact probabilities.
+        """
+        expected = classifier.predict_proba(X)
+        actual = self.predict_proba(X)
+        return float(np.max(np.abs(expected - actual))) if len(X) else 0.0
\ No newline at end of file
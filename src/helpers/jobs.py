@@ -0,0 +1,197 @@
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+class JobStore:
+    """
+    SQLite-backed store of batch jobs and their items, so jobs survive restarts.
+
+    Every text of a job is one item row that starts `pending` and is set to `ok` (with its
+    prediction) or `error` (with the reason) once processed. Resuming a job only ever
+    reads its pending items, so finished texts are never processed twice.
+
+    A job is worked on by whoever holds its lease. Leases expire, so jobs held by a
+    process that died are picked up again by the other workers, or after a restart.
+    """
+
+    def __init__(self, path: Path):
+        """Open (or create) the job database at the given path."""
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                with_probability INTEGER NOT NULL,
+                total INTEGER NOT NULL,
+                succeeded INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                owner TEXT,
+                leased_until REAL NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS items (
+                job_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                result TEXT,
+                PRIMARY KEY (job_id, position)
+            );
+            CREATE INDEX IF NOT EXISTS items_pending ON items (job_id, status, position);
+        """)
+        self._conn.commit()
+
+    def create(self, texts: List[str], with_probability: bool = False) -> str:
+        """Store a new queued job with one pending item per text and return its id."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, with_probability, total, created_at, updated_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, int(with_probability), len(texts), now, now)
+            )
+            self._conn.executemany(
+                "INSERT INTO items (job_id, position, text) VALUES (?, ?, ?)",
+                ((job_id, position, text) for position, text in enumerate(texts))
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Return the status and progress of a job, or None if it does not exist."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, with_probability, total, succeeded, failed, error, created_at, updated_at "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        job_id, status, with_probability, total, succeeded, failed, error, created_at, updated_at = row
+        finished = succeeded + failed
+        return {
+            'job_id': job_id,
+            'status': status,
+            'with_probability': bool(with_probability),
+            'total': total,
+            'succeeded': succeeded,
+            'failed': failed,
+            'pending': total - finished,
+            'progress': round(finished / total, 4) if total else 1.0,
+            'error': error,
+            'created_at': created_at,
+            'updated_at': updated_at,
+        }
+
+    def claim(self, owner: str, lease: float) -> Optional[Tuple[str, bool]]:
+        """
+        Lease the oldest unfinished job that nobody else holds.
+
+        Returns (job id, with_probability), or None when there is nothing to do or another
+        process leased the job first.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT id, with_probability FROM jobs "
+                "WHERE status IN ('queued', 'running') AND leased_until < ? "
+                "ORDER BY created_at LIMIT 1", (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            # The SELECT takes no write lock, so another process may have leased the job since;
+            # the update only wins if the lease is still free
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, leased_until = ?, updated_at = ? "
+                "WHERE id = ? AND leased_until < ?",
+                (owner, now + lease, now, row[0], now)
+            )
+        if cursor.rowcount == 0:
+            return None
+        return row[0], bool(row[1])
+
+    def renew(self, job_id: str, owner: str, lease: float) -> bool:
+        """Extend the lease on a job; False if it was lost to another worker."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET leased_until = ? WHERE id = ? AND owner = ?",
+                (time.time() + lease, job_id, owner)
+            )
+        return cursor.rowcount == 1
+
+    def release(self, owners: Iterable[str]) -> None:
+        """Give up every lease held by `owners`, so their jobs are resumed without waiting."""
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE jobs SET leased_until = 0 WHERE owner = ?", ((owner,) for owner in owners))
+
+    def pending_items(self, job_id: str, limit: int) -> List[Tuple[int, str]]:
+        """Return up to `limit` (position, text) pairs of a job that are not processed yet."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT position, text FROM items WHERE job_id = ? AND status = 'pending' "
+                "ORDER BY position LIMIT ?", (job_id, limit)
+            ).fetchall()
+
+    def save_results(self, job_id: str, results: Iterable[Tuple[int, str, Dict]]) -> None:
+        """
+        Record processed items as (position, 'ok' or 'error', result) and update the job counters.
+
+        Items already processed are left untouched, so a result is never counted twice.
+        """
+        counts = {'ok': 0, 'error': 0}
+        with self._lock, self._conn:
+            for position, status, result in results:
+                cursor = self._conn.execute(
+                    "UPDATE items SET status = ?, result = ? WHERE job_id = ? AND position = ? AND status = 'pending'",
+                    (status, json.dumps(result), job_id, position)
+                )
+                counts[status] += cursor.rowcount
+            self._conn.execute(
+                "UPDATE jobs SET succeeded = succeeded + ?, failed = failed + ?, updated_at = ? WHERE id = ?",
+                (counts['ok'], counts['error'], time.time(), job_id)
+            )
+
+    def finish(self, job_id: str, status: str = 'completed', error: Optional[str] = None) -> None:
+        """Mark a job as completed (or failed, with the reason) and drop its lease."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, owner = NULL, leased_until = 0, updated_at = ? WHERE id = ?",
+                (status, error, time.time(), job_id)
+            )
+
+    def results(self, job_id: str, offset: int, limit: int) -> List[Dict]:
+        """Return the items of a job at positions [offset, offset + limit), pending ones included."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT position, status, result FROM items WHERE job_id = ? AND position >= ? "
+                "ORDER BY position LIMIT ?", (job_id, offset, limit)
+            ).fetchall()
+
+        items = []
+        for position, status, result in rows:
+            item = {'index': position, 'status': status}
+            if status == 'ok':
+                item['result'] = json.loads(result)
+            elif status == 'error':
+                item['error'] = json.loads(result)
+            items.append(item)
+        return items
+
+    def close(self) -> None:
+        """Close the underlying connection."""
+        with self._lock:
+            self._conn.close()
\ No newline at end of file
@@ -0,0 +1,229 @@
+import time
+import bisect
+import threading
+import functools
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+class Histogram:
+    """
+    Thread-safe histogram over fixed bucket upper bounds, reported as cumulative counts.
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        """Initialize the histogram with sorted, inclusive bucket upper bounds."""
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # the last slot counts values above every bound
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Record one value."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def stats(self) -> Dict:
+        """Return count, sum, mean and cumulative counts per bucket (`le` upper bounds)."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets + [float('inf')], counts):
+            cumulative += count
+            buckets['+Inf' if bound == float('inf') else f'{bound:g}'] = cumulative
+
+        return {
+            'count': cumulative,
+            'sum': round(total, 6),
+            'mean': round(total / cumulative, 6) if cumulative else 0.0,
+            'buckets': buckets
+        }
+
+def exponential_buckets(start: float, factor: float, count: int) -> list:
+    """Bucket bounds start, start*factor, ... (count bounds)."""
+    return [start * factor ** i for i in range(count)]
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = '') -> str:
+    """Render a Prometheus label set, e.g. {stage="transform",le="0.01"}."""
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value: float) -> str:
+    """Render a sample value at full precision, as prometheus_client does (`:g` keeps 6 digits)."""
+    value = float(value)
+    if value == float('inf'):
+        return '+Inf'
+    if value == float('-inf'):
+        return '-Inf'
+    return repr(value)
+
+class Counter:
+    """
+    Thread-safe monotonically increasing counter, one value per label combination.
+    """
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        """Initialize the counter with its Prometheus name, help text and label names."""
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Add `amount` to the counter of the given label values."""
+        key = tuple(labels.get(name, '') for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def values(self) -> Dict[str, float]:
+        """Return the value of every label combination, keyed by the joined label values."""
+        with self._lock:
+            return {'/'.join(key) or 'all': value for key, value in sorted(self._values.items())}
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        lines += [f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}' for key, value in values]
+        return lines
+
+class LabeledHistogram:
+    """
+    One Histogram per label combination, all sharing the same buckets.
+    """
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float], labels: Sequence[str] = ()):
+        """Initialize the histogram family with its Prometheus name, help text, buckets and label names."""
+        self.name = name
+        self.help = help
+        self.bucket_bounds = sorted(buckets)
+        self.labels = tuple(labels)
+        self._histograms: Dict[Tuple, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        """Record one value for the given label values."""
+        key = tuple(labels.get(name, '') for name in self.labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(self.bucket_bounds))
+        histogram.observe(value)
+
+    def stats(self) -> Dict:
+        """Return the stats of every label combination, keyed by the joined label values."""
+        return {'/'.join(key) or 'all': histogram.stats() for key, histogram in sorted(self._histograms.items())}
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for key, histogram in sorted(self._histograms.items()):
+            stats = histogram.stats()
+            for bound, count in stats['buckets'].items():
+                labels = _format_labels(self.labels, key, 'le="' + bound + '"')
+                lines.append(f'{self.name}_bucket{labels} {count}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labels, key)} {_format_value(stats["sum"])}')
+            lines.append(f'{self.name}_count{_format_labels(self.labels, key)} {stats["count"]}')
+        return lines
+
+# Latency buckets in seconds, from 50us to ~52s
+LATENCY_BUCKETS = exponential_buckets(0.00005, 2, 21)
+
+# A collector returns (name, type, help, [(labels, value)]) families read at scrape time
+Collector = Callable[[], List[Tuple[str, str, str, List[Tuple[Dict, float]]]]]
+
+class MetricsRegistry:
+    """
+    Process-wide registry of counters, histograms and scrape-time collectors,
+    rendered in the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry with the per-stage latency and error metrics."""
+        self._metrics: Dict[str, object] = {}
+        self._collectors: Dict[str, Collector] = {}
+        self._lock = threading.Lock()
+        self.stage_seconds = self.histogram(
+            'churn_stage_duration_seconds', 'Time spent per processing stage', LATENCY_BUCKETS, ('stage',)
+        )
+        self.stage_errors = self.counter('churn_stage_errors_total', 'Exceptions raised per processing stage', ('stage', 'error'))
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        """Return the counter registered under `name`, creating it on first use."""
+        with self._lock:
+            return self._metrics.setdefault(name, Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                  labels: Sequence[str] = ()) -> LabeledHistogram:
+        """Return the histogram registered under `name`, creating it on first use."""
+        with self._lock:
+            return self._metrics.setdefault(name, LabeledHistogram(name, help, buckets, labels))
+
+    def register_collector(self, key: str, collector: Collector) -> None:
+        """Register (or replace) a function whose families are read at every scrape."""
+        with self._lock:
+            self._collectors[key] = collector
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a block as processing stage `name`, counting the exceptions it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.stage_errors.inc(stage=name, error=type(e).__name__)
+            raise
+        finally:
+            self.stage_seconds.observe(time.perf_counter() - start, stage=name)
+
+    def timed(self, name: str) -> Callable:
+        """Decorator timing every call of a synchronous function as processing stage `name`."""
+        def decorator(function: Callable) -> Callable:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def render(self) -> str:
+        """Render every metric and collector in the Prometheus text format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+
+        lines = []
+        for metric in metrics:
+            lines += metric.render()
+
+        # Families from different collectors (e.g. several caches) share one HELP/TYPE header
+        families: Dict[str, Tuple[str, str, List]] = {}
+        for key, collector in collectors:
+            try:
+                for name, kind, help, samples in collector():
+                    families.setdefault(name, (kind, help, []))[2].extend(samples)
+            except Exception:
+                self.stage_errors.inc(stage=f'collector:{key}', error='CollectorError')
+        for name, (kind, help, samples) in families.items():
+            lines += [f'# HELP {name} {help}', f'# TYPE {name} {kind}']
+            lines += [
+                f'{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}'
+                for labels, value in samples
+            ]
+        return '\n'.join(lines) + '\n'
+
+def cache_families(cache: str, stats: Dict) -> List[Tuple[str, str, str, List[Tuple[Dict, float]]]]:
+    """Turn the stats() of one cache into collector families labelled with `cache`."""
+    counters = [
+        (f'churn_cache_{field}_total', 'counter', f'Cache {field}', [({'cache': cache}, stats[field])])
+        for field in ('hits', 'misses', 'evictions', 'expirations') if field in stats
+    ]
+    return counters + [('churn_cache_entries', 'gauge', 'Entries held by the cache', [({'cache': cache}, stats['size'])])]
+
+# Shared registry instance
+metrics = MetricsRegistry()
\ No newline at end of file
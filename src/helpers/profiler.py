@@ -0,0 +1,93 @@
+import sys
+import time
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Optional
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+class SamplingProfiler:
+    """
+    Opt-in wall-clock sampling profiler for the serving thread.
+
+    A daemon thread reads the target thread's current stack every `interval` seconds and,
+    unless the event loop is idle in select(), counts it in collapsed form
+    ("module:function;module:function ..."), which flame graph tools read directly.
+    Sampling costs one frame walk per tick and nothing on the hot path.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64, thread_id: Optional[int] = None):
+        """Initialize the profiler; it samples the calling thread unless `thread_id` is given."""
+        self.interval = interval
+        self.max_depth = max_depth
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.idle = 0  # samples where the event loop was waiting in select()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start sampling in a background thread."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        logger.info(f"Sampling profiler started ({self.interval * 1000:g} ms interval)")
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the background thread to exit."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def reset(self) -> None:
+        """Drop the stacks collected so far."""
+        with self._lock:
+            self.stacks.clear()
+            self.samples = 0
+            self.idle = 0
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            if frame.f_globals.get('__name__') == 'selectors':
+                with self._lock:
+                    self.idle += 1
+                continue
+
+            names = []
+            while frame is not None and len(names) < self.max_depth:
+                code = frame.f_code
+                names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+                frame = frame.f_back
+
+            with self._lock:
+                self.stacks[';'.join(reversed(names))] += 1
+                self.samples += 1
+
+    def collapsed(self, limit: Optional[int] = None) -> str:
+        """Return the most frequent stacks in collapsed format, one "stack count" per line."""
+        with self._lock:
+            stacks = self.stacks.most_common(limit)
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks)
+
+    def top_functions(self, limit: int = 20) -> Dict[str, float]:
+        """Return the share of samples in which each function was on top of the stack."""
+        with self._lock:
+            samples = self.samples
+            leaves = Counter()
+            for stack, count in self.stacks.items():
+                leaves[stack.rsplit(';', 1)[-1]] += count
+        return {name: round(count / samples, 4) for name, count in leaves.most_common(limit)} if samples else {}
\ No newline at end of file
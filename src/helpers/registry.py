@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import shutil
+import joblib
+import hashlib
+import logging
+import tempfile
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+class ModelBundle:
+    """
+    One loaded model version: the preprocessing pipeline, the classifier and their compiled
+    fast paths. Bundles are never modified after loading, so swapping the bundle a
+    controller points to swaps every model at once.
+
+    `classifier` is None when the compiled forest serves instead: the unpickled sklearn
+    trees are private to each process, while the forest's mapped pages are shared.
+    """
+
+    def __init__(self, version: str, fingerprint: str, pipe: Any, classifier: Any,
+                 encoder: Any = None, forest: Any = None, path: Optional[Path] = None):
+        self.version = version
+        # Hash of the artifact files, so memoized results are tied to the exact files loaded
+        self.fingerprint = fingerprint
+        self.pipe = pipe
+        self.classifier = classifier
+        self.encoder = encoder
+        self.forest = forest
+        self.path = path
+        self.loaded_at = time.time()
+        # Set by ModelRegistry.load when it warmed the version up on a test batch
+        self.warm_up = None
+
+    def describe(self) -> Dict:
+        return {
+            'version': self.version,
+            'fingerprint': self.fingerprint,
+            'path': str(self.path) if self.path is not None else None,
+            'encoder': self.encoder is not None,
+            'classifier': self.classifier is not None,
+            'forest': None if self.forest is None else {
+                'nodes': len(self.forest.feature),
+                'nbytes': self.forest.nbytes,
+                'memory_mapped': self.forest.memory_mapped,
+            },
+            'loaded_at': self.loaded_at,
+        }
+
+
+class ModelRegistry:
+    """
+    Versioned model artifacts under the assets folder.
+
+    The original `preprocessor.pkl` and `Tuned-RF-with-SMOTE.pkl` are the `base` version;
+    every other version is a folder `models/<version>/` holding `preprocessor.pkl`,
+    `classifier.pkl` and optionally a `manifest.json` with free-form metadata.
+
+    Compiled forests are cached as `.npy` arrays under `compiled/<fingerprint>/` and loaded
+    memory-mapped, so every worker process maps the same page-cache pages instead of
+    holding its own copy of the trees.
+    """
+
+    base_version = 'base'
+
+    def __init__(self, assets_folder: Path, use_fast_encoder: bool = True, use_compiled_forest: bool = True,
+                 forest_max_depth: Optional[int] = None, forest_quantize: bool = False, memory_map: bool = True):
+        self.assets_folder = Path(assets_folder)
+        self.models_folder = self.assets_folder / 'models'
+        self.compiled_folder = self.assets_folder / 'compiled'
+        self.use_fast_encoder = use_fast_encoder
+        self.use_compiled_forest = use_compiled_forest
+        self.forest_max_depth = forest_max_depth
+        self.forest_quantize = forest_quantize
+        self.memory_map = memory_map
+
+    def is_valid_version(self, version: str) -> bool:
+        """Whether `version` names a folder directly under `models/` (or is the base version)."""
+        return version == self.base_version or bool(version) and Path(version).name == version and not version.startswith('.')
+
+    def artifact_paths(self, version: str) -> Dict[str, Path]:
+        """Return the preprocessor and classifier paths of a version."""
+        if version == self.base_version:
+            return {
+                'preprocessor': self.assets_folder / 'preprocessor.pkl',
+                'classifier': self.assets_folder / 'Tuned-RF-with-SMOTE.pkl',
+            }
+        if not self.is_valid_version(version):
+            raise ValueError(f"Invalid model version: {version!r}")
+        folder = self.models_folder / version
+        return {'preprocessor': folder / 'preprocessor.pkl', 'classifier': folder / 'classifier.pkl'}
+
+    def versions(self) -> List[Dict]:
+        """List every version whose artifacts are present, oldest first."""
+        names = [self.base_version]
+        if self.models_folder.is_dir():
+            names += sorted(path.name for path in self.models_folder.iterdir() if path.is_dir())
+
+        versions = []
+        for name in names:
+            paths = self.artifact_paths(name)
+            if not all(path.is_file() for path in paths.values()):
+                continue
+            manifest = paths['classifier'].parent / 'manifest.json' if name != self.base_version else None
+            versions.append({
+                'version': name,
+                'path': str(paths['classifier'].parent),
+                'modified': max(path.stat().st_mtime for path in paths.values()),
+                'manifest': json.loads(manifest.read_text()) if manifest is not None and manifest.is_file() else None,
+            })
+        return sorted(versions, key=lambda version: version['modified'])
+
+    def fingerprint(self, *paths: Path) -> str:
+        """Hash the artifact files of a version."""
+        digest = hashlib.sha256()
+        for path in paths:
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        return digest.hexdigest()[:12]
+
+    def load(self, version: str, warm_up_frame: Optional[pd.DataFrame] = None) -> ModelBundle:
+        """
+        Load one version, compiling (or mapping the cached) fast paths.
+
+        The sklearn classifier is only unpickled to compile a missing forest cache, to check
+        the forest against it on `warm_up_frame`, or when there is no compiled forest, and
+        is dropped from the bundle once the forest is in place.
+        """
+        from src.helpers.encoder import FeatureEncoder
+
+        paths = self.artifact_paths(version)
+        try:
+            pipe = joblib.load(paths['preprocessor'])
+            fingerprint = self.fingerprint(paths['preprocessor'], paths['classifier'])
+        except FileNotFoundError as e:
+            logger.error(f"Model file not found: {str(e)}")
+            raise
+        except Exception as e:
+            logger.error(f"Error loading models: {str(e)}")
+            raise
+
+        # Compile the fast-path encoder, falling back to the pandas path if the layout is unsupported
+        encoder = None
+        if self.use_fast_encoder:
+            try:
+                encoder = FeatureEncoder.from_pipeline(pipe)
+            except Exception as e:
+                logger.warning(f"Fast feature encoder unavailable, using preprocessing pipeline: {str(e)}")
+
+        # Map the cached array-backed forest, if these artifacts were compiled before
+        forest = None
+        folder = self._forest_folder(fingerprint)
+        if self.use_compiled_forest and folder.is_dir():
+            try:
+                forest = self._map_forest(folder)
+            except Exception as e:
+                logger.warning(f"Compiled forest cache unreadable, compiling it again: {str(e)}")
+
+        classifier = None
+        if forest is None or warm_up_frame is not None:
+            try:
+                classifier = joblib.load(paths['classifier'])
+            except Exception as e:
+                logger.error(f"Error loading models: {str(e)}")
+                raise
+
+        # Compile and cache the forest, falling back to the classifier's own predict_proba
+        if self.use_compiled_forest and forest is None:
+            try:
+                forest = self._compile_forest(classifier, folder)
+            except Exception as e:
+                logger.warning(f"Compiled forest unavailable, using the classifier: {str(e)}")
+
+        bundle = ModelBundle(version, fingerprint, pipe, classifier, encoder, forest, paths['classifier'].parent)
+        if warm_up_frame is not None:
+            bundle.warm_up = self.warm_up(bundle, warm_up_frame)
+        if forest is not None:
+            bundle.classifier = None
+
+        logger.info(f"Loaded model version {version} ({fingerprint})")
+        return bundle
+
+    def _forest_folder(self, fingerprint: str) -> Path:
+        options = f"{fingerprint}-depth{self.forest_max_depth or 'full'}{'-f32' if self.forest_quantize else ''}"
+        return self.compiled_folder / options
+
+    def _map_forest(self, folder: Path):
+        from src.helpers.forest import CompiledForest
+
+        return CompiledForest.load(folder, memory_map=self.memory_map)
+
+    def _compile_forest(self, classifier: Any, folder: Path):
+        """Compile the classifier, cache the arrays under `folder` and map them back."""
+        from src.helpers.forest import CompiledForest
+
+        forest = CompiledForest.from_classifier(
+            classifier, max_depth=self.forest_max_depth, quantize=self.forest_quantize
+        )
+        try:
+            self._save_forest(forest, folder)
+        except OSError as e:
+            logger.warning(f"Could not cache the compiled forest, keeping it in memory: {str(e)}")
+            return forest
+        return self._map_forest(folder)
+
+    def _save_forest(self, forest, folder: Path) -> None:
+        """Write the arrays to a temporary folder and rename it, so readers never see a partial cache."""
+        folder.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=folder.parent, prefix='.staging-'))
+        try:
+            forest.save(staging)
+            os.rename(staging, folder)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            # Another worker compiled the same forest first
+            if not folder.is_dir():
+                raise
+
+    def warm_up(self, bundle: ModelBundle, frame: pd.DataFrame) -> Dict:
+        """
+        Score a test batch with a freshly loaded bundle before it serves traffic.
+
+        This touches every mapped page and code path once and, while the bundle still holds
+        the classifier, checks that the compiled forest reproduces its probabilities. Raises
+        ValueError on a mismatch.
+        """
+        start = time.perf_counter()
+        if bundle.encoder is not None:
+            X = bundle.encoder.encode_frame(frame)
+        else:
+            X = bundle.pipe.transform(frame)
+        expected = bundle.classifier.predict_proba(X) if bundle.classifier is not None else None
+
+        difference = None if expected is None else 0.0
+        if bundle.forest is not None:
+            probabilities = bundle.forest.predict_proba(X)
+            if expected is not None and len(X):
+                difference = float(np.max(np.abs(probabilities - expected)))
+            lossy = self.forest_max_depth is not None or self.forest_quantize
+            if difference and not lossy:
+                raise ValueError(f"Compiled forest of version {bundle.version} differs from its classifier by {difference}")
+
+        report = {'rows': len(frame), 'seconds': round(time.perf_counter() - start, 4), 'max_difference': difference}
+        logger.info(f"Warmed up model version {bundle.version}: {report}")
+        return report
\ No newline at end of file
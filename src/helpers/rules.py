@@ -0,0 +1,135 @@
+import re
+import logging
+from typing import Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from src.models.schemas import CustomerData
+from src.helpers.validation import field_rules
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Amounts such as 650, 2000.0, 5,000 or 75k
+_NUMBER = r'(\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)(\s*k\b)?'
+_COUNT = r'(\d+|one|two|three|four|a single)()'
+_WORD_NUMBERS = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'a single': 1}
+# Between a field name and its value: "credit score 650", "credit score: 650", "credit score of 650"
+_IS = r'(?:\s+of|\s+is|\s*:)?\s*'
+# Value of a phrase that states a field in the past or with a change, which makes the field ambiguous
+_AMBIGUOUS = 'ambiguous'
+# Words after a membership phrase, within the same clause, that say it no longer holds
+_NO_LONGER = r"(?![^.;]{0,40}?\b(?:no\s+longer|anymore|any\s+more|until|not\s+since)\b)"
+
+# (field, value, pattern) over the lowercased text. Numeric patterns capture the amount and
+# an optional 'k' suffix (value None); keyword patterns give a fixed value. All patterns run
+# as one alternation in a single pass, so a phrase matched earlier in the text masks what it
+# contains, e.g. "is not an active member" is never also read as "is an active member".
+# Phrases with the value _AMBIGUOUS leave their field to the LLM.
+_PATTERNS = [
+    ('CreditScore', None, rf'credit\s+score{_IS}{_NUMBER}'),
+    ('CreditScore', None, rf'{_NUMBER}\s+credit\s+score'),
+    ('Age', None, r'(\d{1,3})()[-\s]years?[-\s]old\b'),
+    ('Age', None, rf'\baged?{_IS}(\d{{1,3}})()\b'),
+    ('Tenure', None, r'with\s+(?:the|our)\s+bank\s+for\s+(\d+)()\s+years?'),
+    ('Tenure', None, rf'\btenure{_IS}(\d+)()'),
+    ('Tenure', None, r'\bcustomer\s+for\s+(\d+)()\s+years?'),
+    ('Tenure', None, r'\b(\d+)()\s+years?\s+(?:with|at)\s+(?:the|our)\s+bank'),
+    ('Balance', None, rf'\bbalance{_IS}\$?\s*{_NUMBER}'),
+    ('NumOfProducts', None, rf'\bholds?\s+{_COUNT}\s+(?:bank\s+)?products?\b'),
+    ('NumOfProducts', None, rf'\b{_COUNT}\s+(?:bank\s+)?products?\b'),
+    ('EstimatedSalary', None, rf'\bsalary{_IS}(?:about\s+|around\s+)?\$?\s*{_NUMBER}'),
+    ('EstimatedSalary', None, rf'\bearns\s+(?:about\s+|around\s+)?\$?\s*{_NUMBER}'),
+    ('Geography', 'France', r'\b(?:france|french)\b'),
+    ('Geography', 'Germany', r'\b(?:germany|german)\b'),
+    ('Geography', 'Spain', r'\b(?:spain|spanish)\b'),
+    ('Gender', 'Male', r'\b(?:male|man|gentleman)\b'),
+    ('Gender', 'Female', r'\b(?:female|woman|lady)\b'),
+    # Pronouns only decide the gender when no explicit keyword is present
+    ('pronoun', 'Male', r'\b(?:he|his|him)\b'),
+    ('pronoun', 'Female', r'\b(?:she|her|hers)\b'),
+    ('HasCrCard', 0, r"\b(?:does\s+not|doesn't|do\s+not|don't)\s+(?:own|have|hold)\s+(?:a\s+|any\s+)?credit\s+cards?"),
+    ('HasCrCard', 0, r'\b(?:no|without\s+a|without)\s+credit\s+cards?'),
+    ('HasCrCard', 1, r'\b(?:owns?|has|have|holds?|with)\s+(?:a\s+)?credit\s+cards?'),
+    ('IsActiveMember', _AMBIGUOUS,
+     r"\b(?:was|were|used\s+to\s+be|had\s+been|no\s+longer|never|formerly|once)\b[^.;]{0,20}?active\s+member"),
+    ('IsActiveMember', 0, r"\b(?:is\s+not|isn't|not)\s+an?\s+active\s+member"),
+    ('IsActiveMember', 0, r'\binactive\b'),
+    # Only the present, unnegated form reads as active
+    ('IsActiveMember', 1, rf"\b(?:is|remains|is\s+still)\s+an?\s+active\s+member\b{_NO_LONGER}"),
+    ('IsActiveMember', _AMBIGUOUS, r'\bactive\s+member\b'),
+]
+
+# Every pattern starts a word, so the leading \b lets the scanner skip positions inside words
+_MASTER = re.compile(r'\b(?:' + '|'.join(f'(?P<p{index}>{pattern})' for index, (_, _, pattern) in enumerate(_PATTERNS)) + ')')
+
+def _to_number(amount: str, suffix: str) -> float:
+    """Parse a captured amount with its optional 'k' suffix."""
+    if amount in _WORD_NUMBERS:
+        return float(_WORD_NUMBERS[amount])
+    value = float(amount.replace(',', ''))
+    return value * 1000 if suffix else value
+
+class RuleExtractor:
+    """
+    Deterministic pattern- and keyword-based extractor for templated customer descriptions.
+
+    Every field is read only when the text states it unambiguously: a field matched with
+    two different values, or not matched at all, is left for the LLM.
+    """
+
+    fields = tuple(CustomerData.model_fields)
+    # (annotation, allowed values, ge, le) per field, read from CustomerData
+    _rules = {name: rule for name, *rule in field_rules()}
+
+    def extract(self, text: str) -> Tuple[Dict, List[str]]:
+        """
+        Return (fields read confidently, names of the fields left unresolved).
+
+        The confident values already pass CustomerData's constraints one by one.
+        """
+        matches: Dict[str, set] = {}
+        for match in _MASTER.finditer(text.lower()):
+            index = int(match.lastgroup[1:])
+            field, value, _ = _PATTERNS[index]
+            if value is None:
+                # The amount and suffix groups directly follow the pattern's own group
+                position = _MASTER.groupindex[match.lastgroup]
+                value = _to_number(match.group(position + 1), match.group(position + 2))
+            matches.setdefault(field, set()).add(value)
+
+        pronouns = matches.pop('pronoun', set())
+        if 'Gender' not in matches and pronouns:
+            matches['Gender'] = pronouns
+
+        # A field read with two different values, or stated ambiguously, is left unresolved
+        found = {
+            field: values.pop() for field, values in matches.items() if len(values) == 1 and _AMBIGUOUS not in values
+        }
+        confident = {field: value for field, value in found.items() if self._valid(field, value)}
+        unresolved = [field for field in self.fields if field not in confident]
+        return self._cast(confident), unresolved
+
+    def _valid(self, field: str, value) -> bool:
+        """Check one value against the CustomerData constraints of its field."""
+        annotation, choices, ge, le = self._rules[field]
+        if choices is not None:
+            return value in choices
+        if annotation is int and value != int(value):
+            return False
+        return (ge is None or value >= ge) and (le is None or value <= le)
+
+    def _cast(self, fields: Dict) -> Dict:
+        """Cast integral fields to int, e.g. 35.0 -> 35."""
+        return {
+            field: int(value) if self._rules[field][0] is int else value
+            for field, value in fields.items()
+        }
+
+    def to_customer(self, fields: Dict) -> Optional[CustomerData]:
+        """Build the CustomerData when every field was read, None otherwise."""
+        if len(fields) < len(self.fields):
+            return None
+        try:
+            return CustomerData(**fields)
+        except ValidationError as e:
+            logger.debug(f"Rule extraction failed validation: {str(e)}")
+            return None
\ No newline at end of file
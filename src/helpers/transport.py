@@ -0,0 +1,289 @@
+import time
+import random
+import asyncio
+import logging
+import threading
+import collections
+import httpx
+import openai
+from typing import Any, Dict, Optional
+from src.helpers.metrics import metrics
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Outcome of every attempt sent to OpenAI (ok, timeout, rate_limited, server_error, connection_error, client_error)
+llm_attempts = metrics.counter('churn_llm_attempts_total', 'Chat completion attempts sent to OpenAI', ('outcome',))
+llm_hedges = metrics.counter('churn_llm_hedges_total', 'Hedged duplicate requests sent, and how many won', ('result',))
+llm_rejected = metrics.counter('churn_llm_circuit_rejections_total', 'Calls failed fast by the open circuit breaker')
+
+def build_http_client(asynchronous: bool, max_connections: int, max_keepalive: int, keepalive_expiry: float,
+                      connect_timeout: float, read_timeout: float):
+    """
+    Build the httpx client under the OpenAI SDK: a bounded keep-alive pool, so extraction
+    reuses warm TLS connections instead of handshaking per request, and explicit connect,
+    read and pool timeouts instead of the SDK's 10-minute default.
+    """
+    limits = httpx.Limits(
+        max_connections=max_connections, max_keepalive_connections=max_keepalive, keepalive_expiry=keepalive_expiry
+    )
+    timeout = httpx.Timeout(read_timeout, connect=connect_timeout, pool=connect_timeout)
+    client_class = httpx.AsyncClient if asynchronous else httpx.Client
+    return client_class(limits=limits, timeout=timeout)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling OpenAI while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker over the outcomes of recent OpenAI attempts.
+
+    Closed, it lets every call through and keeps the outcomes of the last `window` seconds.
+    Once at least `min_calls` were made and the failed share reaches `error_rate`, it opens
+    and fails calls fast for `cooldown` seconds. It then half-opens and lets one probe
+    through: a success closes it, a failure opens it again.
+    """
+
+    def __init__(self, window: float = 30.0, error_rate: float = 0.5, min_calls: int = 20, cooldown: float = 15.0):
+        self.window = window
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.opened_at = 0.0
+        self.trips = 0
+        self._outcomes = collections.deque()
+        self._failures = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go through now; in the half-open state only one probe at a time may."""
+        with self._lock:
+            if self.state == 'open':
+                if time.monotonic() - self.opened_at < self.cooldown:
+                    return False
+                self.state = 'half_open'
+                self._probing = False
+                logger.info("Circuit breaker half-open, probing OpenAI")
+            if self.state == 'half_open':
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def record(self, ok: bool) -> None:
+        """Record the outcome of a call that was allowed through."""
+        now = time.monotonic()
+        with self._lock:
+            if self.state == 'half_open':
+                self._probing = False
+                if ok:
+                    self.state = 'closed'
+                    self._outcomes.clear()
+                    self._failures = 0
+                    logger.info("Circuit breaker closed")
+                else:
+                    self._open(now)
+                return
+
+            self._outcomes.append((now, ok))
+            self._failures += not ok
+            while self._outcomes and self._outcomes[0][0] < now - self.window:
+                self._failures -= not self._outcomes.popleft()[1]
+            calls = len(self._outcomes)
+            if self.state == 'closed' and calls >= self.min_calls and self._failures / calls >= self.error_rate:
+                self._open(now)
+
+    def release(self) -> None:
+        """Give back the probe slot of an allowed call that was cancelled before its outcome was known."""
+        with self._lock:
+            self._probing = False
+
+    def _open(self, now: float) -> None:
+        self.state = 'open'
+        self.opened_at = now
+        self.trips += 1
+        logger.warning(f"Circuit breaker open for {self.cooldown}s")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            calls = len(self._outcomes)
+            return {
+                'state': self.state,
+                'trips': self.trips,
+                'window_calls': calls,
+                'window_error_rate': round(self._failures / calls, 4) if calls else 0.0,
+            }
+
+
+class OpenAITransport:
+    """
+    Resilient chat completions over the pooled OpenAI clients.
+
+    Every attempt has its own deadline. On the async path, an attempt still unanswered
+    after the recent `hedge_quantile` latency gets a duplicate (hedged) request, and the
+    first answer wins, which cuts the tail latency of a slow upstream for a small share of
+    extra calls. Transient failures (timeouts, connection errors, 429 and 5xx) are retried
+    with jittered exponential backoff and counted by the circuit breaker; while it is
+    open, calls raise CircuitOpenError at once.
+    """
+
+    # Successful latencies kept to pick the hedge delay, and how many are needed before hedging
+    latency_samples = 200
+    min_latency_samples = 20
+
+    def __init__(self, client: Any, async_client: Any, breaker: CircuitBreaker, attempt_timeout: float = 30.0,
+                 max_retries: int = 3, backoff_base: float = 0.5, hedge_max: int = 1, hedge_quantile: float = 0.95,
+                 hedge_min_delay: float = 0.05):
+        self.client = client
+        self.async_client = async_client
+        self.breaker = breaker
+        self.attempt_timeout = attempt_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.hedge_max = hedge_max
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self._latencies = collections.deque(maxlen=self.latency_samples)
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Check whether an OpenAI call failure is worth retrying."""
+        if isinstance(error, (asyncio.TimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+            return True
+        return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter for the given retry attempt."""
+        return random.uniform(0, self.backoff_base * (2 ** attempt))
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging an attempt, or None while hedging is off or warming up."""
+        if self.hedge_max <= 0 or len(self._latencies) < self.min_latency_samples:
+            return None
+        latencies = sorted(self._latencies)
+        index = min(len(latencies) - 1, int(self.hedge_quantile * len(latencies)))
+        return max(self.hedge_min_delay, latencies[index])
+
+    def _outcome(self, error: Optional[Exception]) -> str:
+        if error is None:
+            return 'ok'
+        if isinstance(error, (asyncio.TimeoutError, openai.APITimeoutError)):
+            return 'timeout'
+        if isinstance(error, openai.RateLimitError):
+            return 'rate_limited'
+        if isinstance(error, openai.APIConnectionError):
+            return 'connection_error'
+        if isinstance(error, openai.APIStatusError) and error.status_code >= 500:
+            return 'server_error'
+        return 'client_error'
+
+    def _record(self, error: Optional[Exception]) -> None:
+        """Count one attempt; only transient failures count against the breaker."""
+        llm_attempts.inc(outcome=self._outcome(error))
+        self.breaker.record(error is None or not self.is_retryable(error))
+
+    def _check_breaker(self) -> None:
+        if not self.breaker.allow():
+            llm_rejected.inc()
+            raise CircuitOpenError("OpenAI circuit breaker is open")
+
+    def create(self, **request) -> Any:
+        """Blocking chat completion with per-attempt deadlines, retries and the circuit breaker (no hedging)."""
+        for attempt in range(self.max_retries + 1):
+            self._check_breaker()
+            start = time.perf_counter()
+            try:
+                response = self.client.chat.completions.create(**request, timeout=self.attempt_timeout)
+            except Exception as e:
+                self._record(e)
+                if attempt < self.max_retries and self.is_retryable(e):
+                    delay = self.backoff_delay(attempt)
+                    logger.warning(f"OpenAI call failed ({type(e).__name__}), retrying in {delay:.2f}s")
+                    time.sleep(delay)
+                    continue
+                raise
+            self._latencies.append(time.perf_counter() - start)
+            self._record(None)
+            return response
+
+    async def acreate(self, **request) -> Any:
+        """Chat completion with per-attempt deadlines, hedging, retries and the circuit breaker."""
+        for attempt in range(self.max_retries + 1):
+            self._check_breaker()
+            try:
+                response = await self._ahedged(request)
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                self._record(e)
+                if attempt < self.max_retries and self.is_retryable(e):
+                    delay = self.backoff_delay(attempt)
+                    logger.warning(f"OpenAI call failed ({type(e).__name__}), retrying in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+                    continue
+                raise
+            self._record(None)
+            return response
+
+    async def _acall(self, request: Dict) -> Any:
+        return await self.async_client.chat.completions.create(**request, timeout=self.attempt_timeout)
+
+    async def _ahedged(self, request: Dict) -> Any:
+        """
+        One attempt: the request plus up to `hedge_max` duplicates, each sent once the ones
+        before it have been pending for the hedge delay. Returns the first answer, cancelling
+        the others; raises the last failure, or asyncio.TimeoutError at the attempt deadline.
+
+        The latency sample is the time since the first request was sent, even when a hedge
+        answers: a hedge's own shorter latency would pull the hedge delay down with it.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.attempt_timeout
+        hedge_delay = self.hedge_delay()
+        start = time.perf_counter()
+        first = asyncio.ensure_future(self._acall(request))
+        tasks = [first]
+        hedges = 0
+        error = None
+        try:
+            while tasks:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                can_hedge = hedge_delay is not None and hedges < self.hedge_max
+                wait = min(remaining, hedge_delay) if can_hedge else remaining
+                done, _ = await asyncio.wait(tasks, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    tasks.remove(task)
+                    if task.exception() is None:
+                        self._latencies.append(time.perf_counter() - start)
+                        if hedges:
+                            llm_hedges.inc(result='won' if task is not first else 'lost')
+                        return task.result()
+                    error = task.exception()
+
+                if not done and can_hedge:
+                    hedges += 1
+                    llm_hedges.inc(result='sent')
+                    tasks.append(asyncio.ensure_future(self._acall(request)))
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> Dict:
+        """Breaker state, attempt outcomes, hedging counters and the current hedge delay."""
+        delay = self.hedge_delay()
+        return {
+            'breaker': self.breaker.stats(),
+            'attempts': llm_attempts.values(),
+            'hedges': llm_hedges.values(),
+            'rejected': llm_rejected.values(),
+            'hedge_delay': round(delay, 4) if delay is not None else None,
+            'attempt_timeout': self.attempt_timeout,
+        }
\ No newline at end of file
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+from typing import Literal, Tuple, get_args, get_origin
+from src.models.schemas import CustomerData
+
+# Vectorized counterparts of CustomerData.normalize_case
+_NORMALIZERS = {
+    'Geography': lambda values: values.str.title(),
+    'Gender': lambda values: values.str.capitalize(),
+}
+
+def field_rules():
+    """Read type, allowed values and bounds of every CustomerData field from the model itself."""
+    rules = []
+    for name, field in CustomerData.model_fields.items():
+        choices = get_args(field.annotation) if get_origin(field.annotation) is Literal else None
+        ge = le = None
+        for constraint in field.metadata:
+            ge = getattr(constraint, 'ge', ge)
+            le = getattr(constraint, 'le', le)
+        rules.append((name, field.annotation, choices, ge, le))
+    return rules
+
+_RULES = field_rules()
+
+def validate_frame(frame: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray, pd.Series]:
+    """
+    Validate a frame of raw customer rows with vectorized checks mirroring CustomerData.
+
+    Returns the normalized customer columns, a boolean mask of valid rows and a Series
+    with the reasons each invalid row was rejected (empty for valid rows).
+    """
+    clean = pd.DataFrame(index=frame.index)
+    errors = pd.Series('', index=frame.index, dtype=object)
+
+    for name, annotation, choices, ge, le in _RULES:
+        if name not in frame.columns:
+            errors = errors + f'{name}: missing; '
+            clean[name] = np.nan
+            continue
+
+        column = frame[name]
+        if choices is not None:
+            values = column.astype('string').str.strip()
+            if name in _NORMALIZERS:
+                values = _NORMALIZERS[name](values)
+            bad = np.array((~values.isin(choices)).fillna(True), dtype=bool)
+            values = values.astype(object)
+        else:
+            values = pd.to_numeric(column, errors='coerce')
+            bad = np.array(values.isna(), dtype=bool)
+            if annotation is int:
+                bad |= (values % 1 != 0).to_numpy()
+            if ge is not None:
+                bad |= (values < ge).to_numpy()
+            if le is not None:
+                bad |= (values > le).to_numpy()
+
+        clean[name] = values
+        errors = errors.where(~bad, errors + f'{name}: invalid; ')
+
+    valid = (errors == '').to_numpy()
+    return clean, valid, errors.str.rstrip('; ')
\ No newline at end of file
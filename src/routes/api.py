@@ -1,61 +1,150 @@
-from fastapi import APIRouter
-from typing import List, Dict
-from src.controllers.ExtractorController import ExtractorController
-from src.controllers.PredictionController import PredictionController
-from src.models.schemas import TextRequest, BatchTextRequest
-
-# Initialize router
-router = APIRouter(prefix="/prediction", tags=["Prediction"])
-
-# Initialize controllers
-extractor_controller = ExtractorController()
-prediction_controller = PredictionController()
-
-# Routes
-@router.post("/from-text", response_model=Dict)
-async def predict_from_text(
-    request: TextRequest
-):
-    """
-    Extract features from text and predict churn.
-    """
-    # Extract features from text
-    customer_data = extractor_controller.extract_features(request.text)
-    
-    # Make prediction
-    prediction = prediction_controller.predict_new(customer_data)
-    
-    return prediction
-
-@router.post("/from-text-with-probability", response_model=Dict)
-async def predict_from_text_with_probability(
-    request: TextRequest
-):
-    """
-    Extract features from text and predict churn with probability.
-    """
-    # Extract features from text
-    customer_data = extractor_controller.extract_features(request.text)
-    
-    # Make prediction with probability
-    prediction = prediction_controller.predict_with_probability(customer_data)
-    
-    return prediction
-
-@router.post("/batch", response_model=List[Dict])
-async def predict_batch(
-    request: BatchTextRequest,
-):
-    """
-    Process a batch of customer descriptions and predict churn for each.
-    """
-    # Extract features for each text
-    customer_data_list = []
-    for text in request.texts:
-        customer_data = extractor_controller.extract_features(text)
-        customer_data_list.append(customer_data)
-    
-    # Make batch prediction
-    predictions = prediction_controller.predict_batch(customer_data_list)
-    
-    return predictions
\ No newline at end of file
+import json
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Dict
+from src.helpers.config import settings
+from src.controllers.ExtractorController import ExtractorController
+from src.controllers.PredictionController import PredictionController
+from src.models.schemas import TextRequest, BatchTextRequest, ExplainRequest
+from src.routes.dependencies import get_extractor_controller, get_prediction_controller
+
+# Initialize router
+router = APIRouter(prefix="/prediction", tags=["Prediction"])
+
+# Routes
+@router.post("/from-text", response_model=Dict)
+async def predict_from_text(
+    request: TextRequest,
+    extractor_controller: ExtractorController = Depends(get_extractor_controller),
+    prediction_controller: PredictionController = Depends(get_prediction_controller)
+):
+    """
+    Extract features from text and predict churn.
+    """
+    # Extract features from text
+    customer_data = await extractor_controller.aextract_features(request.text)
+    
+    # Make prediction
+    prediction = await prediction_controller.apredict_new(customer_data)
+    
+    return prediction
+
+@router.post("/from-text-with-probability", response_model=Dict)
+async def predict_from_text_with_probability(
+    request: TextRequest,
+    extractor_controller: ExtractorController = Depends(get_extractor_controller),
+    prediction_controller: PredictionController = Depends(get_prediction_controller)
+):
+    """
+    Extract features from text and predict churn with probability.
+    """
+    # Extract features from text
+    customer_data = await extractor_controller.aextract_features(request.text)
+    
+    # Make prediction with probability
+    prediction = await prediction_controller.apredict_with_probability(customer_data)
+    
+    return prediction
+
+@router.post("/batch", response_model=List[Dict])
+async def predict_batch(
+    request: BatchTextRequest,
+    extractor_controller: ExtractorController = Depends(get_extractor_controller),
+    prediction_controller: PredictionController = Depends(get_prediction_controller)
+):
+    """
+    Process a batch of customer descriptions and predict churn for each.
+    """
+    # Extract features for all texts concurrently
+    customer_data_list = await extractor_controller.aextract_features_batch(request.texts)
+    
+    # Make batch prediction; up to BATCH_MAX_TEXTS rows are scored off the event loop
+    predictions = await asyncio.to_thread(prediction_controller.predict_batch, customer_data_list)
+    
+    return predictions
+
+@router.post("/explain", response_model=List[Dict])
+async def explain_predictions(
+    request: ExplainRequest,
+    extractor_controller: ExtractorController = Depends(get_extractor_controller),
+    prediction_controller: PredictionController = Depends(get_prediction_controller)
+):
+    """
+    Predict churn for a batch of customer descriptions with the contribution of each feature.
+    
+    Every result carries `Probability`, the forest's average `BaseValue` and `Contributions`
+    per input column, largest first, which add up from `BaseValue` to `Probability`.
+    """
+    # Extract features for all texts concurrently
+    customer_data_list = await extractor_controller.aextract_features_batch(request.texts)
+    
+    return await asyncio.to_thread(prediction_controller.explain, customer_data_list, top=request.top)
+
+def _stream_row(index: int, result: Dict = None, error: str = None) -> str:
+    """
+    Format one NDJSON row of a streamed batch.
+    """
+    if error is None:
+        row = {'index': index, 'status': 'ok', 'result': result}
+    else:
+        row = {'index': index, 'status': 'error', 'error': error}
+    return json.dumps(row) + '\n'
+
+def _error_detail(error: Exception) -> str:
+    """
+    Message reported for a failed item.
+    """
+    if isinstance(error, HTTPException):
+        return str(error.detail)
+    return str(error) or type(error).__name__
+
+async def _stream_predictions(
+    texts: List[str],
+    with_probability: bool,
+    extractor_controller: ExtractorController,
+    prediction_controller: PredictionController
+) -> AsyncIterator[str]:
+    """
+    Score texts as their extractions complete and yield one NDJSON row per text.
+    """
+    async for items in extractor_controller.aextract_features_stream(texts, settings.stream_max_in_flight):
+        extracted = [(index, data) for index, data in items if not isinstance(data, Exception)]
+        for index, error in items:
+            if isinstance(error, Exception):
+                yield _stream_row(index, error=_error_detail(error))
+        
+        if not extracted:
+            continue
+        
+        # Score everything extracted by one request together; failures are reported per row
+        try:
+            predictions = await asyncio.to_thread(
+                prediction_controller.predict_batch, [data for _, data in extracted], with_probability
+            )
+        except Exception as e:
+            predictions = [{'Error': _error_detail(e)}] * len(extracted)
+        
+        for (index, _), prediction in zip(extracted, predictions):
+            if 'Error' in prediction:
+                yield _stream_row(index, error=prediction['Error'])
+            else:
+                yield _stream_row(index, result=prediction)
+
+@router.post("/batch/stream")
+async def predict_batch_stream(
+    request: BatchTextRequest,
+    with_probability: bool = False,
+    extractor_controller: ExtractorController = Depends(get_extractor_controller),
+    prediction_controller: PredictionController = Depends(get_prediction_controller)
+):
+    """
+    Process a batch of customer descriptions, streaming one NDJSON row per text as soon as it is scored.
+    
+    Rows arrive in completion order as `{"index", "status": "ok", "result"}` or
+    `{"index", "status": "error", "error"}`, so one bad text does not fail the batch.
+    """
+    return StreamingResponse(
+        _stream_predictions(request.texts, with_probability, extractor_controller, prediction_controller),
+        media_type="application/x-ndjson"
+    )
\ No newline at end of file
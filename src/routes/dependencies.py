@@ -0,0 +1,137 @@
+import gc
+import asyncio
+import logging
+import threading
+from typing import Optional
+from fastapi import HTTPException
+from src.helpers.config import settings
+from src.controllers.ExtractorController import ExtractorController
+from src.controllers.PredictionController import PredictionController
+from src.controllers.JobController import JobController
+from src.helpers.profiler import SamplingProfiler
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Shared controller instances, created on first use
+_controllers = {}
+_lock = threading.Lock()
+
+def get_prediction_controller() -> PredictionController:
+    """
+    Return the shared PredictionController, loading the models on first use.
+    """
+    controller = _controllers.get('prediction')
+    if controller is None:
+        with _lock:
+            controller = _controllers.get('prediction')
+            if controller is None:
+                controller = _controllers['prediction'] = PredictionController()
+    return controller
+
+def active_prediction_controller() -> Optional[PredictionController]:
+    """
+    Return the shared PredictionController if it was created, without loading the models.
+    """
+    return _controllers.get('prediction')
+
+def get_extractor_controller() -> ExtractorController:
+    """
+    Return the shared ExtractorController, creating the OpenAI clients on first use.
+
+    Prediction-only deployments never call this, so they run without OpenAI credentials.
+    """
+    controller = _controllers.get('extractor')
+    if controller is None:
+        with _lock:
+            controller = _controllers.get('extractor')
+            if controller is None:
+                try:
+                    controller = _controllers['extractor'] = ExtractorController()
+                except ValueError as e:
+                    logger.error(f"Extractor unavailable: {str(e)}")
+                    raise HTTPException(status_code=503, detail=f"Extractor unavailable: {str(e)}")
+    return controller
+
+def get_job_controller() -> JobController:
+    """
+    Return the shared JobController.
+    """
+    controller = _controllers.get('jobs')
+    if controller is None:
+        with _lock:
+            controller = _controllers.get('jobs')
+            if controller is None:
+                controller = _controllers['jobs'] = JobController(get_extractor_controller, get_prediction_controller)
+    return controller
+
+def start_jobs() -> None:
+    """
+    Start the background job workers, resuming the jobs left unfinished by the last run.
+    """
+    if settings.job_workers > 0:
+        get_job_controller().start()
+
+def start_drift_snapshots() -> None:
+    """
+    Save the drift monitor's windows every DRIFT_SNAPSHOT_INTERVAL seconds, off the request path.
+    """
+    if settings.drift_monitor and settings.drift_snapshot_path and 'drift_snapshots' not in _controllers:
+        _controllers['drift_snapshots'] = asyncio.create_task(_save_drift_snapshots())
+
+async def _save_drift_snapshots() -> None:
+    while True:
+        await asyncio.sleep(settings.drift_snapshot_interval)
+        # The monitor only exists once the models were loaded
+        controller = active_prediction_controller()
+        if controller is not None and controller.drift is not None:
+            await asyncio.to_thread(controller.drift.save)
+
+def start_profiler() -> None:
+    """
+    Start the sampling profiler on the calling (serving) thread when PROFILER_ENABLED is set.
+    """
+    if settings.profiler_enabled and 'profiler' not in _controllers:
+        profiler = _controllers['profiler'] = SamplingProfiler(interval=settings.profiler_interval_ms / 1000)
+        profiler.start()
+
+def get_profiler() -> SamplingProfiler:
+    """
+    Return the running sampling profiler.
+    """
+    profiler = _controllers.get('profiler')
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Profiler is disabled, set PROFILER_ENABLED=true")
+    return profiler
+
+def preload(freeze: bool = False) -> None:
+    """
+    Load the models and build the prediction controller ahead of the first request.
+
+    With `freeze`, every object created so far is moved out of the garbage collector's
+    reach, so forked workers do not touch (and copy) the pages holding the models.
+    """
+    get_prediction_controller()
+    if freeze:
+        gc.freeze()
+        logger.info(f"Preloaded models and froze {gc.get_freeze_count()} objects before forking")
+
+async def shutdown() -> None:
+    """
+    Release clients and caches held by the controllers.
+    """
+    jobs = _controllers.pop('jobs', None)
+    if jobs is not None:
+        await jobs.stop()
+    snapshots = _controllers.pop('drift_snapshots', None)
+    if snapshots is not None:
+        snapshots.cancel()
+    extractor = _controllers.pop('extractor', None)
+    if extractor is not None:
+        await extractor.aclose()
+    prediction = _controllers.pop('prediction', None)
+    if prediction is not None and prediction.drift is not None:
+        prediction.drift.save()
+    profiler = _controllers.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop()
\ No newline at end of file
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Dict
+from src.controllers.JobController import JobController
+from src.models.schemas import JobRequest
+from src.routes.dependencies import get_job_controller
+
+# Initialize router
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+# Routes
+@router.post("", response_model=Dict, status_code=202)
+async def submit_job(
+    request: JobRequest,
+    job_controller: JobController = Depends(get_job_controller)
+):
+    """
+    Queue a batch of customer descriptions for background extraction and prediction.
+
+    Returns at once with the job id; poll `/jobs/{job_id}` for progress and read the
+    predictions page by page from `/jobs/{job_id}/results`.
+    """
+    return await job_controller.submit(request.texts, request.with_probability)
+
+@router.get("/{job_id}", response_model=Dict)
+async def job_status(
+    job_id: str,
+    job_controller: JobController = Depends(get_job_controller)
+):
+    """
+    Return the status (queued, running, completed or failed) and progress of a job.
+    """
+    return await job_controller.status(job_id)
+
+@router.get("/{job_id}/results", response_model=Dict)
+async def job_results(
+    job_id: str,
+    offset: int = 0,
+    limit: int = 100,
+    job_controller: JobController = Depends(get_job_controller)
+):
+    """
+    Return the results of a job for texts `offset` to `offset + limit`, in input order.
+
+    Each item is `{"index", "status": "ok", "result"}`, `{"index", "status": "error", "error"}`
+    or, while the job runs, `{"index", "status": "pending"}`.
+    """
+    if offset < 0 or not 1 <= limit <= 1000:
+        raise HTTPException(status_code=400, detail="offset must be >= 0 and limit between 1 and 1000")
+    return await job_controller.results(job_id, offset, limit)
\ No newline at end of file
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends
+from typing import Dict
+from src.controllers.PredictionController import PredictionController
+from src.routes.dependencies import get_prediction_controller
+
+# Initialize router
+router = APIRouter(prefix="/models", tags=["Models"])
+
+# Routes
+@router.get("", response_model=Dict)
+async def list_models(
+    prediction_controller: PredictionController = Depends(get_prediction_controller)
+):
+    """
+    Return the active model version and every version available in the registry.
+    """
+    return prediction_controller.model_info()
+
+@router.post("/{version}/activate", response_model=Dict)
+async def activate_model(
+    version: str,
+    prediction_controller: PredictionController = Depends(get_prediction_controller)
+):
+    """
+    Load a model version, warm it up on a test batch and swap it in without dropping requests.
+    
+    Requests already being scored finish on the previous version; the swap only happens
+    once the new version has scored the test batch successfully.
+    """
+    return await prediction_controller.activate(version)
\ No newline at end of file
@@ -0,0 +1,132 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from typing import Dict, List
+from src.helpers.config import settings
+from src.helpers.metrics import metrics
+from src.controllers.ExtractorController import ExtractorController
+from src.controllers.PredictionController import PredictionController
+from src.helpers.profiler import SamplingProfiler
+from src.routes.dependencies import get_extractor_controller, get_prediction_controller, get_profiler
+
+# Initialize router
+router = APIRouter(prefix="/monitoring", tags=["Monitoring"])
+
+# Routes
+@router.get("/cache", response_model=Dict)
+async def cache_stats(
+    prediction_controller: PredictionController = Depends(get_prediction_controller)
+):
+    """
+    Return size and hit/miss/eviction counters of the prediction memo and, when the extractor
+    is available (it needs OpenAI credentials), of the extraction cache.
+    """
+    try:
+        extraction = get_extractor_controller().cache.stats()
+    except HTTPException:
+        extraction = None
+    return {
+        'extraction': extraction,
+        'prediction': prediction_controller.memo_stats()
+    }
+
+@router.get("/extraction", response_model=Dict)
+async def extraction_usage(
+    extractor_controller: ExtractorController = Depends(get_extractor_controller)
+):
+    """
+    Return LLM token usage (cached prompt tokens included) and tokens per customer per prompting mode.
+    """
+    return extractor_controller.usage_stats()
+
+@router.get("/transport", response_model=Dict)
+async def transport_stats(
+    extractor_controller: ExtractorController = Depends(get_extractor_controller)
+):
+    """
+    Return the OpenAI circuit breaker state, attempt outcomes, hedged requests and fallbacks.
+    """
+    return extractor_controller.transport_stats()
+
+@router.get("/rules", response_model=Dict)
+async def rule_extraction_stats(
+    extractor_controller: ExtractorController = Depends(get_extractor_controller)
+):
+    """
+    Return the rule extractor hit rate, per-field hits and per-field agreement with the LLM.
+    """
+    return extractor_controller.rule_stats()
+
+@router.get("/batching", response_model=Dict)
+async def batching_stats(
+    prediction_controller: PredictionController = Depends(get_prediction_controller)
+):
+    """
+    Return micro-batching settings and batch-size, queue-depth and wait-time histograms.
+    """
+    return prediction_controller.batching_stats()
+
+@router.get("/drift", response_model=Dict)
+async def drift_report(
+    detail: bool = False,
+    prediction_controller: PredictionController = Depends(get_prediction_controller)
+):
+    """
+    Return PSI and KS drift scores of live inputs and churn probabilities against dataset.csv.
+    
+    Fields are sorted worst first; with `detail`, the bins and both histograms are included.
+    """
+    # The first report after startup or a model swap scores the baseline dataset
+    return await asyncio.to_thread(prediction_controller.drift_report, detail)
+
+@router.post("/drift/reset", response_model=Dict)
+async def reset_drift(
+    prediction_controller: PredictionController = Depends(get_prediction_controller)
+):
+    """
+    Drop the live drift windows and start counting again.
+    """
+    if prediction_controller.drift is None:
+        raise HTTPException(status_code=404, detail="Drift monitor is disabled, set DRIFT_MONITOR=true")
+    # Resetting writes the emptied snapshot to disk
+    await asyncio.to_thread(prediction_controller.drift.reset)
+    return await asyncio.to_thread(prediction_controller.drift_report)
+
+@router.get("/stages", response_model=Dict)
+async def stage_latencies():
+    """
+    Return latency histograms (seconds) and error counts per processing stage.
+    """
+    return {
+        'latency': metrics.stage_seconds.stats(),
+        'errors': metrics.stage_errors.values()
+    }
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile(
+    limit: int = 200,
+    reset: bool = False,
+    profiler: SamplingProfiler = Depends(get_profiler)
+):
+    """
+    Return the most frequent stacks sampled by the profiler in collapsed (flame graph) format.
+    """
+    stacks = profiler.collapsed(limit)
+    if reset:
+        profiler.reset()
+    return stacks
+
+@router.get("/threshold-sweep", response_model=List[Dict])
+async def threshold_sweep(
+    steps: int = 19,
+    prediction_controller: PredictionController = Depends(get_prediction_controller)
+):
+    """
+    Precision, recall and F1 of the Exit class over evenly spaced decision thresholds
+    on the labelled training dataset.
+    """
+    if steps < 1 or steps > 999:
+        raise HTTPException(status_code=400, detail="steps must be between 1 and 999")
+    thresholds = [round((i + 1) / (steps + 1), 4) for i in range(steps)]
+    # Scoring the whole dataset would stall the event loop
+    return await asyncio.to_thread(prediction_controller.threshold_sweep_csv, settings.dataset_path, thresholds)
\ No newline at end of file
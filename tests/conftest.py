@@ -0,0 +1,83 @@
+import sys
+import joblib
+import openai
+import pytest
+import subprocess
+import pandas as pd
+from benchmarks.load import ROOT, describe, free_port, wait_ready
+from src.helpers.config import settings
+
+
+@pytest.fixture(scope='session')
+def dataset() -> pd.DataFrame:
+    """The raw customer columns of dataset.csv, typed as the API receives them."""
+    return pd.read_csv(settings.dataset_path)[settings.columns].astype(settings.dtypes)
+
+
+@pytest.fixture(scope='session')
+def artifacts():
+    """The unpickled preprocessing pipeline and sklearn classifier of the base version."""
+    paths = settings.registry.artifact_paths(settings.registry.base_version)
+    return joblib.load(paths['preprocessor']), joblib.load(paths['classifier'])
+
+
+@pytest.fixture(scope='session')
+def texts(dataset):
+    """Templated descriptions of the first dataset rows, which the fake OpenAI server can read."""
+    return [describe(row) for row in dataset.head(50).to_dict('records')]
+
+
+@pytest.fixture
+def fake_openai():
+    """
+    Start benchmarks/fake_openai.py with the given command-line options; returns its base URL.
+
+    `GET <url>/stats` reports the requests it got, its answers by status and peak concurrency.
+    """
+    processes = []
+
+    def start(*options: str) -> str:
+        port = free_port()
+        processes.append(subprocess.Popen(
+            [sys.executable, str(ROOT / 'benchmarks' / 'fake_openai.py'), '--port', str(port), *options]
+        ))
+        url = f'http://127.0.0.1:{port}'
+        wait_ready(f'{url}/stats')
+        return url
+
+    yield start
+    for process in processes:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+@pytest.fixture
+def make_extractor(monkeypatch):
+    """
+    Build an ExtractorController against a fake OpenAI server, with settings overridden.
+
+    Caches, the rule extractor, hedging and backoff are off unless overridden, so every
+    text reaches the fake server and tests run fast.
+    """
+    from src.controllers.ExtractorController import ExtractorController
+
+    def make(url: str, **overrides) -> ExtractorController:
+        # Set in the instance dict: reading the lazy client attributes would need an API key
+        monkeypatch.setitem(settings.__dict__, 'client', openai.OpenAI(api_key='fake', base_url=f'{url}/v1', max_retries=0))
+        monkeypatch.setitem(
+            settings.__dict__, 'async_client', openai.AsyncOpenAI(api_key='fake', base_url=f'{url}/v1', max_retries=0)
+        )
+        defaults = {
+            'extraction_cache_size': 0,
+            'extraction_cache_path': '',
+            'rule_extraction': False,
+            'rule_verify_rate': 0.0,
+            'extraction_hedge_max': 0,
+            'extraction_backoff_base': 0.01,
+            'extraction_max_retries': 0,
+        }
+        for name, value in {**defaults, **overrides}.items():
+            monkeypatch.setattr(settings, name, value)
+        return ExtractorController()
+
+    return make
\ No newline at end of file
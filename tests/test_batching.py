@@ -0,0 +1,57 @@
+import time
+import asyncio
+from src.helpers.batching import MicroBatcher
+
+
+def recorder(calls):
+    def score_batch(items):
+        calls.append(list(items))
+        if 'bad' in items:
+            raise ValueError('cannot score bad')
+        return [item.upper() for item in items]
+    return score_batch
+
+
+async def submit_all(batcher, items):
+    return await asyncio.gather(*(batcher.submit(item) for item in items), return_exceptions=True)
+
+
+def test_batch_is_flushed_when_full():
+    calls = []
+    batcher = MicroBatcher(recorder(calls), max_batch_size=3, max_wait_us=10e6)
+
+    started = time.perf_counter()
+    results = asyncio.run(submit_all(batcher, ['a', 'b', 'c']))
+    assert time.perf_counter() - started < 1.0
+    assert results == ['A', 'B', 'C']
+    assert calls == [['a', 'b', 'c']]
+
+
+def test_partial_batch_is_flushed_after_the_wait():
+    calls = []
+    batcher = MicroBatcher(recorder(calls), max_batch_size=100, max_wait_us=50e3)
+
+    started = time.perf_counter()
+    results = asyncio.run(submit_all(batcher, ['a', 'b']))
+    assert time.perf_counter() - started >= 0.05
+    assert results == ['A', 'B']
+    assert calls == [['a', 'b']]
+    assert batcher.stats()['pending'] == 0
+
+
+def test_items_beyond_a_full_batch_start_their_own():
+    calls = []
+    batcher = MicroBatcher(recorder(calls), max_batch_size=2, max_wait_us=10e3)
+
+    assert asyncio.run(submit_all(batcher, ['a', 'b', 'c'])) == ['A', 'B', 'C']
+    assert calls == [['a', 'b'], ['c']]
+
+
+def test_failed_batch_is_scored_item_by_item():
+    calls = []
+    batcher = MicroBatcher(recorder(calls), max_batch_size=3, max_wait_us=10e3)
+
+    first, bad, last = asyncio.run(submit_all(batcher, ['a', 'bad', 'c']))
+    assert (first, last) == ('A', 'C')
+    assert isinstance(bad, ValueError) and str(bad) == 'cannot score bad'
+    assert calls == [['a', 'bad', 'c'], ['a'], ['bad'], ['c']]
\ No newline at end of file
@@ -0,0 +1,71 @@
+import time
+from src.helpers import cache as cache_module
+from src.helpers.cache import ExtractionCache, LRUCache, SQLiteCache
+from src.models.schemas import CustomerData
+
+
+def customer(dataset, row: int = 0) -> CustomerData:
+    return CustomerData(**dataset.iloc[row].to_dict())
+
+
+def test_memory_entries_expire_after_the_ttl():
+    memory = LRUCache(10, ttl=0.05)
+    memory.set('key', 'value')
+    assert memory.get('key') == 'value'
+
+    time.sleep(0.1)
+    assert memory.get('key') is None
+    assert memory.stats()['expirations'] == 1
+    assert len(memory) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    memory = LRUCache(2)
+    memory.set('a', 1)
+    memory.set('b', 2)
+    memory.get('a')
+    memory.set('c', 3)
+
+    assert memory.get('b') is None
+    assert (memory.get('a'), memory.get('c')) == (1, 3)
+    assert memory.stats()['evictions'] == 1
+
+
+def test_disk_tier_is_read_through_into_memory(dataset, tmp_path):
+    path, text = tmp_path / 'extraction.db', 'A 42 year old customer from France'
+    writer = ExtractionCache(LRUCache(10), 'model', 'v1', disk=SQLiteCache(path))
+    writer.set(text, customer(dataset))
+    writer.disk.close()
+
+    # A restarted process starts with an empty memory tier
+    reader = ExtractionCache(LRUCache(10), 'model', 'v1', disk=SQLiteCache(path))
+    assert reader.get('  a 42 YEAR old customer from France ') == customer(dataset)
+    assert reader.stats()['disk']['hits'] == 1
+    assert reader.get(text) == customer(dataset)
+    assert reader.stats()['memory']['hits'] == 1
+    assert reader.stats()['disk']['hits'] == 1
+    # Another prompt version never reads the entry
+    assert ExtractionCache(LRUCache(10), 'model', 'v2', disk=reader.disk).get(text) is None
+    reader.disk.close()
+
+
+def test_disk_tier_prunes_expired_and_oldest_entries(tmp_path, monkeypatch):
+    path = tmp_path / 'extraction.db'
+    disk = SQLiteCache(path, ttl=0.05)
+    disk.set('expired', 'value')
+    time.sleep(0.1)
+    disk.close()
+    # Expired rows are deleted when the cache is opened, not only when read
+    disk = SQLiteCache(path, ttl=0.05)
+    assert disk.stats()['size'] == 0
+    assert disk.stats()['expirations'] == 1
+    disk.close()
+
+    monkeypatch.setattr(cache_module, '_PRUNE_EVERY', 4)
+    disk = SQLiteCache(path, max_entries=3)
+    for index in range(8):
+        disk.set(f'key-{index}', 'value')
+    assert disk.stats()['size'] == 3
+    assert disk.stats()['evictions'] == 5
+    assert [disk.get(f'key-{index}') for index in (4, 5, 6, 7)] == [None, 'value', 'value', 'value']
+    disk.close()
\ No newline at end of file
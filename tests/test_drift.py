@@ -0,0 +1,74 @@
+import os
+import subprocess
+import numpy as np
+from src.helpers import drift as drift_module
+from src.helpers.drift import DriftMonitor
+
+
+def make_monitor(dataset, path):
+    return DriftMonitor(
+        dataset, numeric=['Age', 'Balance'], categorical={'Geography': ['France', 'Germany', 'Spain']},
+        snapshot_path=path
+    )
+
+
+def observe(monitor, dataset, rows):
+    sample = dataset.head(rows)
+    monitor.observe({column: sample[column].tolist() for column in ('Age', 'Balance', 'Geography')}, [0.5] * rows)
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen(['true'])
+    process.wait()
+    return process.pid
+
+
+def test_each_process_saves_its_own_snapshot(dataset, tmp_path):
+    monitor = make_monitor(dataset, tmp_path / 'drift.json')
+    observe(monitor, dataset, 5)
+    monitor.save()
+
+    assert [path.name for path in tmp_path.iterdir()] == [f'drift.{os.getpid()}.json']
+    assert make_monitor(dataset, tmp_path / 'drift.json').report()['observed'] == 5
+
+
+def test_snapshot_of_a_stopped_worker_is_taken_over_once(dataset, tmp_path):
+    monitor = make_monitor(dataset, tmp_path / 'drift.json')
+    observe(monitor, dataset, 7)
+    monitor.save()
+    orphan = monitor.snapshot_file(dead_pid())
+    monitor.snapshot_file().rename(orphan)
+    # A worker that is still running keeps its snapshot
+    monitor.snapshot_file().with_name(f'drift.{os.getppid()}.json').write_text('{}')
+
+    assert make_monitor(dataset, tmp_path / 'drift.json').report()['observed'] == 7
+    assert not orphan.exists()
+    assert (tmp_path / f'drift.{os.getppid()}.json').read_text() == '{}'
+
+
+def test_failed_save_leaves_no_staging_file(dataset, tmp_path, monkeypatch):
+    def unserializable(*args, **kwargs):
+        raise TypeError('Object of type int64 is not JSON serializable')
+
+    monitor = make_monitor(dataset, tmp_path / 'drift.json')
+    monkeypatch.setattr(drift_module.json, 'dump', unserializable)
+    monitor.save()
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_probability_baseline_is_scored_by_the_first_report(dataset):
+    calls = []
+
+    def score():
+        calls.append(1)
+        return np.full(len(dataset), 0.5)
+
+    monitor = make_monitor(dataset, None)
+    monitor.set_probability_baseline(score)
+    assert not calls
+
+    report = monitor.report(detail=True)
+    monitor.report()
+    assert len(calls) == 1
+    assert sum(report['fields']['Probability']['baseline']) == len(dataset)
\ No newline at end of file
@@ -0,0 +1,7 @@
+from src.helpers.encoder import FeatureEncoder
+
+
+def test_encoder_matches_pipeline_on_dataset(dataset, artifacts):
+    pipe, _ = artifacts
+    encoder = FeatureEncoder.from_pipeline(pipe)
+    assert encoder.check_parity(pipe, dataset) == 0.0
\ No newline at end of file
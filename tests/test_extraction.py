@@ -0,0 +1,76 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import HTTPException
+from src.helpers.rules import RuleExtractor
+
+# A text neither the fake server nor the rules can read, so its failure cannot be papered over
+UNREADABLE = 'FAIL: a long-standing customer of ours.'
+
+
+def expected(texts):
+    """The fake server reads templated texts exactly as the rule extractor does."""
+    rules = RuleExtractor()
+    return [rules.to_customer(rules.extract(text)[0]) for text in texts]
+
+
+def run(extractor, coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await extractor.aclose()
+    return asyncio.run(main())
+
+
+def collect(extractor, texts, max_in_flight):
+    async def stream():
+        results = {}
+        async for items in extractor.aextract_features_stream(texts, max_in_flight):
+            results.update(items)
+        return [results[index] for index in range(len(texts))]
+    return run(extractor, stream())
+
+
+def test_batch_keeps_concurrent_requests_under_the_cap(fake_openai, make_extractor, texts):
+    url = fake_openai('--latency', '0.2')
+    extractor = make_extractor(url, extraction_concurrency=3)
+
+    results = run(extractor, extractor.aextract_features_batch(texts[:12]))
+    assert results == expected(texts[:12])
+    stats = httpx.get(f'{url}/stats').json()
+    assert stats['requests'] == 12
+    assert stats['max_in_flight'] == 3
+
+
+def test_items_missing_from_a_batched_answer_are_extracted_again(fake_openai, make_extractor, texts):
+    url = fake_openai('--drop-marker', 'DROP')
+    extractor = make_extractor(url, extraction_batch_size=4)
+    batch = texts[:3] + [texts[3] + ' DROP']
+
+    results = run(extractor, extractor.aextract_features_batch(batch))
+    assert results == expected(batch)
+    # One batched request, then the single-text prompt for the missing item
+    assert httpx.get(f'{url}/stats').json()['requests'] == 2
+
+
+def test_a_failing_text_fails_the_whole_batch_call(fake_openai, make_extractor, texts):
+    url = fake_openai('--fail-marker', 'FAIL')
+    extractor = make_extractor(url, extraction_max_retries=1)
+
+    with pytest.raises(HTTPException) as failure:
+        run(extractor, extractor.aextract_features_batch(texts[:5] + [UNREADABLE]))
+    assert failure.value.status_code == 503
+    # The failing text was retried once, then given up on
+    assert httpx.get(f'{url}/stats').json()['status']['500'] == 2
+
+
+@pytest.mark.parametrize('batch_size', [1, 3])
+def test_a_failing_text_only_fails_itself_when_streaming(fake_openai, make_extractor, texts, batch_size):
+    url = fake_openai('--fail-marker', 'FAIL')
+    extractor = make_extractor(url, extraction_batch_size=batch_size, extraction_max_retries=1)
+    batch = texts[:2] + [UNREADABLE] + texts[2:5]
+
+    results = collect(extractor, batch, max_in_flight=2)
+    assert isinstance(results[2], HTTPException)
+    assert results[:2] + results[3:] == expected(texts[:5])
\ No newline at end of file
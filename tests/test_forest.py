@@ -0,0 +1,10 @@
+import numpy as np
+from src.helpers.forest import CompiledForest
+
+
+def test_compiled_forest_matches_classifier_on_dataset(dataset, artifacts):
+    pipe, classifier = artifacts
+    X = pipe.transform(dataset)
+    forest = CompiledForest.from_classifier(classifier)
+    np.testing.assert_array_equal(forest.predict_proba(X), classifier.predict_proba(X))
+    np.testing.assert_array_equal(forest.predict(X), classifier.predict(X))
\ No newline at end of file
@@ -0,0 +1,61 @@
+import time
+import asyncio
+import httpx
+from src.helpers.config import settings
+from src.helpers.jobs import JobStore
+from src.controllers.JobController import JobController
+from src.controllers.PredictionController import PredictionController
+
+
+def test_a_live_lease_is_not_claimed_twice(tmp_path):
+    first, second = JobStore(tmp_path / 'jobs.db'), JobStore(tmp_path / 'jobs.db')
+    job_id = first.create(['text'])
+
+    assert first.claim('first', lease=60.0) == (job_id, False)
+    assert second.claim('second', lease=60.0) is None
+    first.close()
+    second.close()
+
+
+def test_job_resumes_after_a_restart(tmp_path, monkeypatch, fake_openai, make_extractor, texts):
+    monkeypatch.setattr(settings, 'job_db_path', tmp_path / 'jobs.db')
+    monkeypatch.setattr(settings, 'job_workers', 1)
+    monkeypatch.setattr(settings, 'job_chunk_size', 2)
+    monkeypatch.setattr(settings, 'job_poll_interval', 0.05)
+
+    # A worker of the previous run leased the job, finished two texts and died
+    store = JobStore(settings.job_db_path)
+    job_id = store.create(texts[:6], with_probability=True)
+    assert store.claim('dead-worker', lease=0.2) == (job_id, True)
+    finished = [(0, 'ok', {'Prediction': 'finished before the restart'}), (1, 'error', 'failed before the restart')]
+    store.save_results(job_id, finished)
+    store.close()
+    time.sleep(0.3)
+
+    url = fake_openai()
+    extractor = make_extractor(url)
+    prediction_controller = PredictionController(monitor_drift=False)
+    controller = JobController(lambda: extractor, lambda: prediction_controller)
+
+    async def resume():
+        controller.start()
+        try:
+            for _ in range(200):
+                job = await controller.status(job_id)
+                if job['status'] == 'completed':
+                    break
+                await asyncio.sleep(0.05)
+            return job, await controller.results(job_id, 0, 10)
+        finally:
+            await controller.stop()
+            await extractor.aclose()
+
+    job, results = asyncio.run(resume())
+    assert job['status'] == 'completed'
+    assert (job['succeeded'], job['failed'], job['pending']) == (5, 1, 0)
+    items = results['items']
+    assert items[0] == {'index': 0, 'status': 'ok', 'result': {'Prediction': 'finished before the restart'}}
+    assert items[1] == {'index': 1, 'status': 'error', 'error': 'failed before the restart'}
+    assert all(item['status'] == 'ok' and 'Probability' in item['result'] for item in items[2:])
+    # Only the four pending texts were extracted again
+    assert httpx.get(f'{url}/stats').json()['requests'] == 4
\ No newline at end of file
@@ -0,0 +1,15 @@
+from src.helpers.metrics import MetricsRegistry
+
+
+def test_large_values_render_at_full_precision():
+    registry = MetricsRegistry()
+    tokens = registry.counter('test_tokens_total', 'Tokens', ('mode',))
+    tokens.inc(1234567, mode='single')
+    latency = registry.histogram('test_seconds', 'Latency', buckets=(1.0,))
+    latency.observe(1234567.25)
+    registry.register_collector('test', lambda: [('test_cache_hits_total', 'counter', 'Hits', [({}, 9876543)])])
+
+    lines = registry.render().splitlines()
+    assert 'test_tokens_total{mode="single"} 1234567.0' in lines
+    assert 'test_seconds_sum 1234567.25' in lines
+    assert 'test_cache_hits_total 9876543.0' in lines
\ No newline at end of file
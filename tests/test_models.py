@@ -0,0 +1,16 @@
+from fastapi.testclient import TestClient
+from src.helpers.config import settings
+
+
+def test_activating_an_unknown_version_does_not_leak_paths(monkeypatch):
+    monkeypatch.setattr(settings, 'job_workers', 0)
+    monkeypatch.setattr(settings, 'drift_monitor', False)
+    import main
+
+    with TestClient(main.app) as client:
+        missing = client.post('/api/models/nope/activate')
+        invalid = client.post('/api/models/.hidden/activate')
+
+    assert missing.status_code == 404
+    assert missing.json() == {'detail': "Model version 'nope' not found"}
+    assert invalid.status_code == 400
\ No newline at end of file
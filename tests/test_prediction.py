@@ -0,0 +1,46 @@
+import copy
+from src.models.schemas import CustomerData
+from src.controllers.PredictionController import PredictionController
+
+
+def customers(dataset, rows: int):
+    return [CustomerData(**row) for row in dataset.head(rows).to_dict('records')]
+
+
+def retrained(controller: PredictionController):
+    """The active models under another fingerprint, as if their artifact files had changed."""
+    models = copy.copy(controller.models)
+    models.version, models.fingerprint = 'retrained', 'f' * 16
+    return models
+
+
+def test_repeated_profiles_are_served_from_the_memo(dataset):
+    controller = PredictionController(monitor_drift=False)
+    data = customers(dataset, 5)
+    first = controller.score(data)
+
+    assert controller.score(data + data[:2]) == first + first[:2]
+    stats = controller.memo_stats()
+    assert (stats['size'], stats['misses'], stats['hits']) == (5, 5, 7)
+
+
+def test_memo_is_cleared_when_models_are_swapped(dataset):
+    controller = PredictionController(monitor_drift=False)
+    data = customers(dataset, 5)
+    controller.score(data)
+
+    controller.swap_models(retrained(controller))
+    assert controller.memo_stats()['size'] == 0
+    controller.score(data)
+    assert controller.memo_stats()['misses'] == 10
+
+
+def test_memo_is_keyed_by_model_fingerprint(dataset):
+    controller = PredictionController(monitor_drift=False)
+    data = customers(dataset, 5)
+    controller.score(data)
+
+    # A version scoring next to the active one (e.g. during activation) never reads its results
+    controller.score(data, models=retrained(controller))
+    stats = controller.memo_stats()
+    assert (stats['size'], stats['misses'], stats['hits']) == (10, 10, 0)
\ No newline at end of file
@@ -0,0 +1,26 @@
+import pytest
+from src.helpers.rules import RuleExtractor
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('She is an active member of the bank.', 1),
+    ('He is still an active member.', 1),
+    ('He is not an active member.', 0),
+    ('She is inactive.', 0),
+])
+def test_active_member_is_read_from_present_statements(text, expected):
+    fields, _ = RuleExtractor().extract(text)
+    assert fields['IsActiveMember'] == expected
+
+
+@pytest.mark.parametrize('text', [
+    'He was an active member until last year but no longer is.',
+    'She is no longer an active member.',
+    'He is an active member until March.',
+    'Used to be an active member.',
+    'An active member since 2015.',
+])
+def test_active_member_in_past_or_negated_statements_is_left_to_the_llm(text):
+    fields, unresolved = RuleExtractor().extract(text)
+    assert 'IsActiveMember' not in fields
+    assert 'IsActiveMember' in unresolved
\ No newline at end of file
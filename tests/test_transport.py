@@ -0,0 +1,77 @@
+import time
+import asyncio
+import httpx
+import openai
+import pytest
+from fastapi import HTTPException
+from src.helpers.rules import RuleExtractor
+from src.helpers.transport import CircuitBreaker, OpenAITransport, llm_hedges
+
+REQUEST = {'model': 'fake', 'messages': [{'role': 'user', 'content': 'Customer is a 40-year-old male.'}]}
+
+
+def make_transport(url: str, **options) -> OpenAITransport:
+    client = openai.AsyncOpenAI(api_key='fake', base_url=f'{url}/v1', max_retries=0)
+    breaker = options.pop('breaker', CircuitBreaker(min_calls=1000))
+    return OpenAITransport(None, client, breaker, **{'backoff_base': 0.01, 'hedge_max': 0, **options})
+
+
+@pytest.mark.parametrize('option, error', [
+    ('--failure-rate', openai.InternalServerError),
+    ('--rate-limit-rate', openai.RateLimitError),
+])
+def test_retries_stop_after_the_limit(fake_openai, option, error):
+    url = fake_openai(option, '1')
+    transport = make_transport(url, max_retries=2)
+
+    with pytest.raises(error):
+        asyncio.run(transport.acreate(**REQUEST))
+    assert httpx.get(f'{url}/stats').json()['requests'] == 3
+
+
+def test_attempts_time_out_and_are_retried(fake_openai):
+    url = fake_openai('--latency', '2')
+    transport = make_transport(url, attempt_timeout=0.2, max_retries=1)
+
+    start = time.perf_counter()
+    with pytest.raises((asyncio.TimeoutError, openai.APITimeoutError)):
+        asyncio.run(transport.acreate(**REQUEST))
+    assert time.perf_counter() - start < 1.5
+    assert httpx.get(f'{url}/stats').json()['requests'] == 2
+
+
+def test_hedge_wins_against_a_slow_primary(fake_openai):
+    # The first request is slow, the duplicate sent after the hedge delay is not
+    url = fake_openai('--tail-every', '2', '--tail-latency', '3')
+    transport = make_transport(url, hedge_max=1, hedge_min_delay=0.05)
+    transport._latencies.extend([0.01] * transport.min_latency_samples)
+    won = llm_hedges.values().get('won', 0)
+
+    start = time.perf_counter()
+    response = asyncio.run(transport.acreate(**REQUEST))
+    assert time.perf_counter() - start < 1.5
+    assert response.choices[0].message.content
+    assert llm_hedges.values().get('won', 0) == won + 1
+    assert httpx.get(f'{url}/stats').json()['requests'] == 2
+
+
+def test_open_breaker_falls_back_to_the_rules(fake_openai, make_extractor, texts):
+    url = fake_openai('--failure-rate', '1')
+    extractor = make_extractor(url, breaker_min_calls=4, breaker_error_rate=0.5, breaker_cooldown=60.0)
+    rules = RuleExtractor()
+
+    async def extract():
+        try:
+            results = [await extractor.aextract_features(text) for text in texts[:10]]
+            with pytest.raises(HTTPException) as unreadable:
+                await extractor.aextract_features('A long-standing customer of ours.')
+            return results, unreadable.value
+        finally:
+            await extractor.aclose()
+
+    results, unreadable = asyncio.run(extract())
+    assert results == [rules.to_customer(rules.extract(text)[0]) for text in texts[:10]]
+    assert unreadable.status_code == 503
+    assert extractor.transport.breaker.state == 'open'
+    # Once open, the breaker fails calls fast without reaching OpenAI
+    assert httpx.get(f'{url}/stats').json()['requests'] == 4
\ No newline at end of file